@@ -26,11 +26,49 @@ class Repository(ABC):
         pass
 
 
+def resolve_attribute(obj, attr_name):
+    """Follow a dotted attribute path such as 'owner.id'"""
+    for name in attr_name.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
 class InMemoryRepository(Repository):
-    def __init__(self):
+    """Dict-backed repository with optional secondary hash indexes.
+
+    Attributes listed in unique_indexes map one value to one object, those in
+    indexes map a value to every matching object. Dotted paths ('owner.id')
+    are allowed. Indexes are kept up to date by add, update and delete, so
+    objects must be modified through the repository to stay findable.
+    """
+    def __init__(self, indexes=(), unique_indexes=()):
         self._storage = {}
+        self._unique_indexes = {attr_name: {} for attr_name in unique_indexes}
+        self._indexes = {attr_name: {} for attr_name in indexes}
+
+    def _index(self, obj):
+        for attr_name, index in self._unique_indexes.items():
+            value = resolve_attribute(obj, attr_name)
+            if index.get(value, obj.id) != obj.id:
+                raise ValueError(f"{attr_name} already exists")
+        for attr_name, index in self._unique_indexes.items():
+            index[resolve_attribute(obj, attr_name)] = obj.id
+        for attr_name, index in self._indexes.items():
+            # dict keys keep insertion order, unlike a set
+            index.setdefault(resolve_attribute(obj, attr_name), {})[obj.id] = None
+
+    def _unindex(self, obj):
+        for attr_name, index in self._unique_indexes.items():
+            index.pop(resolve_attribute(obj, attr_name), None)
+        for attr_name, index in self._indexes.items():
+            value = resolve_attribute(obj, attr_name)
+            ids = index.get(value, {})
+            ids.pop(obj.id, None)
+            if not ids:
+                index.pop(value, None)
 
     def add(self, obj):
+        self._index(obj)
         self._storage[obj.id] = obj
 
     def get(self, obj_id):
@@ -42,11 +80,34 @@ class InMemoryRepository(Repository):
     def update(self, obj_id, data):
         obj = self.get(obj_id)
         if obj:
-            obj.update(data)
+            for attr_name, index in self._unique_indexes.items():
+                if index.get(data.get(attr_name), obj.id) != obj.id:
+                    raise ValueError(f"{attr_name} already exists")
+            self._unindex(obj)
+            try:
+                obj.update(data)
+            finally:
+                self._index(obj)
 
     def delete(self, obj_id):
         if obj_id in self._storage:
+            self._unindex(self._storage[obj_id])
             del self._storage[obj_id]
 
     def get_by_attribute(self, attr_name, attr_value):
-        return next((obj for obj in self._storage.values() if getattr(obj, attr_name) == attr_value), None)
+        if attr_name == 'id':
+            return self.get(attr_value)
+        if attr_name in self._unique_indexes:
+            return self.get(self._unique_indexes[attr_name].get(attr_value))
+        if attr_name in self._indexes:
+            ids = self._indexes[attr_name].get(attr_value)
+            return self._storage[next(iter(ids))] if ids else None
+        return next((obj for obj in self._storage.values() if resolve_attribute(obj, attr_name) == attr_value), None)
+
+    def get_all_by_attribute(self, attr_name, attr_value):
+        if attr_name in self._unique_indexes:
+            obj = self.get_by_attribute(attr_name, attr_value)
+            return [obj] if obj else []
+        if attr_name in self._indexes:
+            return [self._storage[obj_id] for obj_id in self._indexes[attr_name].get(attr_value, ())]
+        return [obj for obj in self._storage.values() if resolve_attribute(obj, attr_name) == attr_value]
@@ -6,10 +6,10 @@ from app.models.review import Review
 
 class HBnBFacade:
     def __init__(self):
-        self.user_repo = InMemoryRepository()
-        self.amenity_repo = InMemoryRepository()
-        self.place_repo = InMemoryRepository()
-        self.review_repo = InMemoryRepository()
+        self.user_repo = InMemoryRepository(unique_indexes=('email',))
+        self.amenity_repo = InMemoryRepository(indexes=('name',))
+        self.place_repo = InMemoryRepository(indexes=('owner.id',))
+        self.review_repo = InMemoryRepository(indexes=('place.id', 'user.id'))
 
     # USER
     def create_user(self, user_data):
@@ -0,0 +1,58 @@
+import unittest
+import uuid
+from app.models.user import User
+from app.models.place import Place
+from app.persistence.repository import InMemoryRepository
+
+
+class TestInMemoryIndexes(unittest.TestCase):
+    def setUp(self):
+        self.users = InMemoryRepository(unique_indexes=('email',))
+        self.places = InMemoryRepository(indexes=('owner.id',))
+        self.alice_email = f"alice.{uuid.uuid4().hex}@example.com"
+        self.bob_email = f"bob.{uuid.uuid4().hex}@example.com"
+        self.alice = User(first_name="Alice", last_name="Smith", email=self.alice_email)
+        self.bob = User(first_name="Bob", last_name="Smith", email=self.bob_email)
+        self.users.add(self.alice)
+        self.users.add(self.bob)
+
+    def create_place(self, owner):
+        place = Place(title="Cozy Apartment", price=100, latitude=37.7749, longitude=-122.4194, owner=owner)
+        self.places.add(place)
+        return place
+
+    def test_unique_lookup(self):
+        self.assertIs(self.users.get_by_attribute('email', self.bob_email), self.bob)
+        self.assertIsNone(self.users.get_by_attribute('email', 'nobody@example.com'))
+        self.assertIs(self.users.get_by_attribute('id', self.alice.id), self.alice)
+
+    def test_index_follows_update_and_delete(self):
+        renamed = f"alice.{uuid.uuid4().hex}@example.com"
+        self.users.update(self.alice.id, {'email': renamed})
+        self.assertIsNone(self.users.get_by_attribute('email', self.alice_email))
+        self.assertIs(self.users.get_by_attribute('email', renamed), self.alice)
+
+        self.users.delete(self.alice.id)
+        self.assertIsNone(self.users.get_by_attribute('email', renamed))
+
+    def test_unique_conflict(self):
+        with self.assertRaises(ValueError):
+            self.users.update(self.alice.id, {'email': self.bob_email})
+        self.assertIs(self.users.get_by_attribute('email', self.alice_email), self.alice)
+
+    def test_get_all_by_attribute(self):
+        first = self.create_place(self.alice)
+        second = self.create_place(self.alice)
+        other = self.create_place(self.bob)
+        self.assertEqual(self.places.get_all_by_attribute('owner.id', self.alice.id), [first, second])
+        self.assertIs(self.places.get_by_attribute('owner.id', self.bob.id), other)
+
+        self.places.delete(first.id)
+        self.assertEqual(self.places.get_all_by_attribute('owner.id', self.alice.id), [second])
+
+    def test_unindexed_attribute_falls_back_to_scan(self):
+        self.assertEqual(self.users.get_all_by_attribute('last_name', 'Smith'), [self.alice, self.bob])
+
+
+if __name__ == "__main__":
+    unittest.main()
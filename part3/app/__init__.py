@@ -1,40 +1,52 @@
+from importlib import import_module
 from flask import Flask
-from flask_restx import Api
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
 import config
 from flask_cors import CORS
+from app.startup import StartupTimer
 
 bcrypt = Bcrypt()
 jwt = JWTManager()
 db = SQLAlchemy()
 
-from app.api.v1.users import api as users_ns
-from app.api.v1.amenities import api as amenities_ns
-from app.api.v1.places import api as places_ns
-from app.api.v1.reviews import api as reviews_ns
-from app.api.v1.auth import api as auth_ns
-from app.api.v1.protected import api as protected_ns
+# Namespaces de l'API (module, chemin), importés par create_app au moment de les enregistrer
+NAMESPACES = (
+    ('app.api.v1.users', '/api/v1/users'),
+    ('app.api.v1.amenities', '/api/v1/amenities'),
+    ('app.api.v1.places', '/api/v1/places'),
+    ('app.api.v1.reviews', '/api/v1/reviews'),
+    ('app.api.v1.auth', '/api/v1/auth'),
+    ('app.api.v1.protected', '/api/v1/protected'),
+    ('app.api.v1.metrics', '/api/v1/metrics'),
+)
 
 def create_app(config_class=config.DevelopmentConfig):
-    # Création de l'application
-    app = Flask(__name__)
-    CORS(app,
-     resources={r"/api/*": {"origins": "http://localhost:5500"}},
-     supports_credentials=True,
-     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-     allow_headers=["Authorization", "Content-Type"])
-
-
+    startup = StartupTimer()
 
+    # Création de l'application
+    with startup.phase('flask'):
+        app = Flask(__name__)
+        CORS(app,
+         resources={r"/api/*": {"origins": "http://localhost:5500"}},
+         supports_credentials=True,
+         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+         allow_headers=["Authorization", "Content-Type"],
+         expose_headers=["X-Next-Cursor", "Link", "ETag"])
 
-    app.config.from_object(config_class)
+        app.config.from_object(config_class)
 
     # Initialisation des extensions
-    bcrypt.init_app(app)
-    jwt.init_app(app)
-    db.init_app(app)
+    with startup.phase('extensions'):
+        from app.persistence.sqlite import sqlite_engine_options
+        from app.services import facade
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options(
+            app.config['SQLALCHEMY_DATABASE_URI'], app.config.get('SQLALCHEMY_ENGINE_OPTIONS'))
+        bcrypt.init_app(app)
+        jwt.init_app(app)
+        db.init_app(app)
+        facade.configure(app.config)
 
     # Configuration de l'API
     authorizations = {
@@ -47,14 +59,35 @@ def create_app(config_class=config.DevelopmentConfig):
     }
 
     # Initialiser l'API
-    api = Api(app, version='1.0', title='HBnB API', description='HBnB Application API', authorizations=authorizations)
+    with startup.phase('api'):
+        from flask_restx import Api
+        from app.api.representations import get_codec, output_json
+        from app.api.compression import Compressor
+        from app.api.v1.caching import ResponseCache
+        docs = app.config['API_DOCS_ENABLED']
+        api = Api(version='1.0', title='HBnB API', description='HBnB Application API',
+                  authorizations=authorizations, doc='/' if docs else False)
+        api.init_app(app, add_specs=docs)
+        app.extensions['json_codec'] = get_codec(app.config['JSON_BACKEND'])
+        api.representation('application/json')(output_json)
+        if app.config['RESPONSE_CACHE_ENABLED']:
+            app.extensions['response_cache'] = ResponseCache(app.config['RESPONSE_CACHE_BYTES'])
+        if app.config['COMPRESSION_ENABLED']:
+            Compressor(app)
 
     # Ajouter les namespaces pour l'API
-    api.add_namespace(users_ns, path='/api/v1/users')
-    api.add_namespace(amenities_ns, path='/api/v1/amenities')
-    api.add_namespace(places_ns, path='/api/v1/places')
-    api.add_namespace(reviews_ns, path='/api/v1/reviews')
-    api.add_namespace(auth_ns, path='/api/v1/auth')
-    api.add_namespace(protected_ns, path='/api/v1/protected')
+    for module, path in NAMESPACES:
+        with startup.phase(module.rsplit('.', 1)[1]):
+            api.add_namespace(import_module(module).api, path=path)
+
+    if docs:
+        from app.api.docs import cache_spec
+        cache_spec(app, api)
+
+    # Index des lieux les plus proches chargé en arrière-plan : la première requête n'attend pas
+    if app.config['PLACE_INDEX_PRELOAD']:
+        facade.place_index.start(app)
 
+    app.extensions['startup'] = startup.finish()
+    app.logger.debug('create_app timings (ms): %s', app.extensions['startup'])
     return app
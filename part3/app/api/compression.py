@@ -0,0 +1,95 @@
+import gzip
+from flask import request
+from app.persistence.cache import SizedCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _encoders(level):
+    """Available content codings, in server preference order"""
+    encoders = {}
+    if zstandard is not None:
+        encoders['zstd'] = zstandard.ZstdCompressor(level=min(level, 19)).compress
+    if brotli is not None:
+        encoders['br'] = lambda data: brotli.compress(data, quality=min(level, 11))
+    encoders['gzip'] = lambda data: gzip.compress(data, compresslevel=min(level, 9), mtime=0)
+    return encoders
+
+
+def negotiate(accept_encoding, available):
+    """Pick the preferred coding from available that Accept-Encoding allows, or None"""
+    for coding in available:
+        if accept_encoding.quality(coding) > 0:
+            return coding
+    return None
+
+
+class Compressor:
+    """after_request hook compressing response bodies according to Accept-Encoding"""
+    def __init__(self, app=None):
+        self.encoders = {}
+        self.cache = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config['COMPRESSION_MIN_SIZE']
+        self.mimetypes = set(app.config['COMPRESSION_MIMETYPES'])
+        self.encoders = _encoders(app.config['COMPRESSION_LEVEL'])
+        self.cache = SizedCache(app.config['COMPRESSION_CACHE_BYTES'])
+        app.extensions['compression'] = self
+        app.after_request(self.after_request)
+
+    def compress(self, coding, data):
+        return self.encoders[coding](data)
+
+    def after_request(self, response):
+        if response.mimetype not in self.mimetypes and response.status_code != 304:
+            return response
+        response.vary.add('Accept-Encoding')
+        coding = negotiate(request.accept_encodings, self.encoders)
+        if coding is None or 'Content-Encoding' in response.headers:
+            return response
+
+        etag, weak = response.get_etag()
+        if response.status_code == 304:
+            if etag and not weak:
+                response.set_etag(etag, weak=True)
+            return response
+        if (response.status_code != 200 or response.direct_passthrough
+                or response.is_streamed):
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        cacheable = request.method == 'GET' and etag and not weak
+        key = (request.path, etag, coding)
+        body = self.cache.get(key) if cacheable else None
+        if body is None:
+            body = self.compress(coding, data)
+            if cacheable:
+                self.cache.set(key, body, len(body))
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = coding
+        # The encoded bytes differ from the identity representation
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def stats(self):
+        return {
+            'encodings': list(self.encoders),
+            'min_size': self.min_size,
+            'cache': self.cache.stats()
+        }
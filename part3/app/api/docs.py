@@ -0,0 +1,41 @@
+import hashlib
+from threading import Lock
+from flask import Response, request
+from werkzeug.http import quote_etag
+from app.api.representations import dumps
+
+
+class CachedSpec:
+    """Serve swagger.json from bytes serialized once per process.
+
+    flask_restx keeps the schema dict but encodes it again on every request;
+    monitoring that polls the spec then pays for a full JSON dump each time.
+    The document is rendered on the first request, since it needs a request
+    context, and revalidates with an ETag afterwards.
+    """
+    def __init__(self, api):
+        self.api = api
+        self.body = None
+        self.etag = None
+        self._lock = Lock()
+
+    def render(self):
+        with self._lock:
+            if self.body is None:
+                self.body = dumps(self.api.__schema__) + b'\n'
+                self.etag = hashlib.sha1(self.body).hexdigest()
+        return self.body
+
+    def view(self):
+        body = self.render()
+        headers = {'ETag': quote_etag(self.etag)}
+        if request.if_none_match.contains_weak(self.etag):
+            return Response(status=304, headers=headers)
+        return Response(body, 200, headers, mimetype='application/json')
+
+
+def cache_spec(app, api):
+    """Replace the swagger.json view of api with a CachedSpec"""
+    spec = CachedSpec(api)
+    app.view_functions[api.endpoint('specs')] = spec.view
+    return spec
@@ -0,0 +1,60 @@
+import json
+from flask import current_app, make_response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONCodec:
+    """Pair of JSON encode/decode functions; dumps always returns bytes"""
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+
+STDLIB_CODEC = JSONCodec(
+    'json',
+    lambda data: json.dumps(data, separators=(',', ':')).encode('utf-8'),
+    json.loads
+)
+
+if orjson is not None:
+    ORJSON_CODEC = JSONCodec(
+        'orjson',
+        lambda data: orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS),
+        orjson.loads
+    )
+else:
+    ORJSON_CODEC = None
+
+
+def get_codec(backend='auto'):
+    """Resolve JSON_BACKEND: 'orjson', 'json', or 'auto' for orjson when installed"""
+    if backend in ('auto', 'orjson') and ORJSON_CODEC is not None:
+        return ORJSON_CODEC
+    if backend not in ('auto', 'orjson', 'json'):
+        raise ValueError(f"Unknown JSON backend: {backend}")
+    return STDLIB_CODEC
+
+
+def current_codec():
+    return current_app.extensions.get('json_codec', STDLIB_CODEC)
+
+
+def dumps(data):
+    return current_codec().dumps(data)
+
+
+def loads(data):
+    return current_codec().loads(data)
+
+
+def output_json(data, code, headers=None):
+    """flask_restx representation for application/json using the configured codec"""
+    resp = make_response(dumps(data) + b'\n', code)
+    resp.headers.extend(headers or {})
+    resp.mimetype = 'application/json'
+    return resp
@@ -1,6 +1,8 @@
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services import facade
+from app.api.v1.pagination import pagination_params, get_page_args, page_headers
+from app.api.v1.caching import cached_collection, etag_headers, make_etag, not_modified
 
 
 api = Namespace('amenities', description='Amenity operations')
@@ -40,22 +42,38 @@ class AmenityList(Resource):
             return {'error': str(e).strip("'")}, 400
 
     @api.response(200, 'List of amenities retrieved successfully')
+    @api.response(304, 'Not modified')
+    @api.response(400, 'Invalid pagination parameters')
+    @api.doc(params=pagination_params)
+    @cached_collection('amenity')
     def get(self):
-        """Retrieve a list of all amenities"""
-        amenities = facade.get_all_amenities()
-        return [amenity.to_dict() for amenity in amenities], 200
+        """Retrieve a page of amenities"""
+        try:
+            limit, after = get_page_args()
+            amenities, next_cursor = facade.get_amenities_rows(limit, after)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        return amenities, 200, page_headers(next_cursor)
 
 
 @api.route('/<amenity_id>')
 class AmenityResource(Resource):
     @api.response(200, 'Amenity details retrieved successfully')
+    @api.response(304, 'Not modified')
     @api.response(404, 'Amenity not found')
     def get(self, amenity_id):
         """Get amenity details by ID"""
+        version = facade.get_version('amenity', amenity_id)
+        if not version:
+            return {'error': 'Amenity not found'}, 404
+        etag = make_etag(version)
+        response = not_modified(etag)
+        if response is not None:
+            return response
         amenity = facade.get_amenity(amenity_id)
         if not amenity:
             return {'error': 'Amenity not found'}, 404
-        return amenity.to_dict(), 200
+        return amenity.to_dict(), 200, etag_headers(etag)
 
     @api.expect(amenity_model)
     @api.response(200, 'Amenity updated successfully')
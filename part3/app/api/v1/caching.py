@@ -0,0 +1,89 @@
+import hashlib
+from functools import wraps
+from flask import Response, current_app, request
+from flask_restx.utils import unpack
+from werkzeug.http import quote_etag
+from app.api.representations import dumps
+from app.persistence.cache import SizedCache
+from app.services import facade
+
+
+def make_etag(*parts):
+    """Strong entity tag hashed from version parts"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def normalized_args():
+    """The query arguments in a canonical order, so reordered query strings name the same response"""
+    return tuple(sorted(request.args.items(multi=True)))
+
+
+def collection_etag(version):
+    """Entity tag of a list resource: the collection version plus the normalized query arguments"""
+    return make_etag(request.path, version, normalized_args())
+
+
+def etag_headers(etag, headers=None):
+    headers = dict(headers or {})
+    headers['ETag'] = quote_etag(etag)
+    return headers
+
+
+def not_modified(etag):
+    """A 304 response when If-None-Match matches etag, else None"""
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=etag_headers(etag))
+    return None
+
+
+class ResponseCache(SizedCache):
+    """Encoded bodies of collection GETs keyed by URL and normalized query string, each at its collection version"""
+    def lookup(self, key, version):
+        """(body, headers) stored for key at version; an older version counts as a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1][0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1][1:]
+
+    def store(self, key, version, body, headers):
+        size = len(body) + sum(len(name) + len(value) for name, value in headers.items())
+        self.set(key, (version, body, headers), size)
+
+
+def response_cache_key():
+    """request.base_url plus the query arguments in a canonical order"""
+    return request.base_url, normalized_args()
+
+
+def cached_collection(name, source_version=None):
+    """Wrap a list GET with ETag revalidation and a versioned cache of its encoded 200 body, also keyed by source_version()"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            version = facade.get_collection_version(name)
+            if source_version is not None:
+                version = version, source_version()
+            etag = collection_etag(version)
+            response = not_modified(etag)
+            if response is not None:
+                return response
+            cache = current_app.extensions.get('response_cache')
+            key = response_cache_key()
+            # The facade's generation invalidates the entry on its own writes even where the counters lag
+            cache_version = version, facade.get_collection_generation(name)
+            entry = cache.lookup(key, cache_version) if cache is not None else None
+            if entry is None:
+                data, code, headers = unpack(method(*args, **kwargs))
+                if code != 200:
+                    return data, code, headers
+                entry = dumps(data) + b'\n', etag_headers(etag, headers)
+                if cache is not None:
+                    cache.store(key, cache_version, *entry)
+            body, headers = entry
+            return Response(body, 200, headers, mimetype='application/json')
+        return wrapper
+    return decorator
@@ -0,0 +1,35 @@
+from datetime import datetime
+from flask import Response, current_app, request, stream_with_context
+from app.api.representations import dumps
+
+export_params = {
+    'updated_since': 'Only export rows updated at or after this ISO 8601 date'
+}
+
+
+def get_updated_since():
+    """Parse the updated_since query parameter, None when absent"""
+    value = request.args.get('updated_since')
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError('Invalid updated_since')
+
+
+def ndjson_response(rows):
+    """Stream one JSON document per line, flushing every EXPORT_BATCH_SIZE rows"""
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+
+    def generate():
+        lines = []
+        for row in rows:
+            lines.append(dumps(row))
+            if len(lines) >= batch_size:
+                yield b'\n'.join(lines) + b'\n'
+                lines = []
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
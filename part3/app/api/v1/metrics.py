@@ -0,0 +1,27 @@
+from flask import current_app
+from flask_restx import Namespace, Resource
+from flask_jwt_extended import jwt_required, get_jwt
+from app.services import facade
+
+api = Namespace('metrics', description='Runtime metrics')
+
+@api.route('/')
+class Metrics(Resource):
+    @api.response(200, 'Metrics retrieved successfully')
+    @api.response(401, 'Unauthorized')
+    @api.response(403, 'Forbidden')
+    @api.doc(security='apikey')
+    @jwt_required()
+    def get(self):
+        """Cache, compression and startup counters of this worker process"""
+        if not get_jwt()['is_admin']:
+            return {'error': 'Forbidden'}, 403
+        stats = facade.stats()
+        stats['startup_ms'] = current_app.extensions.get('startup')
+        response_cache = current_app.extensions.get('response_cache')
+        if response_cache is not None:
+            stats['response_cache'] = response_cache.stats()
+        compression = current_app.extensions.get('compression')
+        if compression is not None:
+            stats['compression'] = compression.stats()
+        return stats, 200
@@ -0,0 +1,49 @@
+from urllib.parse import urlencode
+from flask import current_app, request
+
+# Query parameters shared by every paginated list endpoint
+pagination_params = {
+    'limit': 'Maximum number of items to return',
+    'after': 'Cursor returned in the X-Next-Cursor header of the previous page'
+}
+
+
+def get_page_args():
+    """Read limit and after from the query string, clamping limit to the configured maximum"""
+    limit = request.args.get('limit', current_app.config['PAGE_DEFAULT_LIMIT'])
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError('Invalid limit')
+    if limit < 1:
+        raise ValueError('Invalid limit')
+    return min(limit, current_app.config['PAGE_MAX_LIMIT']), request.args.get('after')
+
+
+def page_headers(next_cursor):
+    """Headers advertising the next page, empty on the last page"""
+    if not next_cursor:
+        return {}
+    # Every value of repeated arguments such as amenity, in request order
+    args = [(name, value) for name, value in request.args.items(multi=True) if name != 'after']
+    args.append(('after', next_cursor))
+    return {
+        'X-Next-Cursor': next_cursor,
+        'Link': f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    }
+
+
+ids_param = {'ids': 'Comma-separated IDs to fetch in one request instead of a page'}
+
+
+def get_ids_arg():
+    """IDs listed in the ids query argument, None when absent"""
+    ids = request.args.get('ids')
+    if ids is None:
+        return None
+    ids = [obj_id for obj_id in ids.split(',') if obj_id]
+    if not ids:
+        raise ValueError('Invalid ids')
+    if len(ids) > current_app.config['PAGE_MAX_LIMIT']:
+        raise ValueError('Too many ids')
+    return ids
@@ -1,6 +1,18 @@
+import math
+from flask import current_app, request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services import facade
+from app.services.place_index import PlaceIndexLoading
+from app.services.singleflight import SingleFlightTimeout
+from app.api.v1.pagination import pagination_params, ids_param, get_ids_arg, get_page_args, page_headers
+from app.api.v1.caching import cached_collection, etag_headers, make_etag, not_modified
+from app.api.v1.export import export_params, get_updated_since, ndjson_response
+from app.api.representations import loads
+from app.models.place import Place
+from app.models.place_cluster import CLUSTER_PRECISIONS
+from app.spatial.geohash import count_cells_in_box, zoom_precision
+from app.spatial.polygon import ring_bounds
 
 api = Namespace('places', description='Place operations')
 
@@ -27,6 +39,59 @@ place_model = api.model('Place', {
     'amenities': fields.List(fields.String, description="List of amenities ID's")
 })
 
+sparse_params = {
+    'fields': 'Comma-separated fields to return, e.g. id,title,price',
+    'include': 'Comma-separated relationships to embed: owner, amenities, reviews'
+}
+
+def get_sparse_args():
+    """Parse fields and include; both None when absent, meaning the full representation"""
+    fields = request.args.get('fields')
+    include = request.args.get('include')
+    if fields is not None:
+        fields = [field for field in fields.split(',') if field]
+        if not fields or any(field not in Place.FIELDS for field in fields):
+            raise ValueError('Invalid fields')
+    if include is not None:
+        include = [name for name in include.split(',') if name]
+        if any(name not in Place.RELATIONSHIPS for name in include):
+            raise ValueError('Invalid include')
+    return fields, include
+
+filter_params = {
+    'min_price': 'Only places costing at least this much per night',
+    'max_price': 'Only places costing at most this much per night',
+    'amenity': 'Only places offering this amenity ID; repeat to require several',
+    'min_rating': 'Only places whose average review rating is at least this'
+}
+
+def get_filter_args():
+    """Parse the list filters into keyword arguments for PlaceRepository.filtered"""
+    filters = {}
+    for name in ('min_price', 'max_price', 'min_rating'):
+        value = request.args.get(name)
+        if value is None:
+            continue
+        try:
+            filters[name] = float(value)
+        except ValueError:
+            raise ValueError(f'Invalid {name}')
+        if not math.isfinite(filters[name]):
+            raise ValueError(f'Invalid {name}')
+    amenities = [amenity for amenity in request.args.getlist('amenity') if amenity]
+    if amenities:
+        filters['amenities'] = amenities
+    return filters
+
+def serialize_place(place, fields=None, include=None):
+    if fields is None and include is None:
+        return place.to_dict_list()
+    return place.to_dict_sparse(fields, include or ())
+
+def render_place_details(place_id, fields=None, include=None):
+    place = facade.get_place_details(place_id, fields, include)
+    return serialize_place(place, fields, include) if place else None
+
 @api.route('/')
 class PlaceList(Resource):
     @api.expect(place_model)
@@ -47,24 +112,284 @@ class PlaceList(Resource):
             return {'error': str(e).strip("'")}, 400
 
     @api.response(200, 'List of places retrieved successfully')
+    @api.response(304, 'Not modified')
+    @api.response(400, 'Invalid pagination, sparse, filter or ids parameters')
+    @api.doc(params=dict(pagination_params, **sparse_params, **filter_params, **ids_param))
+    @cached_collection('place')
     def get(self):
-        """Retrieve a list of all places"""
-        places = facade.get_all_places()
-        return [place.to_dict_list() for place in places], 200
+        """Retrieve a page of places, or the places listed in ids"""
+        try:
+            fields, include = get_sparse_args()
+            ids = get_ids_arg()
+            if ids is not None:
+                places, missing = facade.get_places_many(ids, fields, include)
+                return {'items': [serialize_place(place, fields, include) for place in places],
+                        'missing': missing}, 200
+            limit, after = get_page_args()
+            filters = get_filter_args()
+            places, next_cursor = facade.get_places_page(limit, after, fields, include, filters)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        return [serialize_place(place, fields, include) for place in places], 200, page_headers(next_cursor)
 
     def option(self):
         return {}, 200
 
+bulk_place_model = api.inherit('BulkPlace', place_model, {
+    'owner_id': fields.String(description='Owner of the place, admins only (defaults to the caller)')
+})
+
+@api.route('/batch')
+class PlaceBatch(Resource):
+    @api.expect([bulk_place_model])
+    @api.response(201, 'All places successfully created')
+    @api.response(207, 'Some places were rejected, see per-row results')
+    @api.response(400, 'Invalid input data')
+    @api.response(401, 'Unauthorized')
+    @api.response(413, 'Batch too large')
+    @api.doc(security='apikey')
+    @jwt_required()
+    def post(self):
+        """Register a batch of places in one transaction"""
+        try:
+            places_data = loads(request.get_data())
+        except ValueError:
+            return {'error': 'Invalid input data'}, 400
+        if not isinstance(places_data, list) or not places_data:
+            return {'error': 'Invalid input data'}, 400
+        if len(places_data) > current_app.config['BULK_MAX_ROWS']:
+            return {'error': 'Batch too large'}, 413
+        if not all(isinstance(data, dict) for data in places_data):
+            return {'error': 'Invalid input data'}, 400
+
+        try:
+            results = facade.create_places_bulk(places_data, get_jwt_identity(), get_jwt()['is_admin'],
+                                                current_app.config['BULK_INSERT_CHUNK_SIZE'])
+        except Exception as e:
+            return {'error': str(e).strip("'")}, 400
+        created = sum(1 for result in results if 'id' in result)
+        if created == len(results):
+            return results, 201
+        return results, 207 if created else 400
+
+@api.route('/export')
+class PlaceExport(Resource):
+    @api.response(200, 'Places streamed as newline-delimited JSON')
+    @api.response(400, 'Invalid updated_since')
+    @api.produces(['application/x-ndjson'])
+    @api.doc(params=export_params)
+    def get(self):
+        """Stream every place as NDJSON"""
+        try:
+            updated_since = get_updated_since()
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        places = facade.stream_places(current_app.config['EXPORT_BATCH_SIZE'], updated_since)
+        return ndjson_response(place.to_dict_list() for place in places)
+
+nearby_params = {
+    'lat': 'Latitude of the centre, in degrees',
+    'lon': 'Longitude of the centre, in degrees',
+    'radius_km': 'Search radius in kilometres',
+    'limit': 'Maximum number of places to return'
+}
+
+def get_float_arg(name, low, high):
+    """Required float query argument within [low, high]"""
+    try:
+        value = float(request.args[name])
+    except (KeyError, ValueError):
+        raise ValueError(f'Invalid {name}')
+    if not low <= value <= high:
+        raise ValueError(f'Invalid {name}')
+    return value
+
+def with_distance(place, distance, fields=None, include=None):
+    data = serialize_place(place, fields, include)
+    data['distance_km'] = round(distance, 3)
+    return data
+
+@api.route('/nearby')
+class PlaceNearby(Resource):
+    @api.response(200, 'Places within the radius, nearest first')
+    @api.response(304, 'Not modified')
+    @api.response(400, 'Invalid coordinates, radius, limit, fields or include')
+    @api.doc(params=dict(nearby_params, **sparse_params))
+    @cached_collection('place')
+    def get(self):
+        """Retrieve the places within radius_km of a point, with their distance"""
+        try:
+            lat = get_float_arg('lat', -90, 90)
+            lon = get_float_arg('lon', -180, 180)
+            radius_km = get_float_arg('radius_km', 0, current_app.config['NEARBY_MAX_RADIUS_KM'])
+            limit, _ = get_page_args()
+            fields, include = get_sparse_args()
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        return [with_distance(place, distance, fields, include)
+                for place, distance in facade.get_places_nearby(lat, lon, radius_km, limit, fields, include)], 200
+
+nearest_params = {
+    'lat': 'Latitude of the point, in degrees',
+    'lon': 'Longitude of the point, in degrees',
+    'k': 'Number of places to return'
+}
+
+@api.route('/nearest')
+class PlaceNearest(Resource):
+    @api.response(200, 'The k closest places, nearest first')
+    @api.response(304, 'Not modified')
+    @api.response(400, 'Invalid coordinates, k, fields or include')
+    @api.response(503, 'The place index is still loading')
+    @api.doc(params=dict(nearest_params, **sparse_params))
+    # The body comes from the in-memory tree, which may lag the table while it reloads
+    @cached_collection('place', facade.get_place_index_version)
+    def get(self):
+        """Retrieve the k places closest to a point, with their distance"""
+        try:
+            lat = get_float_arg('lat', -90, 90)
+            lon = get_float_arg('lon', -180, 180)
+            k = request.args.get('k', 20)
+            try:
+                k = int(k)
+            except ValueError:
+                raise ValueError('Invalid k')
+            if not 1 <= k <= current_app.config['PAGE_MAX_LIMIT']:
+                raise ValueError('Invalid k')
+            fields, include = get_sparse_args()
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        try:
+            nearest = facade.get_places_nearest(lat, lon, k, fields, include)
+        except PlaceIndexLoading:
+            return {'error': 'The place index is loading, retry later'}, 503
+        return [with_distance(place, distance, fields, include) for place, distance in nearest], 200
+
+within_model = api.model('PlaceWithin', {
+    'bbox': fields.List(fields.Float, description='[min_lon, min_lat, max_lon, max_lat]; min_lon > max_lon crosses the antimeridian'),
+    'polygon': fields.Raw(description='GeoJSON Polygon: {"type": "Polygon", "coordinates": [[[lon, lat], ...], ...]}')
+})
+
+def is_coordinate(value, limit):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and -limit <= value <= limit
+
+def get_bbox_boxes(bbox):
+    """(min_lat, max_lat, min_lon, max_lon) boxes of a [min_lon, min_lat, max_lon, max_lat] bbox"""
+    if not isinstance(bbox, list) or len(bbox) != 4 \
+            or not all(is_coordinate(value, limit) for value, limit in zip(bbox, (180, 90, 180, 90))):
+        raise ValueError('Invalid bbox')
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if min_lat > max_lat:
+        raise ValueError('Invalid bbox')
+    if min_lon > max_lon:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+def get_region(payload):
+    """(boxes, rings) of a within body: rings is None for a bbox"""
+    if not isinstance(payload, dict):
+        raise ValueError('Invalid input data')
+    if 'bbox' in payload:
+        return get_bbox_boxes(payload['bbox']), None
+
+    polygon = payload.get('polygon')
+    if not isinstance(polygon, dict) or polygon.get('type') != 'Polygon' \
+            or not isinstance(polygon.get('coordinates'), list) or not polygon['coordinates']:
+        raise ValueError('Invalid polygon')
+    rings = []
+    for ring in polygon['coordinates']:
+        if not isinstance(ring, list) or len(ring) < 4 or not all(
+                isinstance(position, list) and len(position) >= 2
+                and is_coordinate(position[0], 180) and is_coordinate(position[1], 90) for position in ring):
+            raise ValueError('Invalid polygon')
+        rings.append([(position[0], position[1]) for position in ring])
+    if sum(len(ring) for ring in rings) > current_app.config['WITHIN_MAX_VERTICES']:
+        raise ValueError('Polygon has too many vertices')
+    return [ring_bounds(rings)], rings
+
+@api.route('/within')
+class PlaceWithin(Resource):
+    @api.expect(within_model)
+    @api.response(200, 'A page of the places inside the bbox or polygon')
+    @api.response(400, 'Invalid bbox, polygon, pagination, fields or include')
+    @api.doc(params=dict(pagination_params, **sparse_params))
+    def post(self):
+        """Retrieve the places inside a viewport bbox or a GeoJSON polygon, page by page"""
+        try:
+            payload = loads(request.get_data())
+        except ValueError:
+            return {'error': 'Invalid input data'}, 400
+        try:
+            boxes, rings = get_region(payload)
+            limit, after = get_page_args()
+            fields, include = get_sparse_args()
+            places, next_cursor = facade.get_places_within(boxes, rings, limit, after, fields, include)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        return [serialize_place(place, fields, include) for place in places], 200, page_headers(next_cursor)
+
+clusters_params = {
+    'bbox': 'Viewport as min_lon,min_lat,max_lon,max_lat',
+    'zoom': 'Web map zoom level, 0 to 22; picks the geohash precision of the cells'
+}
+
+@api.route('/clusters')
+class PlaceClusters(Resource):
+    @api.response(200, 'Count, centroid and price range of the places of each cell of the viewport')
+    @api.response(304, 'Not modified')
+    @api.response(400, 'Invalid bbox or zoom, or too many cells for the zoom')
+    @api.doc(params=clusters_params)
+    @cached_collection('place')
+    def get(self):
+        """Retrieve the places of a viewport aggregated into geohash cells"""
+        try:
+            try:
+                bbox = [float(value) for value in request.args['bbox'].split(',')]
+            except (KeyError, ValueError):
+                raise ValueError('Invalid bbox')
+            boxes = get_bbox_boxes(bbox)
+            try:
+                zoom = int(request.args['zoom'])
+            except (KeyError, ValueError):
+                raise ValueError('Invalid zoom')
+            if not 0 <= zoom <= 22:
+                raise ValueError('Invalid zoom')
+            precision = min(zoom_precision(zoom, max(CLUSTER_PRECISIONS)), Place.GEOHASH_PRECISION)
+            if sum(count_cells_in_box(*box, precision) for box in boxes) > current_app.config['CLUSTER_MAX_CELLS']:
+                raise ValueError('Too many cells, zoom out or shrink the bbox')
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        return facade.get_place_clusters(boxes, precision), 200
+
 @api.route('/<place_id>')
 class PlaceResource(Resource):
     @api.response(200, 'Place details retrieved successfully')
+    @api.response(304, 'Not modified')
+    @api.response(400, 'Invalid fields or include')
     @api.response(404, 'Place not found')
+    @api.response(503, 'Timed out waiting for a concurrent identical read')
+    @api.doc(params=sparse_params)
     def get(self, place_id):
         """Get place details by ID"""
-        place = facade.get_place(place_id)
-        if not place:
+        try:
+            fields, include = get_sparse_args()
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        version = facade.get_version('place', place_id)
+        if not version:
+            return {'error': 'Place not found'}, 404
+        etag = make_etag(version, request.query_string)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+        # Concurrent reads of the same place version share one load and serialization
+        try:
+            data = facade.coalesce(('place', etag), lambda: render_place_details(place_id, fields, include))
+        except SingleFlightTimeout:
+            return {'error': 'Place details are taking too long, retry later'}, 503
+        if data is None:
             return {'error': 'Place not found'}, 404
-        return place.to_dict_list(), 200
+        return data, 200, etag_headers(etag)
 
     @api.expect(place_model)
     @api.response(200, 'Place updated successfully')
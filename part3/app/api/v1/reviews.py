@@ -1,6 +1,10 @@
+from flask import current_app
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services import facade
+from app.api.v1.pagination import pagination_params, ids_param, get_ids_arg, get_page_args, page_headers
+from app.api.v1.caching import cached_collection, etag_headers, make_etag, not_modified
+from app.api.v1.export import export_params, get_updated_since, ndjson_response
 
 api = Namespace('reviews', description='Review operations')
 
@@ -30,20 +34,56 @@ class ReviewList(Resource):
             return {"error": str(e).strip("'")}, 400
 
     @api.response(200, 'List of reviews retrieved successfully')
+    @api.response(304, 'Not modified')
+    @api.response(400, 'Invalid pagination or ids parameters')
+    @api.doc(params=dict(pagination_params, **ids_param))
+    @cached_collection('review')
     def get(self):
-        """Retrieve a list of all reviews"""
-        return [review.to_dict() for review in facade.get_all_reviews()], 200
+        """Retrieve a page of reviews, or the reviews listed in ids"""
+        try:
+            ids = get_ids_arg()
+            if ids is not None:
+                reviews, missing = facade.get_reviews_many(ids)
+                return {'items': [review.to_dict() for review in reviews], 'missing': missing}, 200
+            limit, after = get_page_args()
+            reviews, next_cursor = facade.get_reviews_rows(limit, after)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        return reviews, 200, page_headers(next_cursor)
+
+@api.route('/export')
+class ReviewExport(Resource):
+    @api.response(200, 'Reviews streamed as newline-delimited JSON')
+    @api.response(400, 'Invalid updated_since')
+    @api.produces(['application/x-ndjson'])
+    @api.doc(params=export_params)
+    def get(self):
+        """Stream every review as NDJSON"""
+        try:
+            updated_since = get_updated_since()
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        reviews = facade.stream_reviews(current_app.config['EXPORT_BATCH_SIZE'], updated_since)
+        return ndjson_response(review.to_dict() for review in reviews)
 
 @api.route('/<review_id>')
 class ReviewResource(Resource):
     @api.response(200, 'Review details retrieved successfully')
+    @api.response(304, 'Not modified')
     @api.response(404, 'Review not found')
     def get(self, review_id):
         """Get review details by ID"""
+        version = facade.get_version('review', review_id)
+        if not version:
+            return {'error': 'Review not found'}, 404
+        etag = make_etag(version)
+        response = not_modified(etag)
+        if response is not None:
+            return response
         review = facade.get_review(review_id)
         if not review:
             return {'error': 'Review not found'}, 404
-        return review.to_dict(), 200
+        return review.to_dict(), 200, etag_headers(etag)
 
     @api.expect(review_model)
     @api.response(200, 'Review updated successfully')
@@ -1,6 +1,8 @@
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services import facade
+from app.api.v1.pagination import pagination_params, ids_param, get_ids_arg, get_page_args, page_headers
+from app.api.v1.caching import cached_collection, etag_headers, make_etag, not_modified
 
 api = Namespace('users', description='User operations')
 
@@ -44,21 +46,41 @@ class UserList(Resource):
             return {'error': str(e).strip("'")}, 400
         
     @api.response(200, 'List of users retrieved successfully')
+    @api.response(304, 'Not modified')
+    @api.response(400, 'Invalid pagination or ids parameters')
+    @api.doc(params=dict(pagination_params, **ids_param))
+    @cached_collection('user')
     def get(self):
-        """Retrieve a list of users"""
-        users = facade.get_users()
-        return [user.to_dict() for user in users], 200
+        """Retrieve a page of users, or the users listed in ids"""
+        try:
+            ids = get_ids_arg()
+            if ids is not None:
+                users, missing = facade.get_users_many(ids)
+                return {'items': [user.to_dict() for user in users], 'missing': missing}, 200
+            limit, after = get_page_args()
+            users, next_cursor = facade.get_users_rows(limit, after)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        return users, 200, page_headers(next_cursor)
     
 @api.route('/<user_id>')
 class UserResource(Resource):
     @api.response(200, 'User details retrieved successfully')
+    @api.response(304, 'Not modified')
     @api.response(404, 'User not found')
     def get(self, user_id):
         """Get user details by ID"""
+        version = facade.get_version('user', user_id)
+        if not version:
+            return {'error': 'User not found'}, 404
+        etag = make_etag(version)
+        response = not_modified(etag)
+        if response is not None:
+            return response
         user = facade.get_user(user_id)
         if not user:
             return {'error': 'User not found'}, 404
-        return user.to_dict(), 200
+        return user.to_dict(), 200, etag_headers(etag)
 
     @api.expect(user_model)
     @api.response(200, 'User updated successfully')
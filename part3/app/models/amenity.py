@@ -4,6 +4,11 @@ from sqlalchemy.orm import validates
 
 class Amenity(BaseModel):
 	__tablename__ = 'amenities'
+	# Public field name -> column attribute, as returned by to_dict()
+	FIELDS = {'id': 'id', 'name': 'name'}
+	__table_args__ = (
+		db.Index('ix_amenities_created_at_id', 'created_at', 'id'),
+	)
 
 	name = db.Column(db.String(50), nullable=False, unique=True)
 
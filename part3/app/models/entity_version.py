@@ -0,0 +1,69 @@
+from app import db
+from sqlalchemy import event, insert, select, update
+
+# Tables whose writes bump their row in entity_versions
+VERSIONED_TABLES = ('users', 'places', 'reviews', 'amenities', 'amenities_places')
+# Bumped once per place inserted, moved or deleted, by the places_rtree triggers
+PLACE_COORDINATES = 'places_coordinates'
+VERSION_NAMES = VERSIONED_TABLES + (PLACE_COORDINATES,)
+
+class EntityVersion(db.Model):
+    """Write counter per table, bumped by SQLite triggers or, elsewhere, bump_table_versions"""
+    __tablename__ = 'entity_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version
+        }
+
+
+def has_version_triggers(connection):
+    """True when create_version_triggers keeps the counters of this database current"""
+    return connection.dialect.name == 'sqlite'
+
+
+def seed_table_versions(connection):
+    """Insert a zero counter for every versioned table that has none yet"""
+    table = EntityVersion.__table__
+    existing = set(connection.scalars(select(table.c.name)))
+    missing = [{'name': name, 'version': 0} for name in VERSION_NAMES if name not in existing]
+    if missing:
+        connection.execute(insert(table), missing)
+
+
+def bump_table_versions(connection, increments):
+    """Add {name: increment} to the counters, for databases without the triggers"""
+    table = EntityVersion.__table__
+    # Sorted, so concurrent transactions lock the counter rows in the same order
+    for name in sorted(increments):
+        if name not in VERSION_NAMES or not increments[name]:
+            continue
+        step = increments[name]
+        result = connection.execute(update(table).where(table.c.name == name).values(version=table.c.version + step))
+        if not result.rowcount:
+            connection.execute(insert(table).values(name=name, version=step))
+
+
+def create_version_triggers(connection):
+    """Create the triggers that keep entity_versions up to date, if missing"""
+    if not has_version_triggers(connection):
+        return
+    for table in VERSIONED_TABLES:
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            connection.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{operation.lower()} "
+                f"AFTER {operation} ON {table} BEGIN "
+                f"INSERT INTO entity_versions (name, version) VALUES ('{table}', 1) "
+                f"ON CONFLICT(name) DO UPDATE SET version = version + 1; "
+                f"END"
+            )
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_triggers_after_create_all(target, connection, **kw):
+    seed_table_versions(connection)
+    create_version_triggers(connection)
@@ -1,71 +1,158 @@
 from .basemodel import BaseModel
 from app import db
+from app.spatial.geohash import MAX_PRECISION, encode as encode_geohash, encode_many as encode_geohashes
 from sqlalchemy.orm import validates
 
+
+def check_title(value):
+    if not isinstance(value, str):
+        raise TypeError("Title must be a string")
+    if 10 < len(value) > 100:
+        raise ValueError("Title must be between 10 and 100 characters")
+    return value
+
+
+def check_description(value):
+    if not isinstance(value, str):
+        raise TypeError("Description must be a string")
+    if len(value) > 500:
+        raise ValueError("Description must be less than or equal to 500 characters")
+    return value
+
+
+def check_price(value):
+    if not isinstance(value, float) and not isinstance(value, int):
+        raise TypeError("Price must be a float")
+    if value <= 0:
+        raise ValueError("Price must be positive.")
+    return value
+
+
+def check_latitude(value):
+    if not isinstance(value, float):
+        raise TypeError("Latitude must be a float")
+    if not -90 <= value <= 90:
+        raise ValueError("Latitude must be between -90 and 90.")
+    return value
+
+
+def check_longitude(value):
+    if not isinstance(value, float):
+        raise TypeError("Longitude must be a float")
+    if not -180 <= value <= 180:
+        raise ValueError("Longitude must be between -180 and 180.")
+    return value
+
+
+# Client-settable columns and their checks, shared by the @validates hooks and Place.build_row
+CHECKS = {
+    'title': check_title,
+    'description': check_description,
+    'price': check_price,
+    'latitude': check_latitude,
+    'longitude': check_longitude
+}
+REQUIRED_FIELDS = {'title', 'price', 'latitude', 'longitude'}
+
+
 class Place(BaseModel):
     __tablename__ = 'places'
+    # Public field name -> column attribute, for sparse fieldsets
+    FIELDS = {
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'price': 'price',
+        'latitude': 'latitude',
+        'longitude': 'longitude',
+        'owner_id': 'user_id'
+    }
+    RELATIONSHIPS = ('owner', 'amenities', 'reviews')
+    # Length of the stored geohash, set from GEOHASH_PRECISION by facade.configure
+    GEOHASH_PRECISION = 9
+    __table_args__ = (
+        db.Index('ix_places_created_at_id', 'created_at', 'id'),
+        db.Index('ix_places_price', 'price'),
+        # Prefix scans of a geohash cell, and its price bounds for place_clusters without table lookups
+        db.Index('ix_places_geohash_price', 'geohash', 'price'),
+        db.Index('ix_places_latitude_longitude', 'latitude', 'longitude'),
+    )
 
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(500), nullable=True)
     price = db.Column(db.Float, nullable=False)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    amenities = db.relationship('Amenity', secondary='amenities_places', backref='places', lazy='dynamic')
+    geohash = db.Column(db.String(MAX_PRECISION), nullable=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False, index=True)
+    amenities = db.relationship('Amenity', secondary='amenities_places', backref='places', lazy='select')
 
     owner = db.relationship('User', backref='places', lazy='select')
 
     @validates('title')
     def validate_title(self, key, value):
-        if not isinstance(value, str):
-            raise TypeError("Title must be a string")
-        if 10 < len(value) > 100:
-            raise ValueError("Title must be between 10 and 100 characters")
-        return value
+        return check_title(value)
     
     @validates('description')
     def validate_description(self, key, value):
-        if not isinstance(value, str):
-            raise TypeError("Description must be a string")
-        if len(value) > 500:
-            raise ValueError("Description must be less than or equal to 500 characters")
-        return value
+        return check_description(value)
     
     @validates('price')
     def validate_price(self, key, value):
-        if not isinstance(value, float) and not isinstance(value, int):
-            raise TypeError("Price must be a float")
-        if value <= 0:
-            raise ValueError("Price must be positive.")
-        return value
+        return check_price(value)
     
     @validates('latitude')
     def validate_latitude(self, key, value):
-        if not isinstance(value, float):
-            raise TypeError("Latitude must be a float")
-        if not -90 <= value <= 90:
-            raise ValueError("Latitude must be between -90 and 90.")
+        self._update_geohash(check_latitude(value), self.longitude)
         return value
     
     @validates('longitude')
     def validate_longitude(self, key, value):
-        if not isinstance(value, float):
-            raise TypeError("Longitude must be a float")
-        if not -180 <= value <= 180:
-            raise ValueError("Longitude must be between -180 and 180.")
+        self._update_geohash(self.latitude, check_longitude(value))
         return value
 
+    @classmethod
+    def build_row(cls, data):
+        """Validated column values for a new place, as the validators above would set them, geohash aside.
+
+        Lets bulk inserts check rows without building a Place per row.
+        """
+        unknown = data.keys() - CHECKS.keys()
+        if unknown:
+            raise TypeError(f"{min(unknown)!r} is an invalid keyword argument for Place")
+        missing = REQUIRED_FIELDS - data.keys()
+        if missing:
+            raise ValueError(f"{min(missing).capitalize()} is required")
+        row = {key: CHECKS[key](value) for key, value in data.items()}
+        row.setdefault('description', None)
+        return row
+
+    @classmethod
+    def add_geohashes(cls, rows):
+        """Set the geohash of rows from build_row, encoded in one batch"""
+        geohashes = encode_geohashes([row['latitude'] for row in rows], [row['longitude'] for row in rows],
+                                     cls.GEOHASH_PRECISION)
+        for row, geohash in zip(rows, geohashes):
+            row['geohash'] = geohash
+
+    def _update_geohash(self, latitude, longitude):
+        """Recompute the geohash once both coordinates are known"""
+        if latitude is not None and longitude is not None:
+            self.geohash = encode_geohash(latitude, longitude, self.GEOHASH_PRECISION)
+
     def add_review(self, review):
-        """Add a review to the place."""
-        self.reviews.append(review)
+        """Add a review to the place, unless the Review(place=...) backref already did."""
+        if review not in self.reviews:
+            self.reviews.append(review)
     
     def delete_review(self, review):
         """Add an amenity to the place."""
         self.reviews.remove(review)
 
     def add_amenity(self, amenity):
-        """Add an amenity to the place."""
-        self.amenities.append(amenity)
+        """Add an amenity to the place, once."""
+        if amenity not in self.amenities:
+            self.amenities.append(amenity)
 
     def to_dict(self):
         return {
@@ -75,7 +162,7 @@ class Place(BaseModel):
             'price': self.price,
             'latitude': self.latitude,
             'longitude': self.longitude,
-            'owner_id': self.owner.id
+            'owner_id': self.user_id
         }
     
     def to_dict_list(self):
@@ -90,3 +177,17 @@ class Place(BaseModel):
             'amenities': [amenity.to_dict() for amenity in self.amenities],
             'reviews': [review.to_dict() for review in self.reviews]
         }
+
+    def to_dict_sparse(self, fields=None, include=()):
+        """Serialize only the requested fields (all when None) plus the included relationships"""
+        fields = fields or self.FIELDS
+        data = {'id': self.id}
+        for field in fields:
+            data[field] = getattr(self, self.FIELDS[field])
+        if 'owner' in include:
+            data['owner'] = self.owner.to_dict()
+        if 'amenities' in include:
+            data['amenities'] = [amenity.to_dict() for amenity in self.amenities]
+        if 'reviews' in include:
+            data['reviews'] = [review.to_dict() for review in self.reviews]
+        return data
@@ -0,0 +1,155 @@
+from app import db
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, event
+from app.spatial.geohash import PREFIX_END
+
+# Geohash precisions aggregated in place_clusters: 7 (cells of about 150 m) is
+# the finest a map zoom asks for, see app.spatial.geohash.zoom_precision
+CLUSTER_PRECISIONS = tuple(range(1, 8))
+
+# Count, coordinate sums and price range of the places of each geohash cell, per
+# precision. Maintained by SQLite triggers, so kept out of db.metadata like places_rtree.
+place_clusters = Table(
+    'place_clusters', MetaData(),
+    Column('precision', Integer, primary_key=True),
+    Column('cell', String(7), primary_key=True),
+    Column('count', Integer, nullable=False),
+    Column('sum_lat', Float, nullable=False),
+    Column('sum_lon', Float, nullable=False),
+    Column('min_price', Float, nullable=False),
+    Column('max_price', Float, nullable=False)
+)
+
+_PRECISIONS = ' UNION ALL '.join(f'SELECT {precision} AS precision' for precision in CLUSTER_PRECISIONS)
+_TRIGGERS = ('trg_place_clusters_insert', 'trg_place_clusters_update', 'trg_place_clusters_delete')
+
+
+def _place(row):
+    """Columns of a trigger's new or old row as SQL expressions"""
+    return {column: f'{row}.{column}' for column in ('latitude', 'longitude', 'price', 'geohash')}
+
+
+def add_place_statements(place):
+    """SQL adding a place, {column: SQL expression}, to the cells of every precision"""
+    return [
+        f"INSERT INTO place_clusters SELECT precision, substr({place['geohash']}, 1, precision), 1, "
+        f"{place['latitude']}, {place['longitude']}, {place['price']}, {place['price']} FROM ({_PRECISIONS}) "
+        f"WHERE length({place['geohash']}) >= precision "
+        "ON CONFLICT(precision, cell) DO UPDATE SET count = count + 1, "
+        "sum_lat = sum_lat + excluded.sum_lat, sum_lon = sum_lon + excluded.sum_lon, "
+        "min_price = min(min_price, excluded.min_price), max_price = max(max_price, excluded.max_price)"
+    ]
+
+
+def add_places_statement(where='1'):
+    """SQL adding every place matching the where clause to its cells, in one grouped upsert"""
+    # Each coarser precision is grouped from the cells below it, so only the first sort sees places
+    finest = CLUSTER_PRECISIONS[-1]
+    levels = [
+        f"cells_{finest} AS (SELECT substr(geohash, 1, {finest}) AS cell, count(*) AS count, "
+        "sum(latitude) AS sum_lat, sum(longitude) AS sum_lon, min(price) AS min_price, max(price) AS max_price "
+        f"FROM places WHERE geohash IS NOT NULL AND ({where}) GROUP BY 1)"
+    ]
+    for precision in reversed(CLUSTER_PRECISIONS[:-1]):
+        levels.append(
+            f"cells_{precision} AS (SELECT substr(cell, 1, {precision}) AS cell, sum(count) AS count, "
+            "sum(sum_lat) AS sum_lat, sum(sum_lon) AS sum_lon, min(min_price) AS min_price, "
+            f"max(max_price) AS max_price FROM cells_{precision + 1} GROUP BY 1)"
+        )
+    cells = ' UNION ALL '.join(
+        f"SELECT {precision}, cell, count, sum_lat, sum_lon, min_price, max_price FROM cells_{precision} "
+        f"WHERE length(cell) = {precision}"
+        for precision in CLUSTER_PRECISIONS
+    )
+    return (
+        f"WITH {', '.join(levels)} INSERT INTO place_clusters {cells} "
+        "ON CONFLICT(precision, cell) DO UPDATE SET count = count + excluded.count, "
+        "sum_lat = sum_lat + excluded.sum_lat, sum_lon = sum_lon + excluded.sum_lon, "
+        "min_price = min(min_price, excluded.min_price), max_price = max(max_price, excluded.max_price)"
+    )
+
+
+def remove_place_statements(place):
+    """SQL taking a place out of its cells, one primary key lookup per precision"""
+    statements = []
+    # A price bound the place held is recomputed from the covering index ix_places_geohash_price
+    in_cell = f"geohash >= place_clusters.cell AND geohash < place_clusters.cell || '{PREFIX_END}'"
+    for precision in CLUSTER_PRECISIONS:
+        cell = (f"precision = {precision} AND cell = substr({place['geohash']}, 1, {precision}) "
+                f"AND length({place['geohash']}) >= {precision}")
+        statements.append(
+            "UPDATE place_clusters SET count = count - 1, "
+            f"sum_lat = sum_lat - {place['latitude']}, sum_lon = sum_lon - {place['longitude']}, "
+            f"min_price = CASE WHEN {place['price']} <= min_price "
+            f"THEN coalesce((SELECT min(price) FROM places WHERE {in_cell}), min_price) ELSE min_price END, "
+            f"max_price = CASE WHEN {place['price']} >= max_price "
+            f"THEN coalesce((SELECT max(price) FROM places WHERE {in_cell}), max_price) ELSE max_price END "
+            f"WHERE {cell}"
+        )
+        statements.append(f"DELETE FROM place_clusters WHERE {cell} AND count <= 0")
+    return statements
+
+
+def _trigger_body(*statements):
+    return ''.join(f'{statement}; ' for statement in statements)
+
+
+def create_place_clusters(connection):
+    """Create place_clusters if missing, filling it when it is new, and (re)create its sync triggers.
+
+    Skipped while places has no geohash column yet: init_db.py calls it
+    again once create_missing_columns added it.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(places)")}
+    if 'geohash' not in columns:
+        return
+    cluster_columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(place_clusters)")}
+    if 'dirty' in cluster_columns:
+        # From before the price bounds were kept exact by the triggers
+        connection.exec_driver_sql("DROP TABLE place_clusters")
+        cluster_columns = set()
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS place_clusters ("
+        "precision INTEGER NOT NULL, cell VARCHAR(7) NOT NULL, count INTEGER NOT NULL, "
+        "sum_lat FLOAT NOT NULL, sum_lon FLOAT NOT NULL, min_price FLOAT NOT NULL, max_price FLOAT NOT NULL, "
+        "PRIMARY KEY (precision, cell))"
+    )
+    for trigger in _TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    new, old = _place('new'), _place('old')
+    connection.exec_driver_sql(
+        "CREATE TRIGGER trg_place_clusters_insert AFTER INSERT ON places "
+        "WHEN new.geohash IS NOT NULL "
+        f"BEGIN {_trigger_body(*add_place_statements(new))}END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER trg_place_clusters_update "
+        "AFTER UPDATE OF latitude, longitude, geohash, price ON places BEGIN "
+        f"{_trigger_body(*remove_place_statements(old), *add_place_statements(new))}END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER trg_place_clusters_delete AFTER DELETE ON places "
+        f"WHEN old.geohash IS NOT NULL BEGIN {_trigger_body(*remove_place_statements(old))}END"
+    )
+    if not cluster_columns:
+        rebuild_place_clusters(connection)
+
+
+def rebuild_place_clusters(connection):
+    """Recompute every aggregate from places"""
+    if connection.dialect.name != 'sqlite':
+        return
+    connection.exec_driver_sql("DELETE FROM place_clusters")
+    connection.exec_driver_sql(add_places_statement())
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_clusters_after_create_all(target, connection, **kw):
+    create_place_clusters(connection)
+
+
+@event.listens_for(db.metadata, 'after_drop')
+def drop_clusters_after_drop_all(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("DROP TABLE IF EXISTS place_clusters")
@@ -0,0 +1,122 @@
+from app import db
+from app.models.entity_version import PLACE_COORDINATES
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, event
+
+# R*Tree over place coordinates. Kept out of db.metadata: create_all cannot
+# emit CREATE VIRTUAL TABLE.
+places_rtree = Table(
+    'places_rtree', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('min_lat', Float),
+    Column('max_lat', Float),
+    Column('min_lon', Float),
+    Column('max_lon', Float)
+)
+
+# Integer key of each place in places_rtree. places has a text primary key,
+# so its rowid is not stable (VACUUM may renumber it); an INTEGER PRIMARY
+# KEY is, and the place_id index finds the entry to update or delete.
+places_rtree_ids = Table(
+    'places_rtree_ids', MetaData(),
+    Column('rtree_id', Integer, primary_key=True),
+    Column('place_id', String(36), nullable=False, unique=True)
+)
+
+_TRIGGERS = ('trg_places_rtree_insert', 'trg_places_rtree_update', 'trg_places_rtree_delete')
+
+# Every trigger that changes places_rtree also bumps the coordinates counter of entity_versions
+_BUMP_COORDINATES = (
+    f"INSERT INTO entity_versions (name, version) VALUES ('{PLACE_COORDINATES}', 1) "
+    "ON CONFLICT(name) DO UPDATE SET version = version + 1; "
+)
+
+
+def _table_exists(connection, name):
+    return connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).first() is not None
+
+
+def index_places_statements(where):
+    """SQL indexing every place matching the where clause, in two set-based inserts.
+
+    Unlike the insert trigger it does not bump the coordinates counter.
+    """
+    return [
+        f"INSERT INTO places_rtree_ids (place_id) SELECT id FROM places WHERE {where} ORDER BY places.rowid",
+        "INSERT INTO places_rtree SELECT rtree_id, latitude, latitude, longitude, longitude "
+        f"FROM places JOIN places_rtree_ids ON place_id = places.id WHERE {where}"
+    ]
+
+
+def create_places_rtree(connection):
+    """Create places_rtree and its id mapping if missing, (re)create their sync triggers, and index places not in it yet.
+
+    Runs on every create_all, so init_db.py also indexes existing
+    databases and updates their triggers. An rtree from before
+    places_rtree_ids, keyed by places.rowid, is dropped and rebuilt.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    if not _table_exists(connection, 'places_rtree_ids'):
+        connection.exec_driver_sql("DROP TABLE IF EXISTS places_rtree")
+    for trigger in _TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS places_rtree_ids ("
+        "rtree_id INTEGER PRIMARY KEY, place_id VARCHAR(36) NOT NULL UNIQUE)"
+    )
+    connection.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS places_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+    )
+    # Inside a trigger, last_insert_rowid() is the rowid its own INSERT just made
+    connection.exec_driver_sql(
+        "CREATE TRIGGER trg_places_rtree_insert AFTER INSERT ON places BEGIN "
+        "INSERT INTO places_rtree_ids (place_id) VALUES (new.id); "
+        "INSERT INTO places_rtree VALUES (last_insert_rowid(), new.latitude, new.latitude, "
+        f"new.longitude, new.longitude); {_BUMP_COORDINATES}"
+        "END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER trg_places_rtree_update AFTER UPDATE OF latitude, longitude ON places BEGIN "
+        "UPDATE places_rtree SET min_lat = new.latitude, max_lat = new.latitude, "
+        "min_lon = new.longitude, max_lon = new.longitude "
+        f"WHERE id = (SELECT rtree_id FROM places_rtree_ids WHERE place_id = new.id); {_BUMP_COORDINATES}"
+        "END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER trg_places_rtree_delete AFTER DELETE ON places BEGIN "
+        "DELETE FROM places_rtree WHERE id = (SELECT rtree_id FROM places_rtree_ids WHERE place_id = old.id); "
+        f"DELETE FROM places_rtree_ids WHERE place_id = old.id; {_BUMP_COORDINATES}"
+        "END"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO places_rtree_ids (place_id) SELECT id FROM places "
+        "WHERE id NOT IN (SELECT place_id FROM places_rtree_ids)"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO places_rtree SELECT rtree_id, latitude, latitude, longitude, longitude "
+        "FROM places_rtree_ids JOIN places ON places.id = place_id "
+        "WHERE rtree_id NOT IN (SELECT id FROM places_rtree)"
+    )
+
+
+def rebuild_places_rtree(connection):
+    """Re-index every place from scratch"""
+    if connection.dialect.name != 'sqlite':
+        return
+    connection.exec_driver_sql("DROP TABLE IF EXISTS places_rtree")
+    connection.exec_driver_sql("DROP TABLE IF EXISTS places_rtree_ids")
+    create_places_rtree(connection)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_rtree_after_create_all(target, connection, **kw):
+    create_places_rtree(connection)
+
+
+@event.listens_for(db.metadata, 'after_drop')
+def drop_rtree_after_drop_all(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("DROP TABLE IF EXISTS places_rtree")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS places_rtree_ids")
@@ -4,13 +4,20 @@ from sqlalchemy.orm import validates
 
 class Review(BaseModel):
 	__tablename__ = 'reviews'
+	# Public field name -> column attribute, as returned by to_dict()
+	FIELDS = {'id': 'id', 'text': 'text', 'rating': 'rating', 'place_id': 'place_id', 'user_id': 'user_id'}
+	__table_args__ = (
+		db.Index('ix_reviews_created_at_id', 'created_at', 'id'),
+		# Leading user_id column also serves lookups by user
+		db.Index('uq_reviews_user_place', 'user_id', 'place_id', unique=True),
+	)
 
 	text = db.Column(db.String(500), nullable=False)
 	rating = db.Column(db.Integer, nullable=False)
-	place_id = db.Column(db.String(36), db.ForeignKey('places.id'), nullable=False)
+	place_id = db.Column(db.String(36), db.ForeignKey('places.id'), nullable=False, index=True)
 	user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
 	
-	place = db.relationship('Place', backref=db.backref('reviews', lazy='dynamic'), lazy='select')
+	place = db.relationship('Place', backref=db.backref('reviews', lazy='select'), lazy='select')
 	user = db.relationship('User', backref=db.backref('reviews', lazy='dynamic'), lazy='select')
 
 	@validates('text')
@@ -34,6 +41,6 @@ class Review(BaseModel):
 			'id': self.id,
 			'text': self.text,
 			'rating': self.rating,
-			'place_id': self.place.id,
-			'user_id': self.user.id
+			'place_id': self.place_id,
+			'user_id': self.user_id
 		}
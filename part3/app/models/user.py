@@ -5,6 +5,11 @@ from sqlalchemy.orm import validates
 
 class User(BaseModel):
     __tablename__ = 'users'
+    # Public field name -> column attribute, as returned by to_dict()
+    FIELDS = {'id': 'id', 'first_name': 'first_name', 'last_name': 'last_name', 'email': 'email'}
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
     emails = set()
 
     first_name = db.Column(db.String(50), nullable=False)
@@ -1,7 +1,320 @@
+from math import sqrt
 from app.models.place import Place
+from app.models.amenities_places import AmenityPlace
+from app.models.amenity import Amenity
+from app.models.review import Review
+from app.models.user import User
+from app.models.place_rtree import index_places_statements, places_rtree, places_rtree_ids
+from app.models.place_cluster import add_places_statement, place_clusters
+from app.models.entity_version import PLACE_COORDINATES
+from app.spatial.geo import bounding_boxes, haversine_km
+from app.spatial.geohash import PREFIX_END, bounds, cells_in_box, count_cells_in_box, covering_cells, \
+    encode_many as encode_geohashes, overlaps
+from app.spatial.polygon import contains
+from sqlalchemy import bindparam, func, inspect, or_, select, text, tuple_, union, update
+from sqlalchemy.orm import load_only, selectinload
 from app import db
-from app.persistence.repository import SQLAlchemyRepository
+from app.persistence.repository import SQLAlchemyRepository, bump_written_versions, decode_cursor, encode_key, \
+    get_table_versions, moved, unit_of_work
+
+# nearby() searches circles from NEARBY_FIRST_RADIUS of the requested radius, NEARBY_GROWTH times larger
+# each step until one holds a place, then sized from the density found so far
+NEARBY_FIRST_RADIUS = 1 / 64
+NEARBY_GROWTH = 4
 
 class PlaceRepository(SQLAlchemyRepository):
     def __init__(self):
         super().__init__(Place)
+
+    def with_relations(self):
+        """Query loading owner, amenities and reviews with one extra IN query each"""
+        return self.model.query.options(
+            selectinload(self.model.owner),
+            selectinload(self.model.amenities),
+            selectinload(self.model.reviews)
+        )
+
+    def sparse(self, fields=None, include=()):
+        """Query loading only the requested columns and relationships"""
+        place = self.model
+        options = [selectinload(getattr(place, name)) for name in include]
+        if fields:
+            columns = {place.id, place.created_at}
+            columns.update(getattr(place, place.FIELDS[field]) for field in fields)
+            if 'owner' in include:
+                columns.add(place.user_id)
+            options.append(load_only(*columns))
+        return place.query.options(*options)
+
+    def filtered(self, query, min_price=None, max_price=None, amenities=(), min_rating=None):
+        """Add the list filters to query as SQL predicates.
+
+        Price bounds use ix_places_price, each amenity an IN over
+        ix_amenities_places_amenity_id, and min_rating compares the average
+        rating read through ix_reviews_place_id; places without reviews
+        never match min_rating.
+        """
+        place = self.model
+        if min_price is not None:
+            query = query.filter(place.price >= min_price)
+        if max_price is not None:
+            query = query.filter(place.price <= max_price)
+        for amenity_id in amenities:
+            query = query.filter(place.id.in_(
+                select(AmenityPlace.place_id).where(AmenityPlace.amenity_id == amenity_id)))
+        if min_rating is not None:
+            query = query.filter(select(func.avg(Review.rating)).where(Review.place_id == place.id)
+                                 .scalar_subquery() >= min_rating)
+        return query
+
+    def get_sparse(self, place_id, fields=None, include=()):
+        return self.sparse(fields, include).filter(self.model.id == place_id).first()
+
+    def get_page_sparse(self, limit, after=None, fields=None, include=(), filters=None):
+        return self.get_page(limit, after, self.filtered(self.sparse(fields, include), **(filters or {})))
+
+    def get_many_with_relations(self, ids):
+        return self.get_many(ids, self.with_relations())
+
+    def get_many_sparse(self, ids, fields=None, include=()):
+        return self.get_many(ids, self.sparse(fields, include))
+
+    def nearby(self, lat, lon, radius_km, limit, query=None):
+        """[(place, distance_km)] of the limit nearest places within radius_km of (lat, lon), nearest first"""
+        # Every place closer than a circle's radius is among its hits, so the first circle holding limit
+        # places has the answer: a large radius only costs a wide scan where places are sparse
+        search_km = radius_km * NEARBY_FIRST_RADIUS
+        while True:
+            search_km = min(search_km, radius_km)
+            hits = self.hits_within(lat, lon, search_km)
+            if len(hits) >= limit or search_km == radius_km:
+                break
+            # A circle holds places in proportion to its area; the margin covers uneven spreads
+            search_km *= 1.5 * sqrt(limit / len(hits)) if hits else NEARBY_GROWTH
+        hits = hits[:limit]
+        found = self.get_many([place_id for _, place_id in hits], query)
+        return [(found[place_id], distance) for distance, place_id in hits if place_id in found]
+
+    def hits_within(self, lat, lon, radius_km):
+        """Sorted [(distance_km, place_id)] within radius_km, from the candidates of places_rtree or the geohash index"""
+        if db.engine.dialect.name == 'sqlite':
+            candidates = self.rtree_candidates(lat, lon, radius_km)
+        else:
+            candidates = self.geohash_candidates(lat, lon, radius_km)
+        hits = ((haversine_km(lat, lon, row.latitude, row.longitude), row.id) for row in candidates)
+        return sorted(hit for hit in hits if hit[0] <= radius_km)
+
+    def rtree_candidates(self, lat, lon, radius_km):
+        """(id, latitude, longitude) rows in the bounding boxes of the circle, through places_rtree"""
+        place = self.model
+        candidates = []
+        for min_lat, max_lat, min_lon, max_lon in bounding_boxes(lat, lon, radius_km):
+            candidates.extend(db.session.execute(
+                select(place.id, place.latitude, place.longitude)
+                .select_from(places_rtree)
+                .join(places_rtree_ids, places_rtree_ids.c.rtree_id == places_rtree.c.id)
+                .join(place.__table__, place.id == places_rtree_ids.c.place_id)
+                .where(places_rtree.c.max_lat >= min_lat, places_rtree.c.min_lat <= max_lat,
+                       places_rtree.c.max_lon >= min_lon, places_rtree.c.min_lon <= max_lon)
+            ))
+        return candidates
+
+    def geohash_candidates(self, lat, lon, radius_km):
+        """(id, latitude, longitude) rows in the geohash cells covering the circle.
+
+        Each cell is a range scan on ix_places_geohash_price: every hash starting
+        with the cell sorts within [cell, cell + PREFIX_END). Without a
+        covering precision (huge radius, circle over a pole) every place is
+        a candidate.
+        """
+        place = self.model
+        statement = select(place.id, place.latitude, place.longitude)
+        cells = covering_cells(lat, lon, radius_km, place.GEOHASH_PRECISION)
+        if cells:
+            statement = statement.where(or_(*(
+                (place.geohash >= cell) & (place.geohash < cell + PREFIX_END) for cell in cells
+            )))
+        return db.session.execute(statement).all()
+
+    def in_boxes(self, statement, boxes):
+        """Restrict a select on places to the (min_lat, max_lat, min_lon, max_lon) boxes.
+
+        On SQLite the boxes are looked up in places_rtree, elsewhere they are
+        ranges on ix_places_latitude_longitude.
+        """
+        place = self.model
+        if db.engine.dialect.name == 'sqlite':
+            rtree = places_rtree.c
+            return statement.where(place.id.in_(
+                select(places_rtree_ids.c.place_id).where(places_rtree_ids.c.rtree_id.in_(union(*(
+                    select(rtree.id).where(rtree.max_lat >= min_lat, rtree.min_lat <= max_lat,
+                                           rtree.max_lon >= min_lon, rtree.min_lon <= max_lon)
+                    for min_lat, max_lat, min_lon, max_lon in boxes
+                ))))
+            ))
+        return statement.where(or_(*(
+            place.latitude.between(min_lat, max_lat) & place.longitude.between(min_lon, max_lon)
+            for min_lat, max_lat, min_lon, max_lon in boxes
+        )))
+
+    def within(self, boxes, rings=None, limit=100, after=None, query=None, chunk_size=1000):
+        """Page of places inside the boxes and, when given, the polygon rings, and the next cursor.
+
+        Candidates come from the box index in (created_at, id) order as bare
+        (id, latitude, longitude) rows, chunk_size at a time; each chunk goes
+        through the vectorized point-in-polygon test until a page is full,
+        and only the places of that page are loaded.
+        """
+        place = self.model
+        statement = self.in_boxes(select(place.id, place.latitude, place.longitude, place.created_at), boxes)
+        if after:
+            statement = statement.where(tuple_(place.created_at, place.id) > tuple_(*decode_cursor(after)))
+        statement = statement.order_by(place.created_at, place.id)
+        if rings is None:
+            statement = statement.limit(limit + 1)
+        matched = []
+        result = db.session.execute(statement)
+        for rows in result.partitions(chunk_size):
+            if rings is not None:
+                inside = contains(rings, [row.latitude for row in rows], [row.longitude for row in rows])
+                rows = [row for row, hit in zip(rows, inside) if hit]
+            matched.extend(rows)
+            if len(matched) > limit:
+                break
+        result.close()
+        last = matched[limit - 1] if len(matched) > limit else None
+        next_cursor = encode_key(last.created_at, last.id) if last else None
+        matched = matched[:limit]
+        found = self.get_many([row.id for row in matched], query)
+        return [found[row.id] for row in matched if row.id in found], next_cursor
+
+    def clusters(self, boxes, precision):
+        """[{cell, count, latitude, longitude, min_price, max_price}] of the geohash cells in the boxes"""
+        # place_clusters is only kept by SQLite triggers: elsewhere the places are grouped on the fly
+        if db.engine.dialect.name != 'sqlite':
+            return self._group_clusters(boxes, precision)
+        # Range scans under the few coarser cells covering the boxes, rather
+        # than encoding and looking up every cell of the viewport
+        coarse = precision
+        while coarse > 1 and sum(count_cells_in_box(*box, coarse) for box in boxes) > 64:
+            coarse -= 1
+        prefixes = sorted({cell for box in boxes for cell in cells_in_box(*box, coarse)})
+        table = place_clusters.c
+        rows = []
+        for prefix in prefixes:
+            rows.extend(row for row in db.session.execute(
+                select(place_clusters).where(table.precision == precision, table.cell >= prefix,
+                                             table.cell < prefix + PREFIX_END)
+            ).mappings() if overlaps(bounds(row['cell']), boxes))
+        return [{
+            'cell': row['cell'],
+            'count': row['count'],
+            'latitude': row['sum_lat'] / row['count'],
+            'longitude': row['sum_lon'] / row['count'],
+            'min_price': row['min_price'],
+            'max_price': row['max_price']
+        } for row in rows]
+
+    def _group_clusters(self, boxes, precision):
+        place = self.model
+        cell = func.substr(place.geohash, 1, precision)
+        statement = self.in_boxes(select(
+            cell, func.count(), func.avg(place.latitude), func.avg(place.longitude),
+            func.min(place.price), func.max(place.price)
+        ), boxes).where(place.geohash.is_not(None)).group_by(cell)
+        return [{
+            'cell': row[0],
+            'count': row[1],
+            'latitude': row[2],
+            'longitude': row[3],
+            'min_price': row[4],
+            'max_price': row[5]
+        } for row in db.session.execute(statement)]
+
+    def update_geohashes(self, precision=None, only_missing=True, batch_size=1000):
+        """Compute the geohash of places saved without one (or of every place), returns the count.
+
+        Needed for rows written before the column existed, or after a change
+        of GEOHASH_PRECISION when only_missing is False.
+        """
+        place = self.model
+        precision = precision or place.GEOHASH_PRECISION
+        statement = select(place.id, place.latitude, place.longitude)
+        if only_missing:
+            statement = statement.where(place.geohash.is_(None))
+        places = db.session.execute(statement).all()
+        geohashes = encode_geohashes([row.latitude for row in places], [row.longitude for row in places], precision)
+        rows = [{'row_id': row.id, 'geohash': geohash} for row, geohash in zip(places, geohashes)]
+        table = place.__table__
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('row_id')).values(geohash=bindparam('geohash')),
+                rows[start:start + batch_size]
+            )
+        if rows:
+            bump_written_versions({table.name: 1})
+        self.commit()
+        return len(rows)
+
+    def insert_many(self, rows, chunk_size=500, table=None):
+        """insert_many, then index and cluster the new places set-based, in place of their dropped insert triggers"""
+        if table not in (None, self.model.__table__) or db.session.connection().dialect.name != 'sqlite':
+            return super().insert_many(rows, chunk_size, table)
+        with unit_of_work():
+            # New rowids always exceed the largest one, whether or not the rows carry an id
+            last_rowid = db.session.execute(text("SELECT coalesce(max(rowid), 0) FROM places")).scalar()
+            super().insert_many(rows, chunk_size)
+            new_places = {'last_rowid': last_rowid}
+            for statement in (*index_places_statements('places.rowid > :last_rowid'),
+                              add_places_statement('places.rowid > :last_rowid')):
+                db.session.execute(text(statement), new_places)
+
+    def written_versions(self, table, rows):
+        versions = super().written_versions(table, rows)
+        if table is self.model.__table__:
+            versions[PLACE_COORDINATES] = len(rows)
+        return versions
+
+    def get_coordinates_version(self):
+        """Counter of places inserted, moved or deleted, see PlaceIndex"""
+        return get_table_versions(PLACE_COORDINATES)[0]
+
+    def moved(self, place):
+        """True when the pending changes of place touch its coordinates"""
+        return moved(inspect(place))
+
+    def get_coordinates(self):
+        """(id, latitude, longitude) of every place, without loading ORM objects"""
+        place = self.model
+        return db.session.execute(select(place.id, place.latitude, place.longitude)).all()
+
+    def get_with_relations(self, place_id):
+        return self.with_relations().filter(self.model.id == place_id).first()
+
+    def get_page_with_relations(self, limit, after=None, filters=None):
+        return self.get_page(limit, after, self.filtered(self.with_relations(), **(filters or {})))
+
+    def stream_with_relations(self, batch_size=1000, updated_since=None):
+        return self.stream(batch_size, updated_since, self.with_relations())
+
+    def add_amenity_links(self, links, chunk_size=500):
+        """Insert (place_id, amenity_id) rows of the association table"""
+        self.insert_many(links, chunk_size, AmenityPlace.__table__)
+
+    def get_version(self, place_id):
+        """Version of a place and of everything to_dict_list() embeds, in one query"""
+        place = self.model
+        row = db.session.query(
+            place.id,
+            place.updated_at,
+            select(User.updated_at).where(User.id == place.user_id).scalar_subquery(),
+            select(func.count(Review.id)).where(Review.place_id == place.id).scalar_subquery(),
+            select(func.max(Review.updated_at)).where(Review.place_id == place.id).scalar_subquery(),
+            select(func.count()).select_from(AmenityPlace).where(AmenityPlace.place_id == place.id).scalar_subquery(),
+            select(func.max(Amenity.updated_at)).join_from(AmenityPlace, Amenity)
+            .where(AmenityPlace.place_id == place.id).scalar_subquery()
+        ).filter(place.id == place_id).first()
+        return tuple(row) if row else None
+
+    def get_collection_version(self):
+        return get_table_versions('places', 'users', 'amenities', 'reviews', 'amenities_places')
@@ -1,5 +1,135 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from sqlalchemy import event, insert, inspect, select, tuple_
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
 from app import db
+from app.models.entity_version import PLACE_COORDINATES, EntityVersion, bump_table_versions, has_version_triggers
+from app.persistence.cache import EntityCache
+from app.persistence.sqlite import insert_triggers_dropped
+
+# Read-through caches by model class, see SQLAlchemyRepository.enable_cache
+entity_caches = {}
+
+
+def encode_cursor(obj):
+    """Build an opaque cursor pointing just after obj in (created_at, id) order"""
+    return encode_key(obj.created_at, obj.id)
+
+
+def encode_key(created_at, obj_id):
+    key = f"{created_at.isoformat()}|{obj_id}"
+    return urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) pair stored in a cursor"""
+    try:
+        created_at, obj_id = urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+        return datetime.fromisoformat(created_at), obj_id
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+
+@contextmanager
+def unit_of_work():
+    """Run a block of repository writes as a single flush and commit.
+
+    Repositories only stage their changes while a unit of work is open; the
+    outermost block commits once on success and rolls everything back if
+    anything inside it raises. Nested blocks join the outer one.
+    """
+    session = db.session
+    if session.info.get('unit_of_work'):
+        yield session
+        return
+    session.info['unit_of_work'] = True
+    try:
+        with session.no_autoflush:
+            yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.info.pop('unit_of_work', None)
+
+
+@event.listens_for(Session, 'after_flush')
+def evict_flushed_entities(session, flush_context):
+    """Evict rows written by a flush, and remember them to evict again on commit"""
+    evicted = session.info.setdefault('evicted_entities', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        cache = entity_caches.get(type(obj))
+        identity = inspect(obj).identity
+        if cache is not None and identity:
+            cache.invalidate(identity[0])
+            evicted.add((type(obj), identity[0]))
+
+
+@event.listens_for(Session, 'after_commit')
+def evict_committed_entities(session):
+    # Another request may have cached the old row between our flush and commit
+    for model, obj_id in session.info.pop('evicted_entities', ()):
+        if model in entity_caches:
+            entity_caches[model].invalidate(obj_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def forget_evicted_entities(session, previous_transaction):
+    session.info.pop('evicted_entities', None)
+
+
+@event.listens_for(Session, 'after_flush')
+def bump_flushed_versions(session, flush_context):
+    """Bump entity_versions for the tables a flush wrote, where no trigger does it"""
+    connection = session.connection()
+    if has_version_triggers(connection):
+        return
+    bump_table_versions(connection, flushed_versions(session))
+
+
+def flushed_versions(session):
+    """{counter name: increment} for the pending flush: 1 per table written, association tables
+    included, plus 1 per place inserted, moved or deleted for PLACE_COORDINATES"""
+    increments = {}
+    deleted = set(session.deleted)
+    for obj in list(session.new) + list(deleted) + list(session.dirty):
+        state = inspect(obj)
+        table = state.mapper.local_table.name
+        # A changed one-to-many collection writes the other side's table, not this one
+        if obj not in session.dirty or session.is_modified(obj, include_collections=False):
+            increments[table] = 1
+        if table == 'places' and (obj not in session.dirty or moved(state)):
+            increments[PLACE_COORDINATES] = increments.get(PLACE_COORDINATES, 0) + 1
+        for relationship in state.mapper.relationships:
+            if relationship.secondary is None:
+                continue
+            if obj in deleted or state.attrs[relationship.key].history.has_changes():
+                increments[relationship.secondary.name] = 1
+    return increments
+
+
+def moved(state):
+    """True when the pending changes of a place's instance state touch its coordinates"""
+    return state.attrs.latitude.history.has_changes() or state.attrs.longitude.history.has_changes()
+
+
+def bump_written_versions(increments):
+    """Bump entity_versions after Core writes, which neither the ORM hook nor (elsewhere than SQLite) a trigger sees"""
+    connection = db.session.connection()
+    if not has_version_triggers(connection):
+        bump_table_versions(connection, increments)
+
+
+def get_table_versions(*tables):
+    """Write counters of the given tables, in order, with a single query"""
+    rows = dict(db.session.query(EntityVersion.name, EntityVersion.version).filter(EntityVersion.name.in_(tables)))
+    return tuple(rows.get(table, 0) for table in tables)
+
 
 class Repository(ABC):
     @abstractmethod
@@ -14,6 +144,14 @@ class Repository(ABC):
     def get_all(self):
         pass
 
+    @abstractmethod
+    def get_page(self, limit, after=None):
+        pass
+
+    @abstractmethod
+    def get_many(self, ids):
+        pass
+
     @abstractmethod
     def update(self, obj_id, data):
         pass
@@ -40,6 +178,17 @@ class InMemoryRepository(Repository):
     def get_all(self):
         return list(self._storage.values())
 
+    def get_page(self, limit, after=None):
+        objs = sorted(self._storage.values(), key=lambda obj: (obj.created_at, obj.id))
+        if after:
+            key = decode_cursor(after)
+            objs = [obj for obj in objs if (obj.created_at, obj.id) > key]
+        next_cursor = encode_cursor(objs[limit - 1]) if len(objs) > limit else None
+        return objs[:limit], next_cursor
+
+    def get_many(self, ids):
+        return {obj_id: self._storage[obj_id] for obj_id in ids if obj_id in self._storage}
+
     def update(self, obj_id, data):
         obj = self.get(obj_id)
         if obj:
@@ -56,30 +205,165 @@ class InMemoryRepository(Repository):
 class SQLAlchemyRepository(Repository):
     def __init__(self, model):
         self.model = model
+        self.cache = None
+
+    def enable_cache(self, maxsize=1024, ttl=60):
+        """Serve get() from a per-process read-through cache"""
+        self.cache = EntityCache(maxsize, ttl)
+        entity_caches[self.model] = self.cache
+
+    def disable_cache(self):
+        self.cache = None
+        entity_caches.pop(self.model, None)
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache else None
+
+    def _snapshot(self, obj):
+        state = inspect(obj)
+        return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+    def _from_snapshot(self, snapshot):
+        """Attach a persistent instance rebuilt from cached column values, without a query"""
+        obj = inspect(self.model).class_manager.new_instance()
+        for key, value in snapshot.items():
+            set_committed_value(obj, key, value)
+        make_transient_to_detached(obj)
+        db.session.add(obj)
+        return obj
+
+    def commit(self):
+        """Commit now unless the write belongs to an open unit of work"""
+        if not db.session.info.get('unit_of_work'):
+            db.session.commit()
 
     def add(self, obj):
         db.session.add(obj)
-        db.session.commit()
+        self.commit()
 
     def get(self, obj_id):
-        return self.model.query.get(obj_id)
+        if obj_id is None:
+            return None
+        if self.cache is None:
+            return db.session.get(self.model, obj_id)
+        obj = db.session.identity_map.get(identity_key(self.model, obj_id))
+        if obj is not None:
+            return obj
+        snapshot = self.cache.get(obj_id)
+        if snapshot is not None:
+            return self._from_snapshot(snapshot)
+        obj = db.session.get(self.model, obj_id)
+        if obj is not None:
+            self.cache.set(obj_id, self._snapshot(obj))
+        return obj
 
     def get_all(self):
         return self.model.query.all()
 
+    def get_page(self, limit, after=None, query=None):
+        """Return up to limit objects following the cursor, and the cursor of the next page.
+
+        Rows are walked in (created_at, id) order so each page is a range scan on
+        the matching index, whatever the depth of the cursor.
+        """
+        if query is None:
+            query = self.model.query
+        if after:
+            query = query.filter(tuple_(self.model.created_at, self.model.id) > tuple_(*decode_cursor(after)))
+        objs = query.order_by(self.model.created_at, self.model.id).limit(limit + 1).all()
+        next_cursor = encode_cursor(objs[limit - 1]) if len(objs) > limit else None
+        return objs[:limit], next_cursor
+
+    def get_page_rows(self, limit, after=None, fields=None):
+        """Same page as get_page, as plain dicts of the model's FIELDS.
+
+        A Core select of just those columns: rows are never hydrated into
+        ORM instances, so the identity map, attribute instrumentation and
+        @validates hooks are skipped. For read-only list responses.
+        """
+        model = self.model
+        fields = fields or model.FIELDS
+        statement = select(*(getattr(model, model.FIELDS[field]) for field in fields),
+                           model.created_at, model.id)
+        if after:
+            statement = statement.where(tuple_(model.created_at, model.id) > tuple_(*decode_cursor(after)))
+        statement = statement.order_by(model.created_at, model.id).limit(limit + 1)
+        rows = db.session.execute(statement).all()
+        next_cursor = encode_key(*rows[limit - 1][-2:]) if len(rows) > limit else None
+        return [dict(zip(fields, row)) for row in rows[:limit]], next_cursor
+
+    def get_version(self, obj_id):
+        """Return (id, updated_at) of a row without loading the object, None when absent"""
+        row = db.session.query(self.model.id, self.model.updated_at).filter(self.model.id == obj_id).first()
+        return tuple(row) if row else None
+
+    def get_collection_version(self):
+        return get_table_versions(self.model.__tablename__)
+
+    def stream(self, batch_size=1000, updated_since=None, query=None):
+        """Iterate over every row in (created_at, id) order, fetching batch_size rows at a time"""
+        if query is None:
+            query = self.model.query
+        if updated_since is not None:
+            query = query.filter(self.model.updated_at >= updated_since)
+        return query.order_by(self.model.created_at, self.model.id).yield_per(batch_size)
+
+    def get_many(self, ids, query=None, chunk_size=500):
+        """Return {id: object} for the ids that exist, one IN query per chunk"""
+        if query is None:
+            query = self.model.query
+        ids = list(dict.fromkeys(ids))
+        found = {}
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            found.update((obj.id, obj) for obj in query.filter(self.model.id.in_(chunk)))
+        return found
+
+    def get_existing_ids(self, ids, chunk_size=500):
+        """Return the subset of ids present in the table, one IN query per chunk"""
+        ids = list(set(ids))
+        found = set()
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            found.update(row[0] for row in db.session.query(self.model.id).filter(self.model.id.in_(chunk)))
+        return found
+
+    def insert_many(self, rows, chunk_size=500, table=None):
+        """Insert plain row dicts with executemany, bypassing ORM object bookkeeping and per-row insert triggers"""
+        table = self.model.__table__ if table is None else table
+        with unit_of_work():
+            connection = db.session.connection()
+            with insert_triggers_dropped(connection, table.name):
+                for start in range(0, len(rows), chunk_size):
+                    self.insert_chunk(table, rows[start:start + chunk_size])
+            if rows:
+                bump_table_versions(connection, self.written_versions(table, rows))
+
+    def insert_chunk(self, table, rows):
+        """One executemany of insert_many, overridden where a chunk needs more than the insert"""
+        db.session.execute(insert(table), rows)
+
+    def written_versions(self, table, rows):
+        """{counter name: increment} for rows inserted into table by insert_many"""
+        return {table.name: 1}
+
     def update(self, obj_id, data):
         obj = self.get(obj_id)
         if obj:
             for key, value in data.items():
                 setattr(obj, key, value)
-            db.session.commit()
+            self.commit()
+            if self.cache:
+                self.cache.invalidate(obj_id)
         return obj
 
     def delete(self, obj_id):
         obj = self.get(obj_id)
         if obj:
             db.session.delete(obj)
-            db.session.commit()
+            self.commit()
+            if self.cache:
+                self.cache.invalidate(obj_id)
 
     def get_by_attribute(self, attr_name, attr_value):
         return self.model.query.filter_by(**{attr_name: attr_value}).first()
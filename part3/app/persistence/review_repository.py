@@ -1,7 +1,13 @@
 from app.models.review import Review
+from sqlalchemy import exists
 from app import db
 from app.persistence.repository import SQLAlchemyRepository
 
 class ReviewRepository(SQLAlchemyRepository):
     def __init__(self):
         super().__init__(Review)
+
+    def exists_for_user_and_place(self, user_id, place_id):
+        """Indexed probe on uq_reviews_user_place"""
+        query = exists().where(self.model.user_id == user_id, self.model.place_id == place_id)
+        return db.session.query(query).scalar()
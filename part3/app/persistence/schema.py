@@ -0,0 +1,48 @@
+from sqlalchemy import inspect
+from app import db
+
+
+def create_missing_indexes(engine=None):
+    """Create the indexes declared on the models that an existing database lacks.
+
+    db.create_all() skips tables that already exist, so indexes added to the
+    models later never reach older databases without this. Returns the names
+    of the indexes created.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+    return created
+
+
+def create_missing_columns(engine=None):
+    """Add the nullable columns declared on the models that an existing table lacks.
+
+    Same gap as create_missing_indexes, for columns: run it first so the
+    indexes on new columns can be created. Returns 'table.column' names.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+            created.append(f'{table.name}.{column.name}')
+    return created
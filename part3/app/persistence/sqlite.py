@@ -0,0 +1,52 @@
+import re
+import sqlite3
+from contextlib import contextmanager
+from sqlalchemy.engine import make_url
+
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+
+
+class PragmaConnection(sqlite3.Connection):
+    """sqlite3 connection that runs the PRAGMA statements passed as connect_args['pragmas']"""
+    def __init__(self, *args, pragmas=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, value in (pragmas or {}).items():
+            self.execute(f'PRAGMA {name}={value}')
+
+
+def sqlite_engine_options(uri, options):
+    """SQLALCHEMY_ENGINE_OPTIONS with connect_args['pragmas'] run by PragmaConnection, or dropped for other engines"""
+    options = dict(options or {})
+    connect_args = dict(options.get('connect_args', {}))
+    pragmas = connect_args.pop('pragmas', None)
+    if pragmas and make_url(uri).get_backend_name() == 'sqlite':
+        for name in pragmas:
+            if not PRAGMA_NAME.match(name):
+                raise ValueError(f"Invalid SQLite pragma: {name}")
+        connect_args.update(factory=PragmaConnection, pragmas=pragmas)
+    if 'connect_args' in options:
+        options['connect_args'] = connect_args
+    return options
+
+
+@contextmanager
+def insert_triggers_dropped(connection, table):
+    """Drop the trg_*_insert triggers of a SQLite table for the block, recreating them in the same transaction"""
+    # Any AFTER INSERT trigger, even one whose WHEN clause is false, about doubles the cost of an executemany.
+    # SQLite DDL is transactional and the write lock is held until commit: no other connection writes
+    # while the triggers are gone, and a rollback restores them.
+    if connection.dialect.name != 'sqlite':
+        yield
+        return
+    if not connection.connection.driver_connection.in_transaction:
+        # pysqlite only opens a transaction before DML; the DROP would otherwise commit at once
+        connection.exec_driver_sql("BEGIN")
+    triggers = connection.exec_driver_sql(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ? AND name GLOB 'trg_*_insert'",
+        (table,)
+    ).all()
+    for name, _ in triggers:
+        connection.exec_driver_sql(f"DROP TRIGGER {name}")
+    yield
+    for _, sql in triggers:
+        connection.exec_driver_sql(sql)
@@ -1,3 +1,6 @@
+import uuid
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 from app.models.user import User
 from app.models.amenity import Amenity
 from app.models.place import Place
@@ -7,6 +10,11 @@ from app.persistence.user_repository import UserRepository
 from app.persistence.amenity_repository import AmenityRepository
 from app.persistence.place_repository import PlaceRepository
 from app.persistence.review_repository import ReviewRepository
+from app.persistence.repository import unit_of_work
+from app.services.generations import Generations
+from app.services.place_index import PlaceIndex
+from app.services.singleflight import SingleFlight
+from app.spatial.geohash import MAX_PRECISION
 
 class HBnBFacade:
     def __init__(self):
@@ -14,29 +22,99 @@ class HBnBFacade:
         self.amenity_repo = AmenityRepository()
         self.place_repo = PlaceRepository()
         self.review_repo = ReviewRepository()
+        self.flights = SingleFlight()
+        self.place_index = PlaceIndex(self.place_repo)
+        # Place lists embed owners, amenities and reviews
+        self.generations = Generations({'user': ('place',), 'amenity': ('place',), 'review': ('place',)})
+
+    def configure(self, config):
+        """Apply per-application settings, such as REPOSITORY_CACHE, SINGLEFLIGHT_TIMEOUT and GEOHASH_PRECISION"""
+        caches = config.get('REPOSITORY_CACHE', {})
+        for name in ('user', 'amenity', 'place', 'review'):
+            repo = getattr(self, f'{name}_repo')
+            if name in caches:
+                repo.enable_cache(**caches[name])
+            else:
+                repo.disable_cache()
+        self.flights.timeout = config.get('SINGLEFLIGHT_TIMEOUT', 5.0)
+        self.place_index.background = config.get('PLACE_INDEX_BACKGROUND_RELOAD', True)
+        self.place_index.reset()
+        precision = config.get('GEOHASH_PRECISION', 9)
+        if not 1 <= precision <= MAX_PRECISION:
+            raise ValueError(f'GEOHASH_PRECISION must be between 1 and {MAX_PRECISION}')
+        Place.GEOHASH_PRECISION = precision
+
+    def get_version(self, name, obj_id):
+        """Cheap version of one user, amenity, place or review, None when it does not exist"""
+        return getattr(self, f'{name}_repo').get_version(obj_id)
+
+    def get_collection_version(self, name):
+        return getattr(self, f'{name}_repo').get_collection_version()
+
+    def get_place_index_version(self):
+        """Coordinates counter the nearest-place index is current with, None before its first tree"""
+        return self.place_index.version
+
+    def get_collection_generation(self, name):
+        """Count of writes made through this facade to the collection or to what it embeds"""
+        return self.generations.get(name)
+
+    @staticmethod
+    def _in_request_order(ids, found):
+        """Objects of found in the order of ids, and the ids that were not found"""
+        ids = list(dict.fromkeys(ids))
+        return [found[obj_id] for obj_id in ids if obj_id in found], \
+            [obj_id for obj_id in ids if obj_id not in found]
+
+    def coalesce(self, key, fn, timeout=None):
+        """Share one run of fn among concurrent callers with the same key, see SingleFlight"""
+        return self.flights.do(key, fn, timeout)
+
+    def stats(self):
+        return {
+            'repository_cache': {
+                name: getattr(self, f'{name}_repo').cache_stats()
+                for name in ('user', 'amenity', 'place', 'review')
+            },
+            'singleflight': self.flights.stats(),
+            'place_index': self.place_index.stats()
+        }
 
     # USER
     def create_user(self, user_data):
         user = User(**user_data)
         self.user_repo.add(user)
+        self.generations.bump('user')
         return user
     
     def get_users(self):
         return self.user_repo.get_all()
 
+    def get_users_page(self, limit, after=None):
+        return self.user_repo.get_page(limit, after)
+
+    def get_users_rows(self, limit, after=None):
+        """Page of users as plain dicts, for read-only list responses"""
+        return self.user_repo.get_page_rows(limit, after)
+
     def get_user(self, user_id):
         return self.user_repo.get(user_id)
 
+    def get_users_many(self, ids):
+        return self._in_request_order(ids, self.user_repo.get_many(ids))
+
     def get_user_by_email(self, email):
         return self.user_repo.get_by_attribute('email', email)
     
     def update_user(self, user_id, user_data):
         self.user_repo.update(user_id, user_data)
+        self.generations.bump('user')
     
     # AMENITY
     def create_amenity(self, amenity_data):
         amenity = Amenity(**amenity_data)
         self.amenity_repo.add(amenity)
+        self.generations.bump('amenity')
         return amenity
 
     def get_amenity(self, amenity_id):
@@ -45,65 +123,195 @@ class HBnBFacade:
     def get_all_amenities(self):
         return self.amenity_repo.get_all()
 
+    def get_amenities_page(self, limit, after=None):
+        return self.amenity_repo.get_page(limit, after)
+
+    def get_amenities_rows(self, limit, after=None):
+        """Page of amenities as plain dicts, for read-only list responses"""
+        return self.amenity_repo.get_page_rows(limit, after)
+
     def update_amenity(self, amenity_id, amenity_data):
-        return self.amenity_repo.update(amenity_id, amenity_data)
+        amenity = self.amenity_repo.update(amenity_id, amenity_data)
+        self.generations.bump('amenity')
+        return amenity
 
     # PLACE
     def create_place(self, place_data, owner_id):
-        user = self.user_repo.get_by_attribute('id', owner_id)
-        if not user:
-            raise KeyError('Invalid input data')
-        place_data['owner'] = user
-        amenities = place_data.pop('amenities', None)
-        if amenities:
-            for a in amenities:
-                amenity = self.get_amenity(a['id'])
+        with unit_of_work() as session:
+            user = self.user_repo.get(owner_id)
+            if not user:
+                raise KeyError('Invalid input data')
+            amenities = []
+            for a in place_data.pop('amenities', None) or []:
+                amenity = self.amenity_repo.get(a['id'] if isinstance(a, dict) else a)
                 if not amenity:
                     raise KeyError('Invalid input data')
-        place = Place(**place_data)
-        self.place_repo.add(place)
-        user.add_place(place)
-        if amenities:
+                amenities.append(amenity)
+            place_data['owner'] = user
+            place = Place(**place_data)
+            self.place_repo.add(place)
             for amenity in amenities:
                 place.add_amenity(amenity)
+            # Read while this transaction still holds the write lock, see PlaceIndex
+            session.flush()
+            version = self.place_repo.get_coordinates_version()
+        self.generations.bump('place')
+        self.place_index.upsert([(place.id, place.latitude, place.longitude)], version)
         return place
 
+    def create_places_bulk(self, places_data, owner_id, is_admin=False, chunk_size=500):
+        """Validate a batch of places up front, then insert the valid rows in chunks.
+
+        Returns one result per input row, in order: {'index', 'id'} for created
+        places and {'index', 'error'} for rejected ones.
+        """
+        results = []
+        staged = []
+        for index, data in enumerate(places_data):
+            try:
+                data = dict(data)
+                row_owner = data.pop('owner_id', owner_id)
+                if row_owner != owner_id and not is_admin:
+                    raise KeyError('Forbidden')
+                amenity_ids = [a['id'] if isinstance(a, dict) else a for a in data.pop('amenities', None) or []]
+                if not all(isinstance(a, str) for a in amenity_ids):
+                    raise TypeError('Amenity ids must be strings')
+                row = Place.build_row(data)
+            except (KeyError, TypeError, ValueError) as e:
+                results.append({'index': index, 'error': str(e).strip("'")})
+                continue
+            row['user_id'] = row_owner
+            staged.append((index, row, amenity_ids))
+            results.append(None)
+
+        owners = self.user_repo.get_existing_ids(row['user_id'] for _, row, _ in staged)
+        amenities = self.amenity_repo.get_existing_ids(a for _, _, ids in staged for a in ids)
+
+        now = datetime.now()
+        rows = []
+        links = []
+        for index, row, amenity_ids in staged:
+            if row['user_id'] not in owners or not amenities.issuperset(amenity_ids):
+                results[index] = {'index': index, 'error': 'Invalid input data'}
+                continue
+            row.update(id=str(uuid.uuid4()), created_at=now, updated_at=now)
+            rows.append(row)
+            links.extend({'place_id': row['id'], 'amenity_id': a} for a in set(amenity_ids))
+            results[index] = {'index': index, 'id': row['id']}
+        Place.add_geohashes(rows)
+
+        with unit_of_work():
+            self.place_repo.insert_many(rows, chunk_size)
+            self.place_repo.add_amenity_links(links, chunk_size)
+            version = self.place_repo.get_coordinates_version()
+        self.generations.bump('place')
+        self.place_index.upsert(((row['id'], row['latitude'], row['longitude']) for row in rows), version)
+        return results
+
     def get_place(self, place_id):
         return self.place_repo.get(place_id)
 
     def get_all_places(self):
         return self.place_repo.get_all()
 
+    def get_place_details(self, place_id, fields=None, include=None):
+        if fields is None and include is None:
+            return self.place_repo.get_with_relations(place_id)
+        return self.place_repo.get_sparse(place_id, fields, include or ())
+
+    def get_places_many(self, ids, fields=None, include=None):
+        """Places for ids in request order, with relationships batch-loaded, and the missing ids"""
+        if fields is None and include is None:
+            found = self.place_repo.get_many_with_relations(ids)
+        else:
+            found = self.place_repo.get_many_sparse(ids, fields, include or ())
+        return self._in_request_order(ids, found)
+
+    def _places_query(self, fields=None, include=None):
+        """Full representation with batched relationships, or only the requested parts"""
+        if fields is None and include is None:
+            return self.place_repo.with_relations()
+        return self.place_repo.sparse(fields, include or ())
+
+    def get_places_nearby(self, lat, lon, radius_km, limit, fields=None, include=None):
+        """[(place, distance_km)] within radius_km, nearest first, through the R*Tree"""
+        return self.place_repo.nearby(lat, lon, radius_km, limit, self._places_query(fields, include))
+
+    def get_places_within(self, boxes, rings=None, limit=100, after=None, fields=None, include=None):
+        """Page of places inside the boxes and the polygon rings, if any, and the next cursor"""
+        return self.place_repo.within(boxes, rings, limit, after, self._places_query(fields, include))
+
+    def get_place_clusters(self, boxes, precision):
+        """Count, centroid and price range of the places of each geohash cell in the boxes"""
+        return self.place_repo.clusters(boxes, precision)
+
+    def get_places_nearest(self, lat, lon, k, fields=None, include=None):
+        """[(place, distance_km)] of the k closest places, through the in-memory KD-tree"""
+        hits = self.place_index.nearest(lat, lon, k)
+        found = self.place_repo.get_many([place_id for _, place_id in hits], self._places_query(fields, include))
+        return [(found[place_id], distance) for distance, place_id in hits if place_id in found]
+
+    def get_places_page(self, limit, after=None, fields=None, include=None, filters=None):
+        """filters: min_price, max_price, amenities (ids, all required) and min_rating"""
+        if fields is None and include is None:
+            return self.place_repo.get_page_with_relations(limit, after, filters)
+        return self.place_repo.get_page_sparse(limit, after, fields, include or (), filters)
+
+    def stream_places(self, batch_size=1000, updated_since=None):
+        return self.place_repo.stream_with_relations(batch_size, updated_since)
+
     def update_place(self, place_id, place_data):
-        return self.place_repo.update(place_id, place_data)
+        with unit_of_work() as session:
+            place = self.place_repo.update(place_id, place_data)
+            moved = place is not None and self.place_repo.moved(place)
+            session.flush()
+            version = self.place_repo.get_coordinates_version()
+        self.generations.bump('place')
+        if moved:
+            self.place_index.upsert([(place.id, place.latitude, place.longitude)], version)
+        return place
     
     def delete_place(self, place_id):
-        self.place_repo.delete(place_id)
+        with unit_of_work() as session:
+            place = self.place_repo.get(place_id)
+            if place:
+                for review in place.reviews:
+                    self.review_repo.delete(review.id)
+            self.place_repo.delete(place_id)
+            session.flush()
+            version = self.place_repo.get_coordinates_version()
+        # Its reviews went with it; bumping reviews bumps places too
+        self.generations.bump('review')
+        if place:
+            self.place_index.remove([place_id], version)
 
     # REVIEWS
     def create_review(self, review_data, user_id):
-        user = self.user_repo.get(user_id)
-        if not user:
-            raise KeyError("Invalid input data")
-        review_data['user'] = user
- 
-        place = self.place_repo.get(review_data['place_id'])
-        if not place:
-            raise KeyError("Invalid input data")
-        del review_data['place_id']
-        review_data['place'] = place
+        try:
+            with unit_of_work():
+                user = self.user_repo.get(user_id)
+                if not user:
+                    raise KeyError("Invalid input data")
+                review_data['user'] = user
+
+                place = self.place_repo.get(review_data['place_id'])
+                if not place:
+                    raise KeyError("Invalid input data")
+                del review_data['place_id']
+                review_data['place'] = place
 
-        if place.owner.id == user.id:
-            raise KeyError("You cannot review your own place.")
+                if place.user_id == user.id:
+                    raise KeyError("You cannot review your own place.")
 
-        for r in place.reviews:
-            if r.user.id == user.id:
-                raise KeyError('You have already reviewed this place.')
+                if self.review_repo.exists_for_user_and_place(user.id, place.id):
+                    raise KeyError('You have already reviewed this place.')
 
-        review = Review(**review_data)
-        self.review_repo.add(review)
-        user.add_review(review)
-        place.add_review(review)
+                review = Review(**review_data)
+                self.review_repo.add(review)
+        except IntegrityError:
+            # A concurrent request inserted the same (user, place) pair first
+            raise KeyError('You have already reviewed this place.')
+        self.generations.bump('review')
         return review
         
     def get_review(self, review_id):
@@ -112,6 +320,19 @@ class HBnBFacade:
     def get_all_reviews(self):
         return self.review_repo.get_all()
 
+    def get_reviews_many(self, ids):
+        return self._in_request_order(ids, self.review_repo.get_many(ids))
+
+    def get_reviews_page(self, limit, after=None):
+        return self.review_repo.get_page(limit, after)
+
+    def get_reviews_rows(self, limit, after=None):
+        """Page of reviews as plain dicts, for read-only list responses"""
+        return self.review_repo.get_page_rows(limit, after)
+
+    def stream_reviews(self, batch_size=1000, updated_since=None):
+        return self.review_repo.stream(batch_size, updated_since)
+
     def get_reviews_by_place(self, place_id):
         place = self.place_repo.get(place_id)
         if not place:
@@ -119,14 +340,11 @@ class HBnBFacade:
         return place.reviews
 
     def update_review(self, review_id, review_data):
-        return self.review_repo.update(review_id, review_data)
+        review = self.review_repo.update(review_id, review_data)
+        self.generations.bump('review')
+        return review
 
     def delete_review(self, review_id):
-        review = self.review_repo.get(review_id)
-        
-        user = self.user_repo.get(review.user.id)
-        place = self.place_repo.get(review.place.id)
-
-        user.delete_review(review)
-        place.delete_review(review)
-        self.review_repo.delete(review_id)
+        with unit_of_work():
+            self.review_repo.delete(review_id)
+        self.generations.bump('review')
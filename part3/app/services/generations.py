@@ -0,0 +1,25 @@
+from threading import Lock
+
+
+class Generations:
+    """In-process write counter per collection, bumped by the facade after each write.
+
+    A write to a collection also bumps the collections whose representations
+    embed it (embedded_in maps 'user' to ('place',) because place lists
+    embed their owner). Counters start at 0 and only grow, so a cached value
+    tagged with an older generation is known to be stale. They only see
+    writes made through this process's facade; entity_versions covers the
+    rest.
+    """
+    def __init__(self, embedded_in=None):
+        self.embedded_in = embedded_in or {}
+        self._counters = {}
+        self._lock = Lock()
+
+    def bump(self, name):
+        with self._lock:
+            for collection in (name, *self.embedded_in.get(name, ())):
+                self._counters[collection] = self._counters.get(collection, 0) + 1
+
+    def get(self, name):
+        return self._counters.get(name, 0)
@@ -0,0 +1,127 @@
+from threading import RLock, Thread
+from flask import current_app
+from app import db
+from app.spatial.kdtree import KDTree
+
+
+class PlaceIndexLoading(Exception):
+    """The first tree is still loading in the background"""
+
+
+class PlaceIndex:
+    """Per-process KD-tree of place coordinates kept in step with the places table"""
+    def __init__(self, repo, rebuild_ratio=0.25, background=True):
+        self.repo = repo
+        self.rebuild_ratio = rebuild_ratio
+        # False reloads inside the query, e.g. for an in-memory database shared by every thread
+        self.background = background
+        self.tree = None
+        self.version = None
+        self.builds = 0
+        self._lock = RLock()
+        # Changes applied since the running background reload started, None when none runs
+        self._pending = None
+        self._thread = None
+
+    def reset(self):
+        self.wait()
+        with self._lock:
+            self.tree = None
+            self.version = None
+
+    def wait(self):
+        """Block until the running background reload, if any, has swapped its tree in"""
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def start(self, app):
+        """Load the tree in a background thread, e.g. at startup, unless a load already runs"""
+        with self._lock:
+            if self._pending is None:
+                self._pending = []
+                self._thread = Thread(target=self._reload_in_background, args=(app,),
+                                      name='place-index-reload', daemon=True)
+                self._thread.start()
+
+    def nearest(self, lat, lon, k):
+        """[(distance_km, place_id)] of the k closest places, nearest first; PlaceIndexLoading before the first tree"""
+        version = self.repo.get_coordinates_version()
+        with self._lock:
+            if self.tree is None:
+                if self.background:
+                    self.start(current_app._get_current_object())
+                    raise PlaceIndexLoading('The place index is loading')
+                self._swap(*self._load())
+            elif version != self.version or self.tree.needs_rebuild():
+                self._reload()
+            return self.tree.nearest(lat, lon, k)
+
+    def upsert(self, places, version=None):
+        """Index or move (place_id, latitude, longitude) entries.
+
+        version is the coordinates counter read in the transaction that
+        wrote them, after its flush.
+        """
+        places = list(places)
+        self._apply(lambda tree: [tree.insert(*place) for place in places], len(places), version)
+
+    def remove(self, place_ids, version=None):
+        place_ids = list(place_ids)
+        self._apply(lambda tree: [tree.delete(place_id) for place_id in place_ids], len(place_ids), version)
+
+    def _apply(self, change, count, version):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((change, count, version))
+            if self.tree is None:
+                return
+            change(self.tree)
+            # The tree takes the places_coordinates counter only when its own rows account for the whole
+            # difference; any other difference is a write from elsewhere and nearest() reloads the table
+            if version is not None and self.version is not None and version == self.version + count:
+                self.version = version
+
+    def _load(self):
+        # The counter is read first: the tree is never older than the version it claims
+        version = self.repo.get_coordinates_version()
+        return KDTree(self.repo.get_coordinates(), self.rebuild_ratio), version
+
+    def _swap(self, tree, version):
+        self.tree = tree
+        self.version = version
+        self.builds += 1
+
+    def _reload(self):
+        if self.background:
+            self.start(current_app._get_current_object())
+        else:
+            self._swap(*self._load())
+
+    def _reload_in_background(self, app):
+        try:
+            with app.app_context():
+                try:
+                    tree, version = self._load()
+                except Exception:
+                    # The next query starts another load
+                    app.logger.exception('Loading the place index failed')
+                    return
+                finally:
+                    db.session.remove()
+            with self._lock:
+                for change, count, change_version in self._pending:
+                    change(tree)
+                    if change_version == version + count:
+                        version = change_version
+                self._swap(tree, version)
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def stats(self):
+        with self._lock:
+            stats = self.tree.stats() if self.tree is not None else {'size': None}
+            stats['builds'] = self.builds
+            stats['reloading'] = self._pending is not None
+            return stats
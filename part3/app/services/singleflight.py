@@ -0,0 +1,74 @@
+from threading import Event, Lock
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised to a caller that waited longer than its timeout on another caller's computation"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result (or exception)
+    instead of running it again. Nothing is kept once the call completes,
+    so results must be safe to share between threads: plain dicts, never
+    ORM instances bound to the leader's session.
+    """
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = Lock()
+        self.executions = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def do(self, key, fn, timeout=None):
+        """Return fn(), sharing one execution among concurrent callers with the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(self.timeout if timeout is None else timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise SingleFlightTimeout(f'Timed out waiting for {key!r}')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'timeouts': self.timeouts,
+                'errors': self.errors
+            }
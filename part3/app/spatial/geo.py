@@ -0,0 +1,31 @@
+from math import asin, cos, degrees, radians, sin, sqrt
+
+# Mean Earth radius (IUGG)
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometres between two points given in degrees"""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def bounding_boxes(lat, lon, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon) boxes covering every point within radius_km.
+
+    The box spans the full longitude range when the circle reaches a pole,
+    and is split in two when it crosses the antimeridian.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    min_lat, max_lat = lat - degrees(angle), lat + degrees(angle)
+    if min_lat <= -90 or max_lat >= 90 or sin(angle) >= cos(radians(lat)):
+        return [(max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0)]
+
+    delta_lon = degrees(asin(sin(angle) / cos(radians(lat))))
+    min_lon, max_lon = lon - delta_lon, lon + delta_lon
+    if min_lon < -180:
+        return [(min_lat, max_lat, min_lon + 360, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    if max_lon > 180:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
@@ -0,0 +1,161 @@
+from app.spatial.geo import bounding_boxes
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_PRECISION = 12
+# Sorts after every geohash character: [cell, cell + PREFIX_END) holds every hash starting with cell
+PREFIX_END = '{'
+
+
+def _spread(value):
+    """Move bit i of a 32-bit value to bit 2i"""
+    value = (value | value << 16) & 0x0000FFFF0000FFFF
+    value = (value | value << 8) & 0x00FF00FF00FF00FF
+    value = (value | value << 4) & 0x0F0F0F0F0F0F0F0F
+    value = (value | value << 2) & 0x3333333333333333
+    return (value | value << 1) & 0x5555555555555555
+
+
+def encode(lat, lon, precision=9):
+    """Geohash of (lat, lon) in degrees, precision characters long, from the interleaved quantized coordinates"""
+    bits = 5 * precision
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lat_cell = min(int((lat + 90.0) / 180.0 * (1 << lat_bits)), (1 << lat_bits) - 1)
+    lon_cell = min(int((lon + 180.0) / 360.0 * (1 << lon_bits)), (1 << lon_bits) - 1)
+    if bits % 2:
+        value = _spread(lon_cell) | _spread(lat_cell) << 1
+    else:
+        value = _spread(lon_cell) << 1 | _spread(lat_cell)
+    return ''.join(BASE32[value >> shift & 31] for shift in range(bits - 5, -1, -5))
+
+
+def encode_many(lats, lons, precision=9):
+    """encode() of every (lats[i], lons[i]), as array operations when NumPy is available"""
+    if np is None:
+        return [encode(lat, lon, precision) for lat, lon in zip(lats, lons)]
+    bits = 5 * precision
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lat_cells = np.minimum((np.asarray(lats, dtype=float) + 90.0) / 180.0 * (1 << lat_bits), (1 << lat_bits) - 1)
+    lon_cells = np.minimum((np.asarray(lons, dtype=float) + 180.0) / 360.0 * (1 << lon_bits), (1 << lon_bits) - 1)
+    lat_cells, lon_cells = _spread(lat_cells.astype(np.uint64)), _spread(lon_cells.astype(np.uint64))
+    if bits % 2:
+        values = lon_cells | lat_cells << 1
+    else:
+        values = lon_cells << 1 | lat_cells
+    codes = np.stack([values >> shift & 31 for shift in range(bits - 5, -1, -5)], axis=1).astype(np.uint8)
+    chars = np.frombuffer(BASE32.encode(), dtype=np.uint8)[codes]
+    return chars.view(f'S{precision}').ravel().astype(str).tolist()
+
+
+def cell_size(precision):
+    """(height, width) of a cell in degrees of latitude and longitude"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bounds(geohash):
+    """(min_lat, max_lat, min_lon, max_lon) of a geohash cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def overlaps(cell_bounds, boxes):
+    """True when (min_lat, max_lat, min_lon, max_lon) bounds touch one of the boxes"""
+    min_lat, max_lat, min_lon, max_lon = cell_bounds
+    return any(max_lat >= box_min_lat and min_lat <= box_max_lat and max_lon >= box_min_lon and min_lon <= box_max_lon
+               for box_min_lat, box_max_lat, box_min_lon, box_max_lon in boxes)
+
+
+def neighbours(geohash):
+    """The cells around geohash at the same precision, wrapping across the antimeridian.
+
+    Cells beyond a pole do not exist, so fewer than 8 come back next to one.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounds(geohash)
+    height, width = max_lat - min_lat, max_lon - min_lon
+    lat, lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+    cells = []
+    for d_lat in (-1, 0, 1):
+        cell_lat = lat + d_lat * height
+        if not -90 < cell_lat < 90:
+            continue
+        for d_lon in (-1, 0, 1):
+            if d_lat == d_lon == 0:
+                continue
+            cell_lon = (lon + d_lon * width + 180) % 360 - 180
+            cell = encode(cell_lat, cell_lon, len(geohash))
+            if cell != geohash and cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def covering_cells(lat, lon, radius_km, max_precision=MAX_PRECISION):
+    """Cells whose union contains every point within radius_km of (lat, lon).
+
+    Picks the finest precision at which a cell is at least as tall and as
+    wide as the half-extents of the circle's bounding box, and returns the
+    cell of the point with its neighbours. An empty list means no precision
+    is coarse enough, or the circle reaches a pole: scan the whole table.
+    """
+    boxes = bounding_boxes(lat, lon, radius_km)
+    half_height = (boxes[0][1] - boxes[0][0]) / 2
+    half_width = sum(max_lon - min_lon for _, _, min_lon, max_lon in boxes) / 2
+    if half_width >= 180:
+        return []
+    for precision in range(max_precision, 0, -1):
+        height, width = cell_size(precision)
+        if height >= half_height and width >= half_width:
+            cell = encode(lat, lon, precision)
+            return [cell] + neighbours(cell)
+    return []
+
+
+def zoom_precision(zoom, max_precision=MAX_PRECISION):
+    """Finest precision whose cells are at least 1/16 of a map viewport wide at a web map zoom.
+
+    A 1024 px viewport spans 4 tiles, 1440 / 2**zoom degrees of longitude,
+    so a map shows at most a few hundred cells at the returned precision.
+    """
+    min_width = 90.0 / 2 ** zoom
+    for precision in range(max_precision, 0, -1):
+        if cell_size(precision)[1] >= min_width:
+            return precision
+    return 1
+
+
+def cells_in_box(min_lat, max_lat, min_lon, max_lon, precision):
+    """Every cell at precision overlapping the box, row by row"""
+    height, width = cell_size(precision)
+    cells = []
+    lat = -90 + (int((min_lat + 90) / height) + 0.5) * height
+    while lat - height / 2 <= max_lat and lat < 90:
+        lon = -180 + (int((min_lon + 180) / width) + 0.5) * width
+        while lon - width / 2 <= max_lon and lon < 180:
+            cells.append(encode(lat, lon, precision))
+            lon += width
+        lat += height
+    return cells
+
+
+def count_cells_in_box(min_lat, max_lat, min_lon, max_lon, precision):
+    """len(cells_in_box(...)) without building the list"""
+    height, width = cell_size(precision)
+    rows = int((min(max_lat, 90 - height / 2) + 90) / height) - int((min_lat + 90) / height) + 1
+    columns = int((min(max_lon, 180 - width / 2) + 180) / width) - int((min_lon + 180) / width) + 1
+    return max(rows, 0) * max(columns, 0)
@@ -0,0 +1,137 @@
+import heapq
+from math import asin, cos, radians, sin, sqrt
+from app.spatial.geo import EARTH_RADIUS_KM
+
+
+def unit_vector(lat, lon):
+    """Point on the unit sphere for (lat, lon) in degrees"""
+    lat, lon = radians(lat), radians(lon)
+    return cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat)
+
+
+def chord_to_km(chord):
+    """Great-circle distance for a straight-line distance between two unit vectors"""
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, chord / 2))
+
+
+class _Node:
+    __slots__ = ('point', 'key', 'axis', 'left', 'right', 'deleted')
+
+    def __init__(self, point, key, axis):
+        self.point = point
+        self.key = key
+        self.axis = axis
+        self.left = None
+        self.right = None
+        self.deleted = False
+
+
+class KDTree:
+    """3-d tree over unit vectors of (lat, lon) points, for k-nearest-neighbour queries.
+
+    The straight-line distance between unit vectors grows with the
+    great-circle distance, so ordering by it gives exact great-circle
+    neighbours, poles and antimeridian included. Inserts descend to a leaf
+    and deletes only mark the node; rebuild() restores balance and drops
+    the marked nodes once needs_rebuild() says they have accumulated.
+    """
+    def __init__(self, points=(), rebuild_ratio=0.25):
+        self.rebuild_ratio = rebuild_ratio
+        self.rebuilds = 0
+        self._build([(unit_vector(lat, lon), key) for key, lat, lon in points])
+
+    def _build(self, entries):
+        self._nodes = {}
+        self.deleted = 0
+        self.inserted = 0
+        self.built_size = len(entries)
+        self.root = self._build_subtree(entries, 0)
+
+    def _build_subtree(self, entries, axis):
+        if not entries:
+            return None
+        entries.sort(key=lambda entry: entry[0][axis])
+        middle = len(entries) // 2
+        point, key = entries[middle]
+        node = self._nodes[key] = _Node(point, key, axis)
+        next_axis = (axis + 1) % 3
+        node.left = self._build_subtree(entries[:middle], next_axis)
+        node.right = self._build_subtree(entries[middle + 1:], next_axis)
+        return node
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+    def insert(self, key, lat, lon):
+        """Add a point, replacing the previous position of key if any"""
+        self.delete(key)
+        point = unit_vector(lat, lon)
+        self.inserted += 1
+        if self.root is None:
+            self.root = self._nodes[key] = _Node(point, key, 0)
+            return
+        node = self.root
+        while True:
+            side = 'left' if point[node.axis] < node.point[node.axis] else 'right'
+            child = getattr(node, side)
+            if child is None:
+                child = self._nodes[key] = _Node(point, key, (node.axis + 1) % 3)
+                setattr(node, side, child)
+                return
+            node = child
+
+    def delete(self, key):
+        node = self._nodes.pop(key, None)
+        if node is not None:
+            node.deleted = True
+            self.deleted += 1
+
+    def needs_rebuild(self):
+        """True once deleted nodes or unbalanced inserts outweigh rebuild_ratio of the tree"""
+        return self.deleted + self.inserted > self.rebuild_ratio * max(self.built_size, 64)
+
+    def rebuild(self):
+        self._build([(node.point, key) for key, node in self._nodes.items()])
+        self.rebuilds += 1
+
+    def nearest(self, lat, lon, k):
+        """[(distance_km, key)] of the k points closest to (lat, lon), nearest first"""
+        if k < 1 or self.root is None:
+            return []
+        target = unit_vector(lat, lon)
+        heap = []  # (-squared distance, key), the worst kept neighbour on top
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if isinstance(node, tuple):
+                # Far side of a split, visited only if it can still beat the worst neighbour
+                diff, node = node
+                if len(heap) == k and diff * diff >= -heap[0][0]:
+                    continue
+            point = node.point
+            if not node.deleted:
+                dx, dy, dz = point[0] - target[0], point[1] - target[1], point[2] - target[2]
+                distance = dx * dx + dy * dy + dz * dz
+                if len(heap) < k:
+                    heapq.heappush(heap, (-distance, node.key))
+                elif distance < -heap[0][0]:
+                    heapq.heapreplace(heap, (-distance, node.key))
+            diff = target[node.axis] - point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            if far is not None:
+                stack.append((diff, far))
+            stack.append(near)
+        return sorted((chord_to_km(sqrt(-distance)), key) for distance, key in heap)
+
+    def stats(self):
+        return {
+            'size': len(self._nodes),
+            'deleted': self.deleted,
+            'inserted_since_build': self.inserted,
+            'rebuilds': self.rebuilds
+        }
@@ -0,0 +1,42 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def ring_bounds(rings):
+    """(min_lat, max_lat, min_lon, max_lon) of the outer ring, rings given as [[(lon, lat), ...], ...]"""
+    lons = [lon for lon, _ in rings[0]]
+    lats = [lat for _, lat in rings[0]]
+    return min(lats), max(lats), min(lons), max(lons)
+
+
+def contains(rings, lats, lons):
+    """List of booleans: is each (lats[i], lons[i]) inside the polygon.
+
+    Even-odd rule over the edges of every ring, so holes (inner rings)
+    are excluded. Coordinates are treated as planar lon/lat, which is how
+    a map viewport draws them. With NumPy the points are tested as arrays,
+    one vector operation per edge; without it, point by point.
+    """
+    edges = [(ring[i - 1], ring[i]) for ring in rings for i in range(len(ring))]
+    if np is None:
+        return [_contains_point(edges, lat, lon) for lat, lon in zip(lats, lons)]
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    inside = np.zeros(len(lats), dtype=bool)
+    for (lon1, lat1), (lon2, lat2) in edges:
+        if lat1 == lat2:
+            continue
+        crosses = (lat1 > lats) != (lat2 > lats)
+        crosses &= lons < lon1 + (lats - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        inside ^= crosses
+    return inside.tolist()
+
+
+def _contains_point(edges, lat, lon):
+    inside = False
+    for (lon1, lat1), (lon2, lat2) in edges:
+        if (lat1 > lat) != (lat2 > lat) and lon < lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1):
+            inside = not inside
+    return inside
@@ -0,0 +1,21 @@
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """Milliseconds spent in each named phase of create_app, in call order"""
+    def __init__(self):
+        self.timings = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    def finish(self):
+        self.timings['total'] = round((time.perf_counter() - self._start) * 1000, 3)
+        return self.timings
@@ -0,0 +1,138 @@
+import random
+import unittest
+from sqlalchemy import event
+from app import db
+from app.models.place_cluster import add_place_statements, rebuild_place_clusters, remove_place_statements
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user, place_data
+
+PARIS = '2.2,48.8,2.4,48.9'
+
+
+class TestClusters(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user()
+
+    def clusters(self, bbox=PARIS, zoom=11, status=200):
+        response = self.client.get('/api/v1/places/clusters', query_string={'bbox': bbox, 'zoom': zoom})
+        self.assertEqual(response.status_code, status, response.json)
+        return response.json
+
+    def by_cell(self, **query):
+        return {cluster['cell']: cluster for cluster in self.clusters(**query)}
+
+    def test_aggregates(self):
+        create_place(self.owner, latitude=48.8606, longitude=2.3376, price=50.0)
+        create_place(self.owner, latitude=48.8584, longitude=2.2945, price=80.0)
+        create_place(self.owner, latitude=45.7640, longitude=4.8357, price=30.0)
+        clusters = self.clusters(zoom=2)
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0]['cell'], 'u')
+        self.assertEqual((clusters[0]['count'], clusters[0]['min_price'], clusters[0]['max_price']), (3, 30.0, 80.0))
+        self.assertAlmostEqual(clusters[0]['latitude'], (48.8606 + 48.8584 + 45.7640) / 3)
+        # zoom 11 splits Paris into cells of about 5 km, Lyon is outside the viewport
+        cells = self.by_cell(zoom=11)
+        self.assertEqual(sorted(cluster['count'] for cluster in cells.values()), [1, 1])
+
+    def test_incremental_writes(self):
+        cheap = create_place(self.owner, latitude=48.8606, longitude=2.3376, price=20.0)
+        create_place(self.owner, latitude=48.8607, longitude=2.3377, price=90.0)
+        moved = create_place(self.owner, latitude=48.8608, longitude=2.3378, price=60.0)
+        self.assertEqual(self.by_cell(zoom=8)['u09t']['min_price'], 20.0)
+
+        facade.delete_place(cheap.id)
+        cluster = self.by_cell(zoom=8)['u09t']
+        self.assertEqual((cluster['count'], cluster['min_price'], cluster['max_price']), (2, 60.0, 90.0))
+
+        facade.update_place(moved.id, {'latitude': 45.7640, 'longitude': 4.8357})
+        self.assertEqual(self.by_cell(zoom=8)['u09t']['count'], 1)
+        self.assertEqual(self.by_cell(bbox='4.8,45.7,4.9,45.8', zoom=8)['u05k']['count'], 1)
+        empty = db.session.execute(db.text('SELECT count(*) FROM place_clusters WHERE count <= 0')).scalar()
+        self.assertEqual(empty, 0)
+
+        facade.create_places_bulk([place_data(price=10.0, latitude=48.86, longitude=2.34)], self.owner.id)
+        cluster = self.by_cell(zoom=8)['u09t']
+        self.assertEqual((cluster['count'], cluster['min_price']), (2, 10.0))
+
+    def test_read_does_not_write(self):
+        create_place(self.owner, latitude=48.8606, longitude=2.3376, price=20.0)
+        expensive = create_place(self.owner, latitude=48.8607, longitude=2.3377, price=90.0)
+        facade.update_place(expensive.id, {'price': 40.0})
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            cluster = self.by_cell(zoom=8)['u09t']
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual((cluster['min_price'], cluster['max_price']), (20.0, 40.0))
+        self.assertEqual([statement for statement in statements if not statement.lstrip().startswith('SELECT')], [])
+
+    def test_matches_rebuild(self):
+        random.seed(4)
+        places = [create_place(self.owner, latitude=round(random.uniform(48.8, 48.9), 4),
+                               longitude=round(random.uniform(2.2, 2.4), 4),
+                               price=float(random.randint(10, 200))) for _ in range(60)]
+        for place in places[:20]:
+            facade.update_place(place.id, {'price': float(random.randint(10, 200))})
+        for place in places[20:30]:
+            facade.delete_place(place.id)
+        boxes = [(48.8, 48.9, 2.2, 2.4)]
+        incremental = {cluster['cell']: cluster for cluster in facade.get_place_clusters(boxes, 6)}
+        with db.engine.begin() as connection:
+            rebuild_place_clusters(connection)
+        rebuilt = {cluster['cell']: cluster for cluster in facade.get_place_clusters(boxes, 6)}
+        self.assertEqual(incremental.keys(), rebuilt.keys())
+        for cell, cluster in rebuilt.items():
+            for key, value in cluster.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(incremental[cell][key], value)
+                else:
+                    self.assertEqual(incremental[cell][key], value)
+
+    def test_bulk_chunks_match_rebuild(self):
+        random.seed(5)
+        create_place(self.owner, latitude=48.85, longitude=2.35, price=300.0)
+        rows = [place_data(price=float(random.randint(10, 200)), latitude=round(random.uniform(48.8, 48.9), 4),
+                           longitude=round(random.uniform(2.2, 2.4), 4)) for _ in range(50)]
+        facade.create_places_bulk(rows, self.owner.id, chunk_size=7)
+        select_all = db.text('SELECT * FROM place_clusters ORDER BY precision, cell')
+        incremental = db.session.execute(select_all).all()
+        with db.engine.begin() as connection:
+            rebuild_place_clusters(connection)
+        rebuilt = db.session.execute(select_all).all()
+        self.assertEqual([row[:3] for row in incremental], [row[:3] for row in rebuilt])
+        for row, expected in zip(incremental, rebuilt):
+            self.assertEqual(row[5:], expected[5:])
+            self.assertAlmostEqual(row[3], expected[3])
+            self.assertAlmostEqual(row[4], expected[4])
+
+    def test_trigger_statements_use_primary_key(self):
+        place = {'latitude': '48.85', 'longitude': '2.35', 'price': '80.0', 'geohash': "'u09tvw0f6'"}
+        triggers = ' '.join(db.session.execute(db.text(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_place_clusters_%'")).scalars())
+        for statement in remove_place_statements(place):
+            with self.subTest(statement):
+                plan = [row[3] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}'))
+                        if not row[3].startswith('CORRELATED SCALAR SUBQUERY')]
+                self.assertEqual(plan[0], 'SEARCH place_clusters USING INDEX sqlite_autoindex_place_clusters_1 '
+                                          '(precision=? AND cell=?)')
+                # A price bound left by the place is recomputed from the covering index alone
+                self.assertEqual(set(plan[1:]) - {'SEARCH places USING COVERING INDEX ix_places_geohash_price '
+                                                  '(geohash>? AND geohash<?)'}, set())
+        self.assertIn(remove_place_statements({key: f'old.{key}' for key in place})[1], triggers)
+        for statement in add_place_statements(place):
+            plan = [row[3] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}'))]
+            self.assertFalse([step for step in plan if 'place_clusters' in step], plan)
+
+    def test_invalid(self):
+        self.clusters(bbox='2.2,48.8,2.4', status=400)
+        self.clusters(bbox='2.2,48.9,2.4,48.8', status=400)
+        self.clusters(zoom=23, status=400)
+        self.clusters(zoom='x', status=400)
+        response = self.clusters(bbox='-180,-90,180,90', zoom=16, status=400)
+        self.assertEqual(response, {'error': 'Too many cells, zoom out or shrink the bbox'})
+
+if __name__ == "__main__":
+    unittest.main()
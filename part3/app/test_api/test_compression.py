@@ -0,0 +1,59 @@
+import gzip
+import json
+import unittest
+from app.testing import AppTestCase, create_place, create_user
+
+
+class TestCompression(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.compression = self.app.extensions['compression']
+        owner = create_user()
+        for i in range(20):
+            create_place(owner, title=f'Place {i}', description='A quiet flat near the river ' * 4)
+        self.place_id = create_place(owner, title='Tiny', price=10.0).id
+
+    def test_gzip_list(self):
+        identity = self.client.get('/api/v1/places/')
+        self.assertNotIn('Content-Encoding', identity.headers)
+        self.assertIn('Accept-Encoding', identity.headers['Vary'])
+
+        response = self.client.get('/api/v1/places/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertLess(len(response.get_data()), len(identity.get_data()))
+        self.assertEqual(json.loads(gzip.decompress(response.get_data())), identity.json)
+        self.assertEqual(response.headers['ETag'], 'W/' + identity.headers['ETag'])
+
+    def test_hot_payload_compressed_once(self):
+        headers = {'Accept-Encoding': 'gzip'}
+        first = self.client.get('/api/v1/places/', headers=headers)
+        second = self.client.get('/api/v1/places/', headers=headers)
+        self.assertEqual(first.get_data(), second.get_data())
+        stats = self.compression.stats()['cache']
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_revalidation_with_weak_etag(self):
+        headers = {'Accept-Encoding': 'gzip'}
+        etag = self.client.get('/api/v1/places/', headers=headers).headers['ETag']
+        response = self.client.get('/api/v1/places/', headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_small_and_refused(self):
+        response = self.client.get(f'/api/v1/places/{self.place_id}?fields=title',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        response = self.client.get('/api/v1/places/', headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_stream_not_compressed(self):
+        response = self.client.get('/api/v1/places/export', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(len(response.get_data().splitlines()), 21)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from unittest.mock import patch
+from app import db
+from app.models.entity_version import VERSIONED_TABLES
+from app.persistence.repository import get_table_versions
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user, place_data
+
+
+class TestConditionalGet(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user()
+        self.place = create_place(self.owner)
+
+    def revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        second = self.client.get(url, headers={'If-None-Match': etag})
+        return etag, second
+
+    def test_item_not_modified(self):
+        etag, response = self.revalidate(f'/api/v1/places/{self.place.id}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.get_data(), b'')
+
+    def test_item_changes_with_embedded_review(self):
+        url = f'/api/v1/places/{self.place.id}'
+        etag = self.client.get(url).headers['ETag']
+        reviewer = create_user(first_name='Jane')
+        facade.create_review({'text': 'Lovely stay', 'rating': 5, 'place_id': self.place.id}, reviewer.id)
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json['reviews']), 1)
+
+    def test_list_changes_after_write(self):
+        etag, response = self.revalidate('/api/v1/places/')
+        self.assertEqual(response.status_code, 304)
+
+        facade.update_place(self.place.id, {'price': 90.0})
+        response = self.client.get('/api/v1/places/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        etag = response.headers['ETag']
+        facade.delete_place(self.place.id)
+        response = self.client.get('/api/v1/places/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [])
+
+    def test_list_etag_depends_on_query(self):
+        first = self.client.get('/api/v1/amenities/?limit=1').headers['ETag']
+        second = self.client.get('/api/v1/amenities/?limit=2').headers['ETag']
+        self.assertNotEqual(first, second)
+
+    def test_user_and_missing_items(self):
+        etag, response = self.revalidate(f'/api/v1/users/{self.owner.id}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/api/v1/reviews/missing').status_code, 404)
+
+
+class TestVersionsWithoutTriggers(AppTestCase):
+    """Databases other than SQLite get no triggers: the session hooks bump the counters"""
+    def setUp(self):
+        super().setUp()
+        for table in VERSIONED_TABLES:
+            for operation in ('insert', 'update', 'delete'):
+                db.session.execute(db.text(f'DROP TRIGGER trg_{table}_version_{operation}'))
+        db.session.commit()
+        patcher = patch('app.persistence.repository.has_version_triggers', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertBumped(self, tables, write):
+        before = get_table_versions(*VERSIONED_TABLES)
+        write()
+        after = get_table_versions(*VERSIONED_TABLES)
+        changed = {table for table, old, new in zip(VERSIONED_TABLES, before, after) if new != old}
+        self.assertEqual(changed, set(tables))
+
+    def test_every_write_bumps_its_tables(self):
+        owner, reviewer = create_user(), create_user()
+        wifi = facade.create_amenity({'name': 'Wi-Fi'})
+        self.assertBumped({'users'}, lambda: create_user())
+        self.assertBumped({'amenities'}, lambda: facade.update_amenity(wifi.id, {'name': 'Fiber'}))
+        self.assertBumped({'places', 'amenities_places'}, lambda: create_place(owner, amenities=[wifi.id]))
+        place = facade.get_all_places()[0]
+        self.assertBumped({'places'}, lambda: facade.update_place(place.id, {'price': 90.0}))
+        self.assertBumped({'reviews'}, lambda: facade.create_review(
+            {'text': 'Lovely stay', 'rating': 5, 'place_id': place.id}, reviewer.id))
+        self.assertBumped({'places', 'reviews', 'amenities_places'}, lambda: facade.delete_place(place.id))
+        self.assertBumped({'places', 'amenities_places'},
+                          lambda: facade.create_places_bulk([place_data(amenities=[wifi.id])], owner.id))
+
+    def test_coordinates_counter(self):
+        for trigger in ('insert', 'update', 'delete'):
+            db.session.execute(db.text(f'DROP TRIGGER trg_places_rtree_{trigger}'))
+        db.session.commit()
+        owner = create_user()
+        place_id = lambda: facade.get_all_places()[0].id
+        steps = [
+            (1, lambda: create_place(owner)),
+            (0, lambda: facade.update_place(place_id(), {'price': 90.0})),
+            (1, lambda: facade.update_place(place_id(), {'latitude': 10.0})),
+            (2, lambda: facade.create_places_bulk([place_data(), place_data()], owner.id)),
+            (1, lambda: facade.delete_place(place_id())),
+        ]
+        for increment, write in steps:
+            before = facade.place_repo.get_coordinates_version()
+            write()
+            self.assertEqual(facade.place_repo.get_coordinates_version(), before + increment)
+
+    def test_list_etag_changes(self):
+        url = '/api/v1/places/'
+        etag = self.client.get(url).headers['ETag']
+        create_place(create_user())
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
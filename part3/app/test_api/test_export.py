@@ -0,0 +1,67 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+import config
+from app import db
+from app.models.review import Review
+from app.services import facade
+from app.testing import AppTestCase, create_user, place_data
+
+
+class ExportConfig(config.TestingConfig):
+    EXPORT_BATCH_SIZE = 2
+
+
+class TestExport(AppTestCase):
+    config_class = ExportConfig
+
+    def setUp(self):
+        super().setUp()
+        owner = create_user()
+        self.results = facade.create_places_bulk([place_data(title=f'Place {i}') for i in range(5)], owner.id)
+
+    def read_ndjson(self, response):
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_places_export(self):
+        response = self.client.get('/api/v1/places/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertTrue(response.is_streamed)
+        places = self.read_ndjson(response)
+        self.assertEqual(sorted(p['id'] for p in places), sorted(r['id'] for r in self.results))
+        self.assertIn('owner', places[0])
+
+    def test_updated_since(self):
+        future = (datetime.now() + timedelta(days=1)).isoformat()
+        response = self.client.get('/api/v1/places/export', query_string={'updated_since': future})
+        self.assertEqual(self.read_ndjson(response), [])
+
+        response = self.client.get('/api/v1/places/export?updated_since=yesterday')
+        self.assertEqual(response.status_code, 400)
+
+    def test_reviews_export(self):
+        self.assertEqual(self.read_ndjson(self.client.get('/api/v1/reviews/export')), [])
+
+        reviewer = create_user()
+        reviews = [facade.create_review({'text': f'Stay {i}', 'rating': i + 1, 'place_id': result['id']}, reviewer.id)
+                   for i, result in enumerate(self.results[:3])]
+        response = self.client.get('/api/v1/reviews/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertTrue(response.is_streamed)
+        exported = sorted(self.read_ndjson(response), key=lambda row: row['text'])
+        self.assertEqual(exported, [review.to_dict() for review in reviews])
+        self.assertEqual(set(exported[0]), {'id', 'text', 'rating', 'place_id', 'user_id'})
+
+        # Only the reviews written since the cutoff are exported
+        Review.query.filter_by(id=reviews[0].id).update({'updated_at': datetime.now() - timedelta(days=2)})
+        db.session.commit()
+        yesterday = (datetime.now() - timedelta(days=1)).isoformat()
+        response = self.client.get('/api/v1/reviews/export', query_string={'updated_since': yesterday})
+        self.assertEqual(sorted(row['id'] for row in self.read_ndjson(response)),
+                         sorted(review.id for review in reviews[1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from sqlalchemy import event
+from app import db
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user
+
+
+class TestMultiGet(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user()
+        wifi = facade.create_amenity({'name': 'Wifi'})
+        self.places = [create_place(self.owner, title=f'Place {i}', amenities=[wifi.id]).id for i in range(20)]
+        self.reviews = [facade.create_review({'text': 'Great stay', 'rating': 4, 'place_id': place_id},
+                                             create_user().id).id for place_id in self.places[:5]]
+
+    def test_places_in_request_order_with_missing(self):
+        ids = [self.places[3], 'unknown', self.places[0], self.places[3]]
+        response = self.client.get('/api/v1/places/', query_string={'ids': ','.join(ids)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place['id'] for place in response.json['items']], [self.places[3], self.places[0]])
+        self.assertEqual(response.json['missing'], ['unknown'])
+        self.assertEqual(response.json['items'][0]['amenities'][0]['name'], 'Wifi')
+
+    def test_places_batched_queries(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        db.session.expire_all()
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            places, missing = facade.get_places_many(self.places)
+            payload = [place.to_dict_list() for place in places]
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(payload), 20)
+        self.assertEqual(missing, [])
+        # places, then one IN query each for owners, amenities and reviews
+        self.assertEqual(len(statements), 4)
+
+    def test_places_sparse(self):
+        response = self.client.get('/api/v1/places/', query_string={'ids': self.places[1], 'fields': 'title'})
+        self.assertEqual(response.json['items'], [{'id': self.places[1], 'title': 'Place 1'}])
+
+    def test_users_and_reviews(self):
+        response = self.client.get('/api/v1/users/', query_string={'ids': f'{self.owner.id},nope'})
+        self.assertEqual(response.json['items'][0]['id'], self.owner.id)
+        self.assertEqual(response.json['missing'], ['nope'])
+
+        ids = ','.join(reversed(self.reviews))
+        response = self.client.get('/api/v1/reviews/', query_string={'ids': ids})
+        self.assertEqual([review['id'] for review in response.json['items']], list(reversed(self.reviews)))
+
+    def test_invalid_ids(self):
+        self.assertEqual(self.client.get('/api/v1/places/?ids=,').status_code, 400)
+        too_many = ','.join(str(i) for i in range(self.app.config['PAGE_MAX_LIMIT'] + 1))
+        response = self.client.get('/api/v1/users/', query_string={'ids': too_many})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], 'Too many ids')
+
+
+if __name__ == "__main__":
+    unittest.main()
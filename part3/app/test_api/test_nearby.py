@@ -0,0 +1,123 @@
+import random
+import unittest
+from unittest.mock import patch
+from app import db
+from app.models.place_rtree import create_places_rtree, rebuild_places_rtree
+from app.services import facade
+from app.spatial.geo import haversine_km
+from app.testing import AppTestCase, create_place, create_user, place_data
+
+LANDMARKS = {
+    'Louvre museum': (48.8606, 2.3376),
+    'Eiffel tower': (48.8584, 2.2945),
+    'Versailles palace': (48.8049, 2.1204),
+    'Lyon old town': (45.7640, 4.8357),
+    'Fiji east': (-17.7, 179.95),
+    'Fiji west': (-17.7, -179.95),
+}
+
+
+class TestNearby(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user()
+        self.places = {title: create_place(self.owner, title=title, latitude=lat, longitude=lon).id
+                       for title, (lat, lon) in LANDMARKS.items()}
+
+    def nearby(self, **query):
+        response = self.client.get('/api/v1/places/nearby', query_string=query)
+        self.assertEqual(response.status_code, 200, response.json)
+        return response.json
+
+    def test_sorted_by_distance(self):
+        places = self.nearby(lat=48.8566, lon=2.3522, radius_km=20)
+        self.assertEqual([place['title'] for place in places], ['Louvre museum', 'Eiffel tower', 'Versailles palace'])
+        self.assertEqual(places[0]['distance_km'], 1.157)
+        self.assertIn('owner', places[0])
+
+    def test_radius_is_exact_and_limit(self):
+        # Versailles is 17.9 km away, inside the bounding box of a 17 km circle but outside the circle
+        titles = [place['title'] for place in self.nearby(lat=48.8566, lon=2.3522, radius_km=17)]
+        self.assertNotIn('Versailles palace', titles)
+        self.assertEqual(len(self.nearby(lat=48.8566, lon=2.3522, radius_km=20, limit=1)), 1)
+
+    def test_growing_circles_match_full_scan(self):
+        random.seed(4)
+        rows = [place_data(title=f'Spread {i}', latitude=random.uniform(43, 50), longitude=random.uniform(-1, 6))
+                for i in range(400)]
+        facade.create_places_bulk(rows, self.owner.id)
+        points = [(place.id, place.latitude, place.longitude) for place in facade.get_all_places()]
+        rtree_candidates = facade.place_repo.rtree_candidates
+        # The last circle searched is smaller than the requested one when it already holds limit places
+        cases = ((48.8566, 2.3522, 500, 5, True), (46.0, 2.0, 60, 20, False), (43.0, -1.0, 300, 50, False))
+        for lat, lon, radius_km, limit, stops_early in cases:
+            with self.subTest(lat=lat, lon=lon, radius_km=radius_km, limit=limit):
+                expected = sorted((haversine_km(lat, lon, place_lat, place_lon), place_id)
+                                  for place_id, place_lat, place_lon in points)
+                expected = [place_id for distance, place_id in expected if distance <= radius_km][:limit]
+                with patch.object(facade.place_repo, 'rtree_candidates', wraps=rtree_candidates) as candidates:
+                    found = facade.get_places_nearby(lat, lon, radius_km, limit)
+                self.assertEqual([place.id for place, _ in found], expected)
+                self.assertEqual(candidates.call_args.args[2] < radius_km, stops_early)
+
+    def test_antimeridian(self):
+        places = self.nearby(lat=-17.7, lon=179.99, radius_km=20, fields='title')
+        self.assertEqual([place['title'] for place in places], ['Fiji east', 'Fiji west'])
+        self.assertEqual(set(places[0]), {'id', 'title', 'distance_km'})
+
+    def test_index_follows_writes(self):
+        facade.update_place(self.places['Lyon old town'], {'latitude': 48.86, 'longitude': 2.35})
+        facade.delete_place(self.places['Louvre museum'])
+        titles = [place['title'] for place in self.nearby(lat=48.8566, lon=2.3522, radius_km=5)]
+        self.assertEqual(titles, ['Lyon old town', 'Eiffel tower'])
+
+    def test_rebuild(self):
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('DELETE FROM places_rtree')
+        self.assertEqual(facade.get_places_nearby(48.8566, 2.3522, 20, 10), [])
+        with db.engine.begin() as connection:
+            rebuild_places_rtree(connection)
+        self.assertEqual(len(facade.get_places_nearby(48.8566, 2.3522, 20, 10)), 3)
+
+    def test_rowids_renumbered(self):
+        # What a VACUUM may do to a table with a text primary key
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('UPDATE places SET rowid = rowid + 1000')
+        titles = [place['title'] for place in self.nearby(lat=48.8566, lon=2.3522, radius_km=20)]
+        self.assertEqual(titles, ['Louvre museum', 'Eiffel tower', 'Versailles palace'])
+        facade.delete_place(self.places['Louvre museum'])
+        self.assertEqual(len(self.nearby(lat=48.8566, lon=2.3522, radius_km=20)), 2)
+        response = self.client.post('/api/v1/places/within', json={'bbox': [2.0, 48.0, 3.0, 49.0]})
+        self.assertEqual(len(response.json), 2)
+
+    def test_rowid_keyed_rtree_migrated(self):
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('DROP TABLE places_rtree_ids')
+            connection.exec_driver_sql('UPDATE places SET rowid = rowid + 1000')
+            create_places_rtree(connection)
+        self.assertEqual(len(self.nearby(lat=48.8566, lon=2.3522, radius_km=20)), 3)
+
+    def test_bulk_insert_indexed(self):
+        before = facade.place_repo.get_coordinates_version()
+        rows = [place_data(title=f'Bulk place {i}', latitude=48.85 + i / 1000, longitude=2.35) for i in range(5)]
+        facade.create_places_bulk(rows, self.owner.id, chunk_size=2)
+        self.assertEqual(facade.place_repo.get_coordinates_version(), before + 5)
+        triggers = "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'places' AND name GLOB '*_insert'"
+        self.assertEqual(set(db.session.execute(db.text(triggers)).scalars()),
+                         {'trg_places_version_insert', 'trg_places_rtree_insert', 'trg_place_clusters_insert'})
+        titles = {place['title'] for place in self.nearby(lat=48.85, lon=2.35, radius_km=1)}
+        self.assertEqual(titles, {f'Bulk place {i}' for i in range(5)})
+        facade.delete_place(self.places['Louvre museum'])
+        indexed = 'SELECT count(*) FROM places_rtree_ids JOIN places_rtree ON id = rtree_id'
+        self.assertEqual(db.session.execute(db.text(indexed)).scalar(), len(LANDMARKS) - 1 + 5)
+
+    def test_invalid_arguments(self):
+        for query in ({'lat': 91, 'lon': 0, 'radius_km': 1}, {'lat': 0, 'radius_km': 1},
+                      {'lat': 0, 'lon': 0, 'radius_km': -1}, {'lat': 0, 'lon': 0, 'radius_km': 10000}):
+            with self.subTest(query):
+                response = self.client.get('/api/v1/places/nearby', query_string=query)
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
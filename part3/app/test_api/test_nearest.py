@@ -0,0 +1,178 @@
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+import config
+from app import create_app, db
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user, place_data
+
+
+class TestNearest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user()
+        landmarks = [('Louvre museum', 48.8606, 2.3376), ('Eiffel tower', 48.8584, 2.2945),
+                     ('Lyon old town', 45.7640, 4.8357), ('Sydney harbour', -33.8568, 151.2153)]
+        self.places = {title: create_place(self.owner, title=title, latitude=lat, longitude=lon).id
+                       for title, lat, lon in landmarks}
+
+    def nearest(self, **query):
+        response = self.client.get('/api/v1/places/nearest', query_string=query)
+        self.assertEqual(response.status_code, 200, response.json)
+        return [place['title'] for place in response.json]
+
+    def test_k_nearest(self):
+        response = self.client.get('/api/v1/places/nearest', query_string={'lat': 48.8566, 'lon': 2.3522, 'k': 2})
+        self.assertEqual([place['title'] for place in response.json], ['Louvre museum', 'Eiffel tower'])
+        self.assertEqual(response.json[0]['distance_km'], 1.157)
+        self.assertIn('owner', response.json[0])
+        self.assertEqual(self.nearest(lat=-33.0, lon=150.0, k=1, fields='title'), ['Sydney harbour'])
+
+    def test_facade_writes_update_index_in_place(self):
+        self.nearest(lat=0, lon=0, k=1)
+        builds = facade.place_index.builds
+
+        create_place(self.owner, title='Marseille port', latitude=43.2965, longitude=5.3698)
+        facade.update_place(self.places['Sydney harbour'], {'latitude': 43.30, 'longitude': 5.37})
+        facade.delete_place(self.places['Lyon old town'])
+        self.assertEqual(self.nearest(lat=43.29, lon=5.36, k=3),
+                         ['Marseille port', 'Sydney harbour', 'Louvre museum'])
+        self.assertEqual(facade.place_index.builds, builds)
+
+    def test_writes_outside_facade_rebuild(self):
+        self.nearest(lat=0, lon=0, k=1)
+        builds = facade.place_index.builds
+        facade.place_repo.insert_many([place_data(title='Bulk', latitude=0.1, longitude=0.1, user_id=self.owner.id)])
+        self.assertEqual(self.nearest(lat=0, lon=0, k=1), ['Bulk'])
+        self.assertEqual(facade.place_index.builds, builds + 1)
+
+    def test_only_coordinate_writes_invalidate(self):
+        self.nearest(lat=0, lon=0, k=1)
+        builds = facade.place_index.builds
+        facade.update_place(self.places['Lyon old town'], {'price': 70.0})
+        facade.place_repo.update_geohashes(only_missing=False)
+        self.nearest(lat=0, lon=0, k=1)
+        self.assertEqual(facade.place_index.builds, builds)
+
+    def test_outside_write_between_commits_not_absorbed(self):
+        self.nearest(lat=0, lon=0, k=1)
+        builds = facade.place_index.builds
+        facade.place_repo.insert_many([place_data(title='Bulk', latitude=0.1, longitude=0.1, user_id=self.owner.id)])
+        # The facade write lands on a counter the tree did not follow: it must not take it
+        create_place(self.owner, title='Marseille port', latitude=43.2965, longitude=5.3698)
+        self.assertNotEqual(facade.place_index.version, facade.place_repo.get_coordinates_version())
+        self.assertEqual(self.nearest(lat=0, lon=0, k=1), ['Bulk'])
+        self.assertEqual(facade.place_index.builds, builds + 1)
+
+    def test_invalid_arguments(self):
+        for query in ({'lat': 0, 'lon': 0, 'k': 0}, {'lat': 0, 'lon': 0, 'k': 'a'}, {'lat': 0, 'lon': 200}):
+            with self.subTest(query):
+                response = self.client.get('/api/v1/places/nearest', query_string=query)
+                self.assertEqual(response.status_code, 400)
+
+
+class BackgroundReloadConfig(config.TestingConfig):
+    PLACE_INDEX_BACKGROUND_RELOAD = True
+
+
+class TestBackgroundReload(AppTestCase):
+    config_class = BackgroundReloadConfig
+
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user()
+        create_place(self.owner, title='Louvre museum', latitude=48.8606, longitude=2.3376)
+        self.index = facade.place_index
+        self.index.start(self.app)
+        self.index.wait()
+        self.loading = threading.Event()
+        self.release = threading.Event()
+
+    def titles(self, lat, lon, k):
+        return [facade.get_place(place_id).title for _, place_id in self.index.nearest(lat, lon, k)]
+
+    def slow_load(self):
+        """Patch PlaceRepository.get_coordinates to hold background loads until self.release is set"""
+        get_coordinates = facade.place_repo.get_coordinates
+
+        def slow_get_coordinates():
+            self.loading.set()
+            self.release.wait(5)
+            return get_coordinates()
+
+        return patch.object(facade.place_repo, 'get_coordinates', side_effect=slow_get_coordinates)
+
+    def get_nearest(self):
+        return self.client.get('/api/v1/places/nearest', query_string={'lat': 0, 'lon': 0, 'k': 1})
+
+    def test_first_load_does_not_block_queries(self):
+        self.index.reset()
+        with self.slow_load():
+            self.assertEqual(self.get_nearest().status_code, 503)
+            self.assertTrue(self.loading.wait(5))
+            self.assertEqual(self.get_nearest().status_code, 503)
+            self.release.set()
+            self.index.wait()
+        self.assertEqual(self.get_nearest().json[0]['title'], 'Louvre museum')
+
+    def test_old_tree_answers_not_cached_as_current(self):
+        self.assertEqual(self.get_nearest().json[0]['title'], 'Louvre museum')
+        facade.place_repo.insert_many([place_data(title='Bulk', latitude=0.1, longitude=0.1, user_id=self.owner.id)])
+        with self.slow_load():
+            stale = self.get_nearest()
+            self.assertEqual(stale.json[0]['title'], 'Louvre museum')
+            self.release.set()
+            self.index.wait()
+        response = self.client.get('/api/v1/places/nearest', query_string={'lat': 0, 'lon': 0, 'k': 1},
+                                   headers={'If-None-Match': stale.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json[0]['title'], 'Bulk')
+        self.assertEqual(self.get_nearest().json[0]['title'], 'Bulk')
+
+    def test_old_tree_served_and_facade_writes_replayed(self):
+        self.assertEqual(self.titles(0, 0, 1), ['Louvre museum'])
+        builds = self.index.builds
+        facade.place_repo.insert_many([place_data(title='Bulk', latitude=0.1, longitude=0.1, user_id=self.owner.id)])
+        with self.slow_load():
+            self.assertEqual(self.titles(0, 0, 1), ['Louvre museum'])
+            self.assertTrue(self.loading.wait(5))
+            self.assertTrue(self.index.stats()['reloading'])
+            # Applied to the tree in use now, and replayed on the one being loaded
+            create_place(self.owner, title='Gulf of Guinea', latitude=0.05, longitude=0.05)
+            self.assertEqual(self.titles(0, 0, 1), ['Gulf of Guinea'])
+            self.release.set()
+            self.index.wait()
+
+        self.assertEqual(self.index.builds, builds + 1)
+        self.assertEqual(self.titles(0, 0, 2), ['Gulf of Guinea', 'Bulk'])
+        self.assertEqual(self.index.version, facade.place_repo.get_coordinates_version())
+        self.assertEqual(self.index.builds, builds + 1)
+
+
+class TestPreload(unittest.TestCase):
+    def test_tree_loaded_by_create_app(self):
+        with tempfile.TemporaryDirectory() as directory:
+            class FileConfig(config.TestingConfig):
+                SQLALCHEMY_DATABASE_URI = f'sqlite:///{directory}/hbnb.db'
+                PLACE_INDEX_BACKGROUND_RELOAD = True
+
+            class PreloadConfig(FileConfig):
+                PLACE_INDEX_PRELOAD = True
+
+            with create_app(FileConfig).app_context():
+                db.create_all()
+                create_place(create_user(), title='Louvre museum')
+                db.session.remove()
+            app = create_app(PreloadConfig)
+            facade.place_index.wait()
+            self.assertEqual(facade.place_index.stats()['size'], 1)
+            with app.app_context():
+                response = app.test_client().get('/api/v1/places/nearest', query_string={'lat': 0, 'lon': 0})
+                self.assertEqual(response.json[0]['title'], 'Louvre museum')
+                db.drop_all()
+                db.engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
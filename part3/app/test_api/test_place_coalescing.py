@@ -0,0 +1,52 @@
+import threading
+import time
+import unittest
+from unittest import mock
+from app.api.v1 import places
+from app.services import facade
+from app.services.singleflight import SingleFlightTimeout
+from app.testing import AppTestCase, create_place, create_user
+
+
+class TestPlaceCoalescing(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.place_id = create_place(create_user(), title='Viral loft').id
+        self.url = f'/api/v1/places/{self.place_id}'
+
+    def test_concurrent_reads_load_once(self):
+        render = places.render_place_details
+        renders = []
+
+        def slow_render(*args):
+            renders.append(1)
+            time.sleep(0.3)
+            return render(*args)
+
+        responses = []
+        def get():
+            responses.append(self.app.test_client().get(self.url))
+
+        before = facade.stats()['singleflight']['coalesced']
+        with mock.patch.object(places, 'render_place_details', slow_render):
+            threads = [threading.Thread(target=get) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual([response.status_code for response in responses], [200] * 6)
+        self.assertTrue(all(response.json['title'] == 'Viral loft' for response in responses))
+        self.assertEqual(len(renders), 1)
+        self.assertEqual(facade.stats()['singleflight']['coalesced'] - before, 5)
+
+    def test_timeout_is_503(self):
+        with mock.patch.object(facade, 'coalesce', side_effect=SingleFlightTimeout):
+            response = self.app.test_client().get(self.url)
+        self.assertEqual(response.status_code, 503)
+
+    def test_missing_place(self):
+        self.assertEqual(self.app.test_client().get('/api/v1/places/unknown').status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
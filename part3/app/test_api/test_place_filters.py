@@ -0,0 +1,74 @@
+import unittest
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user
+
+
+class TestPlaceFilters(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user()
+        self.wifi = facade.create_amenity({'name': 'Wifi'})
+        self.pool = facade.create_amenity({'name': 'Pool'})
+        self.places = {}
+        for title, price, amenities in [('Cheap room', 20.0, [self.wifi.id]),
+                                        ('Mid flat', 60.0, [self.wifi.id, self.pool.id]),
+                                        ('Villa', 300.0, [self.pool.id])]:
+            self.places[title] = create_place(self.owner, title=title, price=price, amenities=amenities)
+        for title, ratings in [('Cheap room', [2, 3]), ('Mid flat', [5, 4])]:
+            for rating in ratings:
+                facade.create_review({'text': 'Stayed there', 'rating': rating,
+                                      'place_id': self.places[title].id}, create_user().id)
+
+    def titles(self, **query):
+        response = self.client.get('/api/v1/places/', query_string=query)
+        self.assertEqual(response.status_code, 200)
+        return sorted(place['title'] for place in response.json)
+
+    def test_price_range(self):
+        self.assertEqual(self.titles(max_price=100), ['Cheap room', 'Mid flat'])
+        self.assertEqual(self.titles(min_price=50, max_price=100), ['Mid flat'])
+        self.assertEqual(self.titles(min_price=1000), [])
+
+    def test_amenities_all_required(self):
+        self.assertEqual(self.titles(amenity=self.pool.id), ['Mid flat', 'Villa'])
+        self.assertEqual(self.titles(amenity=[self.pool.id, self.wifi.id]), ['Mid flat'])
+
+    def test_next_link_keeps_repeated_filters(self):
+        for title, amenities in [('Resort', [self.wifi.id, self.pool.id]), ('Pool house', [self.pool.id]),
+                                 ('Spa', [self.wifi.id, self.pool.id])]:
+            create_place(self.owner, title=title, price=150.0, amenities=amenities)
+        url = f'/api/v1/places/?amenity={self.pool.id}&amenity={self.wifi.id}&limit=2'
+        titles = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            titles.extend(place['title'] for place in response.json)
+            link = response.headers.get('Link')
+            url = link[1:link.index('>')] if link else None
+        self.assertEqual(sorted(titles), ['Mid flat', 'Resort', 'Spa'])
+
+    def test_min_rating(self):
+        self.assertEqual(self.titles(min_rating=2.5), ['Cheap room', 'Mid flat'])
+        self.assertEqual(self.titles(min_rating=4), ['Mid flat'])
+
+    def test_composes_with_sparse_and_pagination(self):
+        response = self.client.get('/api/v1/places/', query_string={'max_price': 100, 'fields': 'title,price',
+                                                                      'limit': 1})
+        self.assertEqual(len(response.json), 1)
+        self.assertEqual(set(response.json[0]), {'id', 'title', 'price'})
+        cursor = response.headers['X-Next-Cursor']
+        self.assertIn('max_price=100', response.headers['Link'])
+
+        response = self.client.get('/api/v1/places/', query_string={'max_price': 100, 'fields': 'title,price',
+                                                                      'limit': 1, 'after': cursor})
+        self.assertEqual(len(response.json), 1)
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_invalid_filter(self):
+        for query in ({'min_price': 'cheap'}, {'max_price': 'nan'}, {'min_rating': ''}):
+            with self.subTest(query):
+                self.assertEqual(self.client.get('/api/v1/places/', query_string=query).status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
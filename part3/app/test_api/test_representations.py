@@ -0,0 +1,36 @@
+import unittest
+import config
+from app import create_app, db
+from app.api.representations import ORJSON_CODEC, STDLIB_CODEC, get_codec
+
+
+class TestJSONBackend(unittest.TestCase):
+    def test_get_codec(self):
+        self.assertIs(get_codec('json'), STDLIB_CODEC)
+        self.assertIs(get_codec('auto'), ORJSON_CODEC or STDLIB_CODEC)
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+    def test_codecs_agree(self):
+        data = [{'id': 'a', 'price': 10.5, 'owner': {'email': 'é@example.com'}, 'reviews': []}]
+        for codec in filter(None, (STDLIB_CODEC, ORJSON_CODEC)):
+            with self.subTest(codec.name):
+                self.assertEqual(codec.loads(codec.dumps(data)), data)
+
+    def test_api_uses_configured_codec(self):
+        for backend in ('json', 'auto'):
+            class BackendConfig(config.TestingConfig):
+                JSON_BACKEND = backend
+            app = create_app(BackendConfig)
+            with app.app_context():
+                db.create_all()
+                response = app.test_client().get('/api/v1/amenities/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.mimetype, 'application/json')
+                self.assertEqual(response.json, [])
+                self.assertEqual(app.extensions['json_codec'], get_codec(backend))
+                db.drop_all()
+
+
+if __name__ == "__main__":
+    unittest.main()
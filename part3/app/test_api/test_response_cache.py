@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import patch
+import config
+from app import create_app, db
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user
+
+
+class TestResponseCache(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = self.app.extensions['response_cache']
+        for i in range(3):
+            facade.create_amenity({'name': f'Amenity {i}'})
+
+    def test_hit_replays_body_and_headers(self):
+        first = self.client.get('/api/v1/amenities/?limit=2')
+        second = self.client.get('/api/v1/amenities/?limit=2')
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(second.headers['X-Next-Cursor'], first.headers['X-Next-Cursor'])
+        self.assertEqual(second.mimetype, 'application/json')
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_write_invalidates(self):
+        self.assertEqual(len(self.client.get('/api/v1/amenities/').json), 3)
+        amenity = facade.create_amenity({'name': 'Sauna'})
+        self.assertEqual(len(self.client.get('/api/v1/amenities/').json), 4)
+
+        facade.update_amenity(amenity.id, {'name': 'Hammam'})
+        names = [row['name'] for row in self.client.get('/api/v1/amenities/').json]
+        self.assertIn('Hammam', names)
+        self.assertEqual(self.cache.stats()['hits'], 0)
+        self.assertEqual(self.cache.stats()['entries'], 1)
+
+    def test_embedded_entity_write_invalidates_places(self):
+        owner = create_user()
+        create_place(owner)
+        self.assertEqual(self.client.get('/api/v1/places/').json[0]['owner']['first_name'], 'John')
+        facade.update_user(owner.id, {'first_name': 'Jack'})
+        self.assertEqual(self.client.get('/api/v1/places/').json[0]['owner']['first_name'], 'Jack')
+
+    def test_facade_write_invalidates_without_counters(self):
+        # A database whose entity_versions counters never move
+        with patch.object(facade, 'get_collection_version', return_value=(0,)):
+            self.assertEqual(len(self.client.get('/api/v1/amenities/').json), 3)
+            facade.create_amenity({'name': 'Sauna'})
+            self.assertEqual(len(self.client.get('/api/v1/amenities/').json), 4)
+            owner = create_user()
+            create_place(owner)
+            self.assertEqual(self.client.get('/api/v1/places/').json[0]['owner']['first_name'], 'John')
+            facade.update_user(owner.id, {'first_name': 'Jack'})
+            self.assertEqual(self.client.get('/api/v1/places/').json[0]['owner']['first_name'], 'Jack')
+        self.assertEqual(self.cache.stats()['hits'], 0)
+
+    def test_query_string_normalized(self):
+        self.client.get('/api/v1/places/?limit=5&fields=title')
+        self.client.get('/api/v1/places/?fields=title&limit=5')
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_reordered_query_revalidates(self):
+        etag = self.client.get('/api/v1/amenities/?limit=2&after=').headers['ETag']
+        replayed = self.client.get('/api/v1/amenities/?after=&limit=2')
+        self.assertEqual(replayed.headers['ETag'], etag)
+        response = self.client.get('/api/v1/amenities/?after=&limit=2', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_errors_not_cached(self):
+        self.assertEqual(self.client.get('/api/v1/amenities/?limit=0').status_code, 400)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+
+class TinyCacheConfig(config.TestingConfig):
+    RESPONSE_CACHE_BYTES = 16
+
+
+class TestResponseCacheLimit(unittest.TestCase):
+    def test_oversized_body_not_stored(self):
+        app = create_app(TinyCacheConfig)
+        with app.app_context():
+            db.create_all()
+            for i in range(3):
+                facade.create_amenity({'name': f'Amenity {i}'})
+            client = app.test_client()
+            client.get('/api/v1/amenities/')
+            self.assertEqual(len(client.get('/api/v1/amenities/').json), 3)
+            stats = app.extensions['response_cache'].stats()
+            self.assertEqual((stats['entries'], stats['hits']), (0, 0))
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == "__main__":
+    unittest.main()
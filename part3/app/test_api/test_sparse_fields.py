@@ -0,0 +1,64 @@
+import unittest
+from sqlalchemy import event
+from app import db
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user
+
+
+class TestSparseFields(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user()
+        self.amenity = facade.create_amenity({'name': 'Wi-Fi'})
+        self.place = create_place(self.owner, amenities=[self.amenity.id])
+
+    def get(self, url):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        db.session.expire_all()
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = self.client.get(url)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return response, statements
+
+    def test_fields_only(self):
+        response, statements = self.get('/api/v1/places/?fields=title,price')
+        self.assertEqual(response.json, [{'id': self.place.id, 'title': 'Cozy apartment', 'price': 80.0}])
+        place_queries = [sql for sql in statements if 'FROM places' in sql and 'entity_versions' not in sql]
+        self.assertEqual(len(place_queries), 1)
+        self.assertNotIn('places.description', place_queries[0])
+        self.assertFalse(any('FROM reviews' in sql or 'FROM users' in sql for sql in statements))
+
+    def test_include(self):
+        response, _ = self.get(f'/api/v1/places/{self.place.id}?fields=title&include=owner,amenities')
+        self.assertEqual(response.json['owner']['id'], self.owner.id)
+        self.assertEqual(response.json['amenities'], [{'id': self.amenity.id, 'name': 'Wi-Fi'}])
+        self.assertNotIn('reviews', response.json)
+        self.assertNotIn('price', response.json)
+
+    def test_include_without_fields_keeps_scalars(self):
+        response, _ = self.get('/api/v1/places/?include=reviews')
+        self.assertEqual(response.json[0]['owner_id'], self.owner.id)
+        self.assertEqual(response.json[0]['reviews'], [])
+        self.assertNotIn('owner', response.json[0])
+
+    def test_default_is_full_representation(self):
+        response, _ = self.get(f'/api/v1/places/{self.place.id}')
+        self.assertEqual(set(response.json), {'id', 'title', 'description', 'price', 'latitude', 'longitude',
+                                              'owner', 'amenities', 'reviews'})
+
+    def test_etag_depends_on_fields(self):
+        url = f'/api/v1/places/{self.place.id}'
+        etag = self.client.get(url + '?fields=title').headers['ETag']
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid(self):
+        self.assertEqual(self.client.get('/api/v1/places/?fields=password').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/v1/places/{self.place.id}?include=user').status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
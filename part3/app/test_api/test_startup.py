@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+import config
+from app import NAMESPACES, create_app
+from app.api.representations import STDLIB_CODEC
+
+
+class NoDocsConfig(config.TestingConfig):
+    API_DOCS_ENABLED = False
+
+
+class TestStartup(unittest.TestCase):
+    def test_timings_per_phase(self):
+        timings = create_app(config.TestingConfig).extensions['startup']
+        for module, _ in NAMESPACES:
+            self.assertIn(module.rsplit('.', 1)[1], timings)
+        self.assertGreaterEqual(timings['total'], timings['extensions'])
+
+    def test_import_skips_api_layer(self):
+        # A fresh interpreter: this one already imported flask_restx
+        code = "import sys, app; print('flask_restx' in sys.modules)"
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), 'False')
+
+    def test_spec_serialized_once(self):
+        app = create_app(config.TestingConfig)
+        client = app.test_client()
+        with mock.patch.object(STDLIB_CODEC, 'dumps', wraps=STDLIB_CODEC.dumps) as dumps:
+            app.extensions['json_codec'] = STDLIB_CODEC
+            first = client.get('/swagger.json')
+            second = client.get('/swagger.json')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.get_data(), second.get_data())
+        self.assertIn('/api/v1/places/', first.json['paths'])
+        self.assertEqual(dumps.call_count, 1)
+
+        response = client.get('/swagger.json', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_docs_disabled(self):
+        app = create_app(NoDocsConfig)
+        client = app.test_client()
+        self.assertEqual(client.get('/swagger.json').status_code, 404)
+        self.assertEqual(client.get('/').status_code, 404)
+        self.assertIn('/api/v1/amenities/', {rule.rule for rule in app.url_map.iter_rules()})
+
+
+if __name__ == "__main__":
+    unittest.main()
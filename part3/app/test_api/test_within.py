@@ -0,0 +1,83 @@
+import unittest
+from app.services import facade
+from app.spatial.polygon import ring_bounds
+from app.testing import AppTestCase, create_place, create_user
+
+LANDMARKS = {
+    'Louvre museum': (48.8606, 2.3376),
+    'Eiffel tower': (48.8584, 2.2945),
+    'Versailles palace': (48.8049, 2.1204),
+    'Lyon old town': (45.7640, 4.8357),
+    'Fiji east': (-17.7, 179.95),
+    'Fiji west': (-17.7, -179.95),
+}
+
+# Thin triangle over the Eiffel tower; the Louvre is inside its bounding box only
+TRIANGLE = [[[2.28, 48.87], [2.30, 48.87], [2.36, 48.80], [2.28, 48.87]]]
+
+
+class TestWithin(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        owner = create_user()
+        for title, (lat, lon) in LANDMARKS.items():
+            create_place(owner, title=title, latitude=lat, longitude=lon)
+
+    def within(self, body, status=200, **query):
+        response = self.client.post('/api/v1/places/within', json=body, query_string=query)
+        self.assertEqual(response.status_code, status, response.json)
+        return response
+
+    def titles(self, body, **query):
+        return sorted(place['title'] for place in self.within(body, **query).json)
+
+    def test_bbox(self):
+        self.assertEqual(self.titles({'bbox': [2.0, 48.7, 2.5, 48.9]}),
+                         ['Eiffel tower', 'Louvre museum', 'Versailles palace'])
+        self.assertEqual(self.titles({'bbox': [179.9, -18, -179.9, -17]}), ['Fiji east', 'Fiji west'])
+
+    def test_polygon(self):
+        polygon = {'type': 'Polygon', 'coordinates': [[[2.0, 48.7], [2.5, 48.7], [2.5, 48.9], [2.0, 48.9], [2.0, 48.7]]]}
+        self.assertEqual(self.titles({'polygon': polygon}), ['Eiffel tower', 'Louvre museum', 'Versailles palace'])
+        places = self.within({'polygon': {'type': 'Polygon', 'coordinates': [
+            [[2.0, 48.7], [2.5, 48.7], [2.5, 48.9], [2.0, 48.9], [2.0, 48.7]],
+            [[2.1, 48.78], [2.15, 48.78], [2.15, 48.82], [2.1, 48.82], [2.1, 48.78]]
+        ]}}, fields='title').json
+        self.assertEqual(sorted(place['title'] for place in places), ['Eiffel tower', 'Louvre museum'])
+        self.assertEqual(set(places[0]), {'id', 'title'})
+
+    def test_pagination(self):
+        polygon = {'type': 'Polygon', 'coordinates': [[[0, 40], [5, 40], [5, 50], [0, 50], [0, 40]]]}
+        seen = []
+        after = None
+        while True:
+            query = {'limit': 1, 'after': after} if after else {'limit': 1}
+            response = self.within({'polygon': polygon}, **query)
+            self.assertEqual(len(response.json), 1)
+            seen.append(response.json[0]['title'])
+            after = response.headers.get('X-Next-Cursor')
+            if not after:
+                break
+        self.assertEqual(sorted(seen), ['Eiffel tower', 'Louvre museum', 'Lyon old town', 'Versailles palace'])
+        self.assertEqual(len(set(seen)), 4)
+
+    def test_polygon_filter_and_chunks(self):
+        rings = [[(lon, lat) for lon, lat in TRIANGLE[0]]]
+        boxes = [ring_bounds(rings)]
+        self.assertEqual(len(facade.place_repo.within(boxes)[0]), 2)
+        places, next_cursor = facade.place_repo.within(boxes, rings, limit=1, chunk_size=1)
+        self.assertEqual([place.title for place in places], ['Eiffel tower'])
+        self.assertIsNone(next_cursor)
+
+    def test_invalid(self):
+        self.within({'bbox': [2.0, 48.9, 2.5, 48.7]}, 400)
+        self.within({'bbox': [2.0, 48.7, 2.5]}, 400)
+        self.within({'polygon': {'type': 'Point', 'coordinates': [2.0, 48.7]}}, 400)
+        self.within({'polygon': {'type': 'Polygon', 'coordinates': [[[2.0, 48.7], [2.5, 48.7]]]}}, 400)
+        self.within({}, 400)
+        self.app.config['WITHIN_MAX_VERTICES'] = 4
+        response = self.within({'polygon': {'type': 'Polygon', 'coordinates': TRIANGLE * 2}}, 400)
+        self.assertEqual(response.json, {'error': 'Polygon has too many vertices'})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
 from app.models.place import Place
 from app.models.user import User
 from app.models.review import Review
+from app.models.amenity import Amenity
+from app.models.amenities_places import AmenityPlace  # noqa: F401, maps the amenities_places secondary
 
 def test_place_creation():
     owner = User(first_name="Alice", last_name="Smith", email="alice.smith@example.com")
@@ -14,6 +16,16 @@ def test_place_creation():
     assert place.price == 100
     assert len(place.reviews) == 1
     assert place.reviews[0].text == "Great stay!"
+
+    # The backref already linked the review: adding it again is a no-op
+    place.add_review(review)
+    assert len(place.reviews) == 1
+
+    wifi = Amenity(name="Wi-Fi")
+    place.add_amenity(wifi)
+    place.add_amenity(wifi)
+    assert place.amenities == [wifi]
     print("Place creation and relationship test passed!")
 
-test_place_creation()
+if __name__ == "__main__":
+    test_place_creation()
@@ -0,0 +1,105 @@
+import unittest
+from sqlalchemy import event
+import config
+from app import db
+from app.persistence.cache import EntityCache, SizedCache
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user
+
+
+class CachedConfig(config.TestingConfig):
+    REPOSITORY_CACHE = {'place': {'maxsize': 2, 'ttl': 60}, 'user': {'maxsize': 10, 'ttl': 60}}
+
+
+class TestEntityCache(AppTestCase):
+    config_class = CachedConfig
+
+    def setUp(self):
+        super().setUp()
+        owner = create_user()
+        self.owner_id = owner.id
+        self.places = [create_place(owner, title=f'Place {i}').id for i in range(3)]
+
+    def tearDown(self):
+        super().tearDown()
+        facade.configure(config.TestingConfig.__dict__)
+
+    def new_request(self):
+        db.session.remove()
+
+    def count_queries(self, fn):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return result, len(statements)
+
+    def test_read_through(self):
+        place_id = self.places[0]
+        self.new_request()
+        facade.get_place(place_id)
+        self.new_request()
+        place, queries = self.count_queries(lambda: facade.get_place(place_id))
+        self.assertEqual(queries, 0)
+        self.assertEqual(place.title, 'Place 0')
+        self.assertEqual(place.owner.id, self.owner_id)
+        self.assertEqual(facade.place_repo.cache.hits, 1)
+
+    def test_invalidated_on_update(self):
+        place_id = self.places[0]
+        facade.get_place(place_id)
+        facade.update_place(place_id, {'title': 'Renamed place'})
+        self.new_request()
+        self.assertEqual(facade.get_place(place_id).title, 'Renamed place')
+
+    def test_invalidated_on_commit_of_dirty_object(self):
+        place_id = self.places[0]
+        self.new_request()
+        place = facade.get_place(place_id)
+        place.price = 75.0
+        db.session.commit()
+        self.new_request()
+        self.assertEqual(facade.get_place(place_id).price, 75.0)
+
+    def test_invalidated_on_delete(self):
+        place_id = self.places[0]
+        facade.get_place(place_id)
+        facade.delete_place(place_id)
+        self.new_request()
+        self.assertIsNone(facade.get_place(place_id))
+
+    def test_lru_eviction(self):
+        for place_id in self.places:
+            self.new_request()
+            facade.get_place(place_id)
+        stats = facade.stats()['repository_cache']['place']
+        self.assertEqual((stats['size'], stats['evictions']), (2, 1))
+        self.assertIsNone(facade.stats()['repository_cache']['review'])
+
+
+class TestEntityCacheExpiry(unittest.TestCase):
+    def test_ttl(self):
+        cache = EntityCache(maxsize=10, ttl=0)
+        cache.set('a', {'id': 'a'})
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+
+class TestSizedCache(unittest.TestCase):
+    def test_evicts_by_size(self):
+        cache = SizedCache(10)
+        cache.set('a', b'12345', 5)
+        cache.set('b', b'12345', 5)
+        cache.set('c', b'123', 3)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), b'123')
+        self.assertEqual(cache.stats()['bytes'], 8)
+        cache.set('d', b'x' * 11, 11)
+        self.assertIsNone(cache.get('d'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from app import db
+from app.services import facade
+from app.testing import AppTestCase
+
+
+class TestKeysetPagination(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.amenities = [facade.create_amenity({'name': f'Amenity {i:02d}'}) for i in range(7)]
+
+    def test_pages_cover_every_row_once(self):
+        seen = []
+        after = None
+        while True:
+            page, after = facade.get_amenities_page(3, after)
+            seen.extend(amenity.id for amenity in page)
+            if not after:
+                break
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(set(seen), {amenity.id for amenity in self.amenities})
+
+    def test_last_page_has_no_cursor(self):
+        page, after = facade.get_amenities_page(10)
+        self.assertEqual(len(page), 7)
+        self.assertIsNone(after)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            facade.get_amenities_page(3, 'not-a-cursor')
+
+    def test_rows_match_orm_page(self):
+        after = rows_after = None
+        while True:
+            page, after = facade.get_amenities_page(3, after)
+            rows, rows_after = facade.get_amenities_rows(3, rows_after)
+            self.assertEqual(rows, [amenity.to_dict() for amenity in page])
+            self.assertEqual(rows_after, after)
+            if not after:
+                break
+
+    def test_rows_skip_identity_map(self):
+        db.session.expunge_all()
+        rows, _ = facade.get_amenities_rows(10)
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(len(db.session.identity_map), 0)
+
+    def test_list_endpoint_headers(self):
+        client = self.app.test_client()
+        response = client.get('/api/v1/amenities/?limit=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 5)
+        cursor = response.headers['X-Next-Cursor']
+
+        response = client.get('/api/v1/amenities/', query_string={'limit': 5, 'after': cursor})
+        self.assertEqual(len(response.json), 2)
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+        response = client.get('/api/v1/amenities/?limit=0')
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_uses_index(self):
+        plan = db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT * FROM amenities WHERE (created_at, id) > (:c, :i) "
+            "ORDER BY created_at, id LIMIT 10"), {'c': '2000-01-01', 'i': ''}).fetchall()
+        self.assertIn('ix_amenities_created_at_id', ' '.join(row[-1] for row in plan))
+
+
+if __name__ == "__main__":
+    unittest.main()
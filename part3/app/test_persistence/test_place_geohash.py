@@ -0,0 +1,73 @@
+import random
+import unittest
+import config
+from app import db
+from app.models.place import Place
+from app.models.place_cluster import create_place_clusters
+from app.persistence.schema import create_missing_columns, create_missing_indexes
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user, place_data
+
+
+class GeohashConfig(config.TestingConfig):
+    GEOHASH_PRECISION = 7
+
+
+class TestPlaceGeohash(AppTestCase):
+    config_class = GeohashConfig
+
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user()
+
+    def test_computed_on_validation(self):
+        place = create_place(self.owner, latitude=48.8566, longitude=2.3522)
+        self.assertEqual(place.geohash, 'u09tvw0')
+        facade.update_place(place.id, {'latitude': 51.5074, 'longitude': -0.1278})
+        self.assertEqual(facade.get_place(place.id).geohash, 'gcpvj0d')
+
+    def test_bulk_insert_stores_geohash(self):
+        results = facade.create_places_bulk([place_data(latitude=48.8566, longitude=2.3522)], self.owner.id)
+        self.assertEqual(facade.get_place(results[0]['id']).geohash, 'u09tvw0')
+
+    def test_candidates_match_rtree(self):
+        random.seed(5)
+        for _ in range(300):
+            create_place(self.owner, latitude=round(random.uniform(48.0, 49.5), 5),
+                         longitude=round(random.uniform(1.5, 3.5), 5))
+        for radius_km in (1, 10, 60):
+            hits = facade.place_repo.nearby(48.8566, 2.3522, radius_km, 1000)
+            expected = {place.id for place, _ in hits}
+            candidates = {row.id for row in facade.place_repo.geohash_candidates(48.8566, 2.3522, radius_km)}
+            self.assertTrue(expected <= candidates)
+            if radius_km < 60:
+                self.assertLess(len(candidates), 300)
+
+    def test_update_geohashes(self):
+        place = create_place(self.owner, latitude=48.8566, longitude=2.3522)
+        db.session.execute(Place.__table__.update().values(geohash=None))
+        db.session.commit()
+        self.assertEqual(facade.place_repo.update_geohashes(), 1)
+        self.assertEqual(facade.place_repo.update_geohashes(), 0)
+        self.assertEqual(facade.place_repo.update_geohashes(precision=4, only_missing=False), 1)
+        db.session.expire_all()
+        self.assertEqual(facade.get_place(place.id).geohash, 'u09t')
+
+    def test_missing_column_added(self):
+        # Schema from before geohash: no column, no index, no place_clusters
+        with db.engine.begin() as connection:
+            for operation in ('insert', 'update', 'delete'):
+                connection.exec_driver_sql(f'DROP TRIGGER trg_place_clusters_{operation}')
+            connection.exec_driver_sql('DROP TABLE place_clusters')
+            connection.exec_driver_sql('DROP INDEX ix_places_geohash_price')
+            connection.exec_driver_sql('ALTER TABLE places DROP COLUMN geohash')
+        self.assertEqual(create_missing_columns(), ['places.geohash'])
+        self.assertIn('ix_places_geohash_price', create_missing_indexes())
+        self.assertEqual(create_missing_columns(), [])
+        with db.engine.begin() as connection:
+            create_place_clusters(connection)
+            self.assertIsNotNone(connection.exec_driver_sql('SELECT 1 FROM sqlite_master '
+                                                            "WHERE name = 'trg_place_clusters_insert'").first())
+
+if __name__ == "__main__":
+    unittest.main()
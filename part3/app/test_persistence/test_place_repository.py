@@ -0,0 +1,112 @@
+import unittest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.persistence.repository import get_table_versions
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user, place_data
+
+
+class TestPlaceListQueries(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.amenities = [facade.create_amenity({'name': name}) for name in ('Wi-Fi', 'Pool')]
+        self.users = [create_user() for _ in range(3)]
+
+    def create_places(self, count):
+        for i in range(count):
+            owner = self.users[i % 2]
+            place = create_place(owner, title=f'Place {i}', amenities=[a.id for a in self.amenities])
+            for user in self.users:
+                if user is not owner:
+                    facade.create_review({'text': 'Lovely stay', 'rating': 4, 'place_id': place.id}, user.id)
+
+    def count_list_queries(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        db.session.expire_all()
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            places, _ = facade.get_places_page(100)
+            payload = [place.to_dict_list() for place in places]
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return len(statements), payload
+
+    def test_constant_query_count(self):
+        self.create_places(2)
+        small, payload = self.count_list_queries()
+        self.assertEqual(len(payload), 2)
+
+        self.create_places(10)
+        large, payload = self.count_list_queries()
+        self.assertEqual(len(payload), 12)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 4)
+
+    def test_serialized_graph(self):
+        self.create_places(1)
+        _, payload = self.count_list_queries()
+        place = payload[0]
+        self.assertEqual(place['owner']['id'], self.users[0].id)
+        self.assertEqual(sorted(a['name'] for a in place['amenities']), ['Pool', 'Wi-Fi'])
+        self.assertEqual(sorted(r['user_id'] for r in place['reviews']), sorted(u.id for u in self.users[1:]))
+
+
+class TestBulkCreate(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.amenity = facade.create_amenity({'name': 'Wi-Fi'})
+        self.owner = create_user()
+
+    def test_per_row_results(self):
+        rows = [place_data(title=f'Place {i}', amenities=[self.amenity.id]) for i in range(5)]
+        rows.append(place_data(price=-1.0))
+        rows.append(place_data(amenities=['missing']))
+        rows.append(place_data(owner_id='someone-else'))
+        results = facade.create_places_bulk(rows, self.owner.id, chunk_size=2)
+
+        self.assertEqual([r['index'] for r in results], list(range(8)))
+        self.assertTrue(all('id' in r for r in results[:5]))
+        self.assertEqual(results[5]['error'], 'Price must be positive.')
+        self.assertEqual(results[6]['error'], 'Invalid input data')
+        self.assertEqual(results[7]['error'], 'Forbidden')
+
+        place = facade.get_place_details(results[0]['id'])
+        self.assertEqual(place.owner.id, self.owner.id)
+        self.assertEqual([a.id for a in place.amenities], [self.amenity.id])
+        self.assertEqual(len(facade.get_all_places()), 5)
+
+    def test_rows_checked_like_the_model(self):
+        missing_title = place_data()
+        del missing_title['title']
+        rows = [place_data(rooms=3), missing_title, place_data(latitude=91.0)]
+        results = facade.create_places_bulk(rows, self.owner.id)
+
+        self.assertEqual([r.get('error') for r in results],
+                         ["rooms' is an invalid keyword argument for Place", 'Title is required',
+                          'Latitude must be between -90 and 90.'])
+        self.assertEqual(facade.get_all_places(), [])
+
+    def test_geohash_matches_single_create(self):
+        data = place_data(latitude=48.8566, longitude=2.3522)
+        results = facade.create_places_bulk([data], self.owner.id)
+        single = facade.create_place(data, self.owner.id)
+        self.assertEqual(facade.get_place(results[0]['id']).geohash, single.geohash)
+
+    def test_failed_insert_restores_triggers(self):
+        rows = [place_data(id='same-id', user_id=self.owner.id)] * 2
+        with self.assertRaises(IntegrityError):
+            facade.place_repo.insert_many(rows)
+        before = get_table_versions('places', 'places_coordinates')
+        place = create_place(self.owner)
+        self.assertEqual(get_table_versions('places', 'places_coordinates'), (before[0] + 1, before[1] + 1))
+        self.assertEqual(len(facade.place_repo.nearby(place.latitude, place.longitude, 1, 10)), 1)
+
+    def test_admin_sets_owner(self):
+        results = facade.create_places_bulk([place_data(owner_id=self.owner.id)], 'admin-id', is_admin=True)
+        self.assertEqual(facade.get_place(results[0]['id']).user_id, self.owner.id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from sqlalchemy import exists, select
+from app import db
+from app.models.amenities_places import AmenityPlace
+from app.models.place import Place
+from app.models.review import Review
+from app.persistence.schema import create_missing_indexes
+from app.testing import AppTestCase
+
+# Hot lookups issued by relationship loads and facade probes
+HOT_QUERIES = {
+    'reviews by place': select(Review).where(Review.place_id == 'p'),
+    'reviews by places (selectin)': select(Review).where(Review.place_id.in_(['p', 'q'])),
+    'reviews by user': select(Review).where(Review.user_id == 'u'),
+    'duplicate review probe': select(exists().where(Review.user_id == 'u', Review.place_id == 'p')),
+    'places by owner': select(Place).where(Place.user_id == 'u'),
+    'places by amenity': select(Place).join(AmenityPlace).where(AmenityPlace.amenity_id == 'a'),
+    'amenities by place': select(AmenityPlace).where(AmenityPlace.place_id == 'p'),
+    'places by price': select(Place).where(Place.price >= 10, Place.price <= 50),
+}
+
+
+class TestQueryPlans(AppTestCase):
+    def plan(self, statement):
+        sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        return [row[-1] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql))]
+
+    def test_hot_queries_use_indexes(self):
+        for name, statement in HOT_QUERIES.items():
+            with self.subTest(name):
+                plan = self.plan(statement)
+                scans = [step for step in plan if step.startswith('SCAN') and step.split()[1] in db.metadata.tables]
+                self.assertEqual(scans, [], f"{name} degraded to a scan: {plan}")
+
+    def test_indexes_added_to_existing_database(self):
+        db.session.execute(db.text('DROP INDEX ix_reviews_place_id'))
+        db.session.execute(db.text('DROP INDEX ix_places_user_id'))
+        db.session.commit()
+        self.assertEqual(sorted(create_missing_indexes()), ['ix_places_user_id', 'ix_reviews_place_id'])
+        self.assertEqual(create_missing_indexes(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import patch
+from app import db
+from app.models.review import Review
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user
+
+
+class TestDuplicateReview(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        owner = create_user()
+        self.reviewer = create_user()
+        self.place = create_place(owner)
+
+    def review_data(self):
+        return {'text': 'Lovely stay', 'rating': 5, 'place_id': self.place.id}
+
+    def test_exists_probe(self):
+        self.assertFalse(facade.review_repo.exists_for_user_and_place(self.reviewer.id, self.place.id))
+        facade.create_review(self.review_data(), self.reviewer.id)
+        self.assertTrue(facade.review_repo.exists_for_user_and_place(self.reviewer.id, self.place.id))
+
+    def test_second_review_rejected(self):
+        facade.create_review(self.review_data(), self.reviewer.id)
+        with self.assertRaises(KeyError) as context:
+            facade.create_review(self.review_data(), self.reviewer.id)
+        self.assertEqual(context.exception.args[0], 'You have already reviewed this place.')
+
+    def test_unique_index_closes_race(self):
+        facade.create_review(self.review_data(), self.reviewer.id)
+        # Both requests passed the probe before either committed
+        with patch.object(facade.review_repo, 'exists_for_user_and_place', return_value=False):
+            with self.assertRaises(KeyError):
+                facade.create_review(self.review_data(), self.reviewer.id)
+        self.assertEqual(Review.query.count(), 1)
+
+    def test_probe_uses_index(self):
+        plan = db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT 1 FROM reviews WHERE user_id = :u AND place_id = :p"),
+            {'u': self.reviewer.id, 'p': self.place.id}).fetchall()
+        self.assertIn('uq_reviews_user_place', ' '.join(row[-1] for row in plan))
+
+
+if __name__ == "__main__":
+    unittest.main()
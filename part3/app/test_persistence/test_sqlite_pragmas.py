@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+import config
+from app import create_app, db
+from app.persistence.sqlite import sqlite_engine_options
+
+
+class TestProductionPragmas(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+        class ProductionTestConfig(config.ProductionConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(self.tmpdir.name, 'hbnb.db')
+            SQLALCHEMY_ENGINE_OPTIONS = dict(config.ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS, connect_args={
+                'pragmas': dict(config.ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS['connect_args']['pragmas'],
+                                cache_size=-2000)
+            })
+
+        self.app = create_app(ProductionTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.app_context.pop()
+        self.tmpdir.cleanup()
+
+    def pragma(self, name):
+        return db.session.execute(db.text(f'PRAGMA {name}')).scalar()
+
+    def test_pragmas_applied(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('foreign_keys'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -2000)
+
+    def test_rejects_invalid_pragma_name(self):
+        with self.assertRaises(ValueError):
+            sqlite_engine_options('sqlite://', {'connect_args': {'pragmas': {'journal_mode; DROP TABLE users': 'WAL'}}})
+
+    def test_other_databases_get_no_pragmas(self):
+        options = sqlite_engine_options('postgresql://localhost/hbnb', config.ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS)
+        self.assertEqual(options['connect_args'], {})
+        self.assertEqual(options['pool_size'], config.ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS['pool_size'])
+
+
+if __name__ == "__main__":
+    unittest.main()
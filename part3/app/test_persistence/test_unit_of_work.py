@@ -0,0 +1,62 @@
+import unittest
+from sqlalchemy import event
+from app import db
+from app.models.place import Place
+from app.services import facade
+from app.testing import AppTestCase, create_place, create_user
+
+
+class TestUnitOfWork(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user()
+        self.amenity = facade.create_amenity({'name': 'Wi-Fi'})
+        self.flushes = 0
+        self.commits = 0
+        event.listen(db.session(), 'after_flush', self.count_flush)
+        event.listen(db.session(), 'after_commit', self.count_commit)
+
+    def count_flush(self, session, flush_context):
+        self.flushes += 1
+
+    def count_commit(self, session):
+        self.commits += 1
+
+    def test_create_place_single_commit(self):
+        place = create_place(self.owner, amenities=[self.amenity.id])
+        self.assertEqual((self.flushes, self.commits), (1, 1))
+        self.assertEqual([a.id for a in place.amenities], [self.amenity.id])
+
+    def test_create_place_rolls_back_on_unknown_amenity(self):
+        with self.assertRaises(KeyError):
+            create_place(self.owner, amenities=[{'id': 'missing'}])
+        self.assertEqual(self.commits, 0)
+        self.assertEqual(Place.query.count(), 0)
+
+    def test_review_lifecycle_single_commit(self):
+        place = create_place(self.owner)
+        reviewer = create_user()
+        self.flushes = self.commits = 0
+
+        review = facade.create_review({'text': 'Lovely stay', 'rating': 5, 'place_id': place.id}, reviewer.id)
+        self.assertEqual((self.flushes, self.commits), (1, 1))
+
+        self.flushes = self.commits = 0
+        facade.delete_review(review.id)
+        self.assertEqual((self.flushes, self.commits), (1, 1))
+        self.assertIsNone(facade.get_review(review.id))
+
+    def test_delete_place_with_reviews(self):
+        place = create_place(self.owner, amenities=[self.amenity.id])
+        reviewer = create_user()
+        facade.create_review({'text': 'Lovely stay', 'rating': 5, 'place_id': place.id}, reviewer.id)
+        self.flushes = self.commits = 0
+
+        facade.delete_place(place.id)
+        self.assertEqual((self.flushes, self.commits), (1, 1))
+        self.assertIsNone(facade.get_place(place.id))
+        self.assertEqual(facade.get_all_reviews(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+from app.services.singleflight import SingleFlight, SingleFlightTimeout
+
+
+class TestSingleFlight(unittest.TestCase):
+    def run_concurrently(self, flight, fn, callers=8, timeout=None):
+        results, errors = [], []
+        started = threading.Barrier(callers)
+
+        def call():
+            started.wait()
+            try:
+                results.append(flight.do('key', fn, timeout))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        runs = []
+
+        def load():
+            runs.append(1)
+            time.sleep(0.2)
+            return {'id': 'p'}
+
+        results, errors = self.run_concurrently(flight, load)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+        stats = flight.stats()
+        self.assertEqual((stats['executions'], stats['coalesced'], stats['in_flight']), (1, 7, 0))
+
+    def test_error_shared_with_waiters(self):
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.2)
+            raise ValueError('boom')
+
+        results, errors = self.run_concurrently(flight, fail, callers=4)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(flight.stats()['errors'], 1)
+
+    def test_waiter_timeout(self):
+        flight = SingleFlight()
+        results, errors = self.run_concurrently(flight, lambda: time.sleep(0.5), callers=3, timeout=0.05)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(all(isinstance(error, SingleFlightTimeout) for error in errors))
+        self.assertEqual(flight.stats()['timeouts'], 2)
+
+    def test_sequential_calls_not_cached(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+        self.assertEqual(flight.do('key', lambda: 2), 2)
+        self.assertEqual(flight.stats()['coalesced'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
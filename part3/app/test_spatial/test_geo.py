@@ -0,0 +1,39 @@
+import unittest
+from app.spatial.geo import bounding_boxes, haversine_km
+
+
+def inside(boxes, lat, lon):
+    return any(min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+               for min_lat, max_lat, min_lon, max_lon in boxes)
+
+
+class TestGeo(unittest.TestCase):
+    def test_haversine(self):
+        # Paris - London, about 344 km
+        self.assertAlmostEqual(haversine_km(48.8566, 2.3522, 51.5074, -0.1278), 343.6, delta=1)
+        self.assertEqual(haversine_km(10.0, 20.0, 10.0, 20.0), 0)
+        self.assertAlmostEqual(haversine_km(0, 179.9, 0, -179.9), 22.24, delta=0.01)
+
+    def test_box_contains_circle(self):
+        boxes = bounding_boxes(48.8566, 2.3522, 50)
+        self.assertEqual(len(boxes), 1)
+        for bearing_point in [(49.306, 2.3522), (48.407, 2.3522), (48.8566, 3.034), (48.8566, 1.670)]:
+            self.assertLessEqual(haversine_km(48.8566, 2.3522, *bearing_point), 50)
+            self.assertTrue(inside(boxes, *bearing_point))
+        self.assertFalse(inside(boxes, 49.5, 2.3522))
+
+    def test_antimeridian_split(self):
+        boxes = bounding_boxes(-17.7, 179.9, 30)
+        self.assertEqual(len(boxes), 2)
+        self.assertTrue(inside(boxes, -17.7, -179.9))
+        self.assertTrue(inside(boxes, -17.7, 179.7))
+        self.assertFalse(inside(boxes, -17.7, 0))
+
+    def test_pole(self):
+        boxes = bounding_boxes(89.9, 10, 50)
+        self.assertEqual(len(boxes), 1)
+        self.assertEqual(boxes[0][1:], (90.0, -180.0, 180.0))
+        self.assertTrue(inside(boxes, 89.8, -170))
+
+if __name__ == "__main__":
+    unittest.main()
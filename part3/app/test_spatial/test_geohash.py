@@ -0,0 +1,84 @@
+import random
+import unittest
+from unittest import mock
+from app.spatial import geohash
+from app.spatial.geo import haversine_km
+from app.spatial.geohash import bounds, cells_in_box, count_cells_in_box, covering_cells, encode, encode_many, \
+    neighbours, overlaps, zoom_precision
+
+
+class TestGeohash(unittest.TestCase):
+    def test_encode(self):
+        self.assertEqual(encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(encode(48.8566, 2.3522, 5), 'u09tv')
+        self.assertEqual(encode(-90, -180, 3), '000')
+        self.assertEqual(encode(90, 180, 4), 'zzzz')
+
+    def test_encode_cells_contain_point(self):
+        random.seed(5)
+        for _ in range(500):
+            lat, lon, precision = random.uniform(-90, 90), random.uniform(-180, 180), random.randint(1, 12)
+            min_lat, max_lat, min_lon, max_lon = bounds(encode(lat, lon, precision))
+            self.assertTrue(min_lat <= lat <= max_lat and min_lon <= lon <= max_lon, (lat, lon, precision))
+
+    def test_encode_many_matches_encode(self):
+        random.seed(6)
+        lats = [random.uniform(-90, 90) for _ in range(300)] + [-90, 90]
+        lons = [random.uniform(-180, 180) for _ in range(300)] + [-180, 180]
+        for precision in range(1, 13):
+            expected = [encode(lat, lon, precision) for lat, lon in zip(lats, lons)]
+            self.assertEqual(encode_many(lats, lons, precision), expected)
+            with mock.patch.object(geohash, 'np', None):
+                self.assertEqual(encode_many(lats, lons, precision), expected)
+        self.assertEqual(encode_many([], []), [])
+
+    def test_bounds_contain_point(self):
+        min_lat, max_lat, min_lon, max_lon = bounds(encode(48.8566, 2.3522, 7))
+        self.assertTrue(min_lat <= 48.8566 < max_lat)
+        self.assertTrue(min_lon <= 2.3522 < max_lon)
+
+    def test_neighbours(self):
+        min_lat, max_lat, min_lon, max_lon = bounds('u09tv')
+        cells = neighbours('u09tv')
+        self.assertEqual(len(set(cells)), 8)
+        for cell in cells:
+            cell_min_lat, cell_max_lat, cell_min_lon, cell_max_lon = bounds(cell)
+            self.assertTrue(cell_max_lat >= min_lat and cell_min_lat <= max_lat)
+            self.assertTrue(cell_max_lon >= min_lon and cell_min_lon <= max_lon)
+        # Wraps across the antimeridian, nothing beyond a pole
+        self.assertIn('2pbpb', neighbours('rzzzz'))
+        self.assertEqual(len(neighbours('b')), 5)
+
+    def test_covering_cells_contain_circle(self):
+        random.seed(3)
+        for _ in range(300):
+            lat, lon = random.uniform(-80, 80), random.uniform(-180, 180)
+            radius_km = random.choice([0.1, 2, 25, 300])
+            cells = covering_cells(lat, lon, radius_km)
+            self.assertTrue(cells)
+            for _ in range(20):
+                point = (lat + random.uniform(-3, 3) * radius_km / 111, (lon + random.uniform(-3, 3) * radius_km / 50 + 180) % 360 - 180)
+                if -90 < point[0] < 90 and haversine_km(lat, lon, *point) <= radius_km:
+                    self.assertTrue(any(encode(*point, 12).startswith(cell) for cell in cells), (lat, lon, radius_km, point))
+
+    def test_covering_cells_over_pole(self):
+        self.assertEqual(covering_cells(89.9, 0, 50), [])
+    def test_cells_in_box(self):
+        random.seed(2)
+        for _ in range(200):
+            precision = random.randint(1, 4)
+            min_lat, min_lon = random.uniform(-90, 80), random.uniform(-180, 170)
+            box = (min_lat, min_lat + random.uniform(0, 10), min_lon, min_lon + random.uniform(0, 10))
+            cells = cells_in_box(*box, precision)
+            self.assertEqual(len(set(cells)), count_cells_in_box(*box, precision))
+            for cell in cells:
+                self.assertTrue(overlaps(bounds(cell), [box]))
+            for _ in range(10):
+                point = (random.uniform(box[0], box[1]), random.uniform(box[2], box[3]))
+                self.assertIn(encode(*point, precision), cells)
+
+    def test_zoom_precision(self):
+        self.assertEqual([zoom_precision(zoom, 7) for zoom in (0, 3, 6, 8, 11, 13, 16, 22)], [1, 2, 3, 4, 5, 6, 7, 7])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import random
+import unittest
+from app.spatial.geo import haversine_km
+from app.spatial.kdtree import KDTree
+
+
+class TestKDTree(unittest.TestCase):
+    def setUp(self):
+        random.seed(7)
+        self.points = {i: (random.uniform(-90, 90), random.uniform(-180, 180)) for i in range(2000)}
+        self.tree = KDTree((key, lat, lon) for key, (lat, lon) in self.points.items())
+
+    def brute_force(self, lat, lon, k):
+        return sorted((haversine_km(lat, lon, *point), key) for key, point in self.points.items())[:k]
+
+    def assert_matches_brute_force(self, queries=50, k=7):
+        for _ in range(queries):
+            lat, lon = random.uniform(-90, 90), random.uniform(-180, 180)
+            expected = self.brute_force(lat, lon, k)
+            result = self.tree.nearest(lat, lon, k)
+            self.assertEqual([key for _, key in result], [key for _, key in expected])
+            for (distance, _), (expected_distance, _) in zip(result, expected):
+                self.assertAlmostEqual(distance, expected_distance, places=6)
+
+    def test_matches_brute_force(self):
+        self.assert_matches_brute_force()
+
+    def test_antimeridian_and_pole(self):
+        self.tree.insert('east', 0.0, 179.99)
+        self.tree.insert('west', 0.0, -179.99)
+        self.tree.insert('pole', 89.99, 0.0)
+        self.assertEqual({key for _, key in self.tree.nearest(0.0, 180.0, 2)}, {'east', 'west'})
+        self.assertEqual(self.tree.nearest(89.99, 120.0, 1)[0][1], 'pole')
+
+    def test_incremental_updates(self):
+        for key in range(0, 2000, 2):
+            self.tree.delete(key)
+            del self.points[key]
+        for key in range(1, 200, 2):
+            lat, lon = random.uniform(-90, 90), random.uniform(-180, 180)
+            self.tree.insert(key, lat, lon)
+            self.points[key] = (lat, lon)
+        self.assertEqual(len(self.tree), len(self.points))
+        self.assert_matches_brute_force()
+
+        self.assertTrue(self.tree.needs_rebuild())
+        self.tree.rebuild()
+        self.assertFalse(self.tree.needs_rebuild())
+        self.assertEqual(self.tree.stats()['deleted'], 0)
+        self.assert_matches_brute_force()
+
+    def test_small_and_empty(self):
+        self.assertEqual(KDTree().nearest(0, 0, 3), [])
+        tree = KDTree([('a', 1.0, 1.0)])
+        self.assertEqual([key for _, key in tree.nearest(0, 0, 3)], ['a'])
+        tree.delete('a')
+        self.assertEqual(tree.nearest(0, 0, 3), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import random
+import unittest
+from unittest import mock
+from app.spatial import polygon
+from app.spatial.polygon import contains, ring_bounds
+
+# A "C" opening to the east, with a square hole in its back
+C_SHAPE = [
+    [(0, 0), (10, 0), (10, 2), (2, 2), (2, 8), (10, 8), (10, 10), (0, 10), (0, 0)],
+    [(0.5, 4), (1.5, 4), (1.5, 6), (0.5, 6), (0.5, 4)]
+]
+
+
+class TestPolygon(unittest.TestCase):
+    def test_concave_with_hole(self):
+        # (lon, lat): inside
+        points = {(1, 1): True, (5, 5): False, (9, 9): True, (5, 1): True, (5, 0.5): True,
+                  (1, 5): False, (1, 3): True, (11, 5): False, (-1, 5): False}
+        lons = [lon for lon, _ in points]
+        lats = [lat for _, lat in points]
+        self.assertEqual(contains(C_SHAPE, lats, lons), list(points.values()))
+
+    def test_fallback_matches_numpy(self):
+        random.seed(1)
+        lats = [random.uniform(-1, 11) for _ in range(500)]
+        lons = [random.uniform(-1, 11) for _ in range(500)]
+        vectorized = contains(C_SHAPE, lats, lons)
+        with mock.patch.object(polygon, 'np', None):
+            self.assertEqual(contains(C_SHAPE, lats, lons), vectorized)
+
+    def test_bounds(self):
+        self.assertEqual(ring_bounds(C_SHAPE), (0, 10, 0, 10))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import uuid
+import config
+from app import create_app, db
+from app.services import facade
+
+
+class AppTestCase(unittest.TestCase):
+    """Fresh application, in-memory database and test client for every test"""
+    config_class = config.TestingConfig
+
+    def setUp(self):
+        self.app = create_app(self.config_class)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+def create_user(**data):
+    """Create a user through the facade, with a unique email since User.emails is process-wide"""
+    values = {'first_name': 'John', 'last_name': 'Doe', 'password': 'password',
+              'email': f'{uuid.uuid4().hex}@example.com'}
+    values.update(data)
+    return facade.create_user(values)
+
+
+def place_data(**data):
+    values = {'title': 'Cozy apartment', 'description': 'Quiet', 'price': 80.0,
+              'latitude': 48.85, 'longitude': 2.35}
+    values.update(data)
+    return values
+
+
+def create_place(owner, **data):
+    """Create a place owned by owner through the facade"""
+    return facade.create_place(place_data(**data), owner.id)
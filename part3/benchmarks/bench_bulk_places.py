@@ -0,0 +1,59 @@
+"""Throughput of facade.create_places_bulk against one facade.create_place per row.
+
+Both paths get the same rows, each with one amenity, in a fresh in-memory
+database, so the numbers include validation, the amenity links and the
+spatial index triggers.
+
+Run from part3/: python -m benchmarks.bench_bulk_places [places] [chunk_size]
+"""
+import random
+import sys
+import time
+import config
+from app import create_app, db
+from app.services import facade
+
+
+def make_rows(count, amenity_id):
+    return [{'title': f'Place {i}', 'description': 'Quiet', 'price': round(random.uniform(20, 300), 2),
+             'latitude': random.uniform(42.5, 51.0), 'longitude': random.uniform(-4.5, 8.0),
+             'amenities': [amenity_id]} for i in range(count)]
+
+
+def timed(app, insert):
+    with app.app_context():
+        db.create_all()
+        owner = facade.create_user({'first_name': 'John', 'last_name': 'Doe', 'password': 'password',
+                                    'email': f'bench{random.random()}@example.com'})
+        amenity = facade.create_amenity({'name': 'Wi-Fi'})
+        start = time.perf_counter()
+        insert(owner.id, amenity.id)
+        elapsed = time.perf_counter() - start
+        db.session.remove()
+        db.drop_all()
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    random.seed(0)
+    app = create_app(config.TestingConfig)
+
+    def one_by_one(owner_id, amenity_id):
+        for data in make_rows(count, amenity_id):
+            facade.create_place(data, owner_id)
+
+    def bulk(owner_id, amenity_id):
+        results = facade.create_places_bulk(make_rows(count, amenity_id), owner_id, chunk_size=chunk_size)
+        assert all('id' in result for result in results)
+
+    single = timed(app, one_by_one)
+    print(f"create_place x {count}: {single:.2f} s, {count / single:.0f} rows/s")
+    batch = timed(app, bulk)
+    print(f"create_places_bulk, chunks of {chunk_size}: {batch:.2f} s, {count / batch:.0f} rows/s")
+    print(f"speedup: {single / batch:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
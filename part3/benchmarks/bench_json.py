@@ -0,0 +1,48 @@
+"""Compare JSON encode time of a 10k-place GET /api/v1/places/ response.
+
+Run from part3/: python -m benchmarks.bench_json
+"""
+import timeit
+import uuid
+from app.api.representations import ORJSON_CODEC, STDLIB_CODEC
+
+PLACES = 10000
+REPEAT = 5
+
+
+def make_place(i):
+    owner_id = str(uuid.uuid4())
+    place_id = str(uuid.uuid4())
+    return {
+        'id': place_id,
+        'title': f'Place number {i}',
+        'description': 'A quiet apartment close to the city centre, with a view on the river.',
+        'price': 80.0 + i % 50,
+        'latitude': 48.85 + i / 1e5,
+        'longitude': 2.35 - i / 1e5,
+        'owner': {'id': owner_id, 'first_name': 'John', 'last_name': 'Doe', 'email': f'john{i}@example.com'},
+        'amenities': [{'id': str(uuid.uuid4()), 'name': name} for name in ('Wi-Fi', 'Pool', 'Parking')],
+        'reviews': [
+            {'id': str(uuid.uuid4()), 'text': 'Lovely stay, would come back.', 'rating': 4,
+             'place_id': place_id, 'user_id': str(uuid.uuid4())}
+            for _ in range(5)
+        ]
+    }
+
+
+def main():
+    payload = [make_place(i) for i in range(PLACES)]
+    codecs = [STDLIB_CODEC] + ([ORJSON_CODEC] if ORJSON_CODEC else [])
+    results = {}
+    for codec in codecs:
+        seconds = min(timeit.repeat(lambda: codec.dumps(payload), number=1, repeat=REPEAT))
+        results[codec.name] = seconds
+        print(f"{codec.name:>7}: {seconds * 1000:8.1f} ms  ({len(codec.dumps(payload)) / 1e6:.1f} MB)")
+    if ORJSON_CODEC is None:
+        print("orjson is not installed, only the standard library was measured")
+    else:
+        print(f"speedup: x{results['json'] / results['orjson']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Latency of GET /api/v1/places/nearby lookups over a large places table.
+
+Places are spread uniformly over metropolitan France (about 1.8 per km2
+at a million places); each query asks for the 20 nearest places within
+radius_km of a random point, loading only title and price.
+
+Run from part3/: python -m benchmarks.bench_nearby [places] [radius_km]
+"""
+import random
+import statistics
+import sys
+import time
+import uuid
+import config
+from app import create_app, db
+from app.services import facade
+
+QUERIES = 200
+LAT_RANGE = (42.5, 51.0)
+LON_RANGE = (-4.5, 8.0)
+
+
+def seed(count):
+    owner_id = str(uuid.uuid4())
+    rows = [{'id': str(uuid.uuid4()), 'title': f'Place {i}', 'description': '', 'price': 80.0,
+             'latitude': random.uniform(*LAT_RANGE), 'longitude': random.uniform(*LON_RANGE),
+             'user_id': owner_id} for i in range(count)]
+    facade.place_repo.insert_many(rows, 10000)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    radius_km = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    random.seed(0)
+    app = create_app(config.TestingConfig)
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        seed(count)
+        print(f"inserted {count} places in {time.perf_counter() - start:.1f} s")
+
+        timings, found = [], 0
+        for _ in range(QUERIES):
+            lat, lon = random.uniform(*LAT_RANGE), random.uniform(*LON_RANGE)
+            start = time.perf_counter()
+            found += len(facade.get_places_nearby(lat, lon, radius_km, 20, ['title', 'price'], []))
+            timings.append((time.perf_counter() - start) * 1000)
+            db.session.expunge_all()
+        timings.sort()
+        print(f"radius {radius_km} km, {found / QUERIES:.1f} places per query: "
+              f"p50 {statistics.median(timings):.2f} ms, p95 {timings[int(QUERIES * 0.95)]:.2f} ms, "
+              f"max {timings[-1]:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""k-nearest-neighbour latency: KDTree against a NumPy brute-force scan.
+
+The brute force computes the haversine distance to every point and keeps
+the k smallest with argpartition, which is what a query costs without an
+index. Both must return the same neighbours.
+
+Run from part3/: python -m benchmarks.bench_nearest [points] [k]
+"""
+import random
+import sys
+import time
+from app.spatial.geo import EARTH_RADIUS_KM
+from app.spatial.kdtree import KDTree
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+QUERIES = 200
+
+
+def brute_force(lats, lons, lat, lon, k):
+    lat, lon = np.radians(lat), np.radians(lon)
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    nearest = np.argpartition(distances, k)[:k]
+    return nearest[np.argsort(distances[nearest])]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    random.seed(0)
+    points = [(i, random.uniform(-90, 90), random.uniform(-180, 180)) for i in range(count)]
+    queries = [(random.uniform(-90, 90), random.uniform(-180, 180)) for _ in range(QUERIES)]
+
+    start = time.perf_counter()
+    tree = KDTree(points)
+    print(f"KDTree build, {count} points: {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    results = [tree.nearest(lat, lon, k) for lat, lon in queries]
+    kd_ms = (time.perf_counter() - start) * 1000 / QUERIES
+    print(f"KDTree      k={k}: {kd_ms:8.3f} ms/query")
+
+    if np is None:
+        print("numpy is not installed, brute-force baseline skipped")
+        return
+    lats = np.radians(np.array([lat for _, lat, _ in points]))
+    lons = np.radians(np.array([lon for _, _, lon in points]))
+    start = time.perf_counter()
+    expected = [brute_force(lats, lons, lat, lon, k) for lat, lon in queries]
+    brute_ms = (time.perf_counter() - start) * 1000 / QUERIES
+    print(f"NumPy scan  k={k}: {brute_ms:8.3f} ms/query")
+    assert all([key for _, key in result] == list(keys) for result, keys in zip(results, expected))
+    print(f"speedup: x{brute_ms / kd_ms:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Compare rows/s of the ORM list path against the Core projection path.
+
+Pages through every review the way GET /api/v1/reviews/ does: get_page +
+to_dict() on ORM instances versus get_page_rows returning plain dicts.
+
+Run from part3/: python -m benchmarks.bench_projection
+"""
+import time
+import uuid
+import config
+from app import create_app, db
+from app.services import facade
+
+SIDE = 100  # SIDE users x SIDE places, one review per pair
+PAGE = 1000
+REPEAT = 3
+
+
+def seed():
+    users = [{'id': str(uuid.uuid4()), 'first_name': 'John', 'last_name': 'Doe', 'password': 'x' * 60,
+              'email': f'user{i}@example.com', 'is_admin': False} for i in range(SIDE)]
+    places = [{'id': str(uuid.uuid4()), 'title': f'Place {i}', 'description': 'Quiet', 'price': 80.0,
+               'latitude': 48.85, 'longitude': 2.35, 'user_id': users[0]['id']} for i in range(SIDE)]
+    reviews = [{'text': 'Lovely stay, would come back.', 'rating': 4, 'place_id': place['id'],
+                'user_id': user['id']} for user in users for place in places]
+    facade.user_repo.insert_many(users)
+    facade.place_repo.insert_many(places)
+    facade.review_repo.insert_many(reviews, 5000)
+    return len(reviews)
+
+
+def orm_path():
+    count, after = 0, None
+    while True:
+        reviews, after = facade.get_reviews_page(PAGE, after)
+        count += len([review.to_dict() for review in reviews])
+        db.session.expunge_all()
+        if not after:
+            return count
+
+
+def rows_path():
+    count, after = 0, None
+    while True:
+        rows, after = facade.get_reviews_rows(PAGE, after)
+        count += len(rows)
+        if not after:
+            return count
+
+
+def best_of(func):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        count = func()
+        timings.append(time.perf_counter() - start)
+    return count, min(timings)
+
+
+def main():
+    app = create_app(config.TestingConfig)
+    with app.app_context():
+        db.create_all()
+        total = seed()
+        results = {}
+        for name, func in (('orm', orm_path), ('rows', rows_path)):
+            count, seconds = best_of(func)
+            assert count == total
+            results[name] = seconds
+            print(f"{name:>5}: {seconds * 1000:8.1f} ms  {count / seconds:10.0f} rows/s")
+        print(f"speedup: x{results['orm'] / results['rows']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Report where create_app startup time goes.
+
+Runs a fresh interpreter with -X importtime so module imports are measured
+cold, then prints the slowest imports and the per-phase timings create_app
+records in app.extensions['startup'].
+
+Run from part3/: python -m benchmarks.bench_startup
+"""
+import subprocess
+import sys
+
+TOP = 15
+SCRIPT = (
+    "import config\n"
+    "from app import create_app\n"
+    "app = create_app(config.TestingConfig)\n"
+    "print(app.extensions['startup'])\n"
+)
+
+
+def main():
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', SCRIPT],
+                            capture_output=True, text=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        imports.append((int(cumulative), module.strip()))
+
+    print(f"slowest imports (cumulative ms), top {TOP}:")
+    for cumulative, module in sorted(imports, reverse=True)[:TOP]:
+        print(f"  {cumulative / 1000:8.1f}  {module}")
+    print(f"create_app phases (ms): {result.stdout.strip()}")
+
+
+if __name__ == '__main__':
+    main()
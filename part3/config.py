@@ -3,13 +3,86 @@ import os
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
     DEBUG = False
+    PAGE_DEFAULT_LIMIT = int(os.getenv('PAGE_DEFAULT_LIMIT', 100))
+    PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', 1000))
+    BULK_MAX_ROWS = int(os.getenv('BULK_MAX_ROWS', 5000))
+    BULK_INSERT_CHUNK_SIZE = int(os.getenv('BULK_INSERT_CHUNK_SIZE', 500))
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+    # 'auto' uses orjson when it is installed, 'json' forces the standard library
+    JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+    # Read-through cache per repository: {'place': {'maxsize': 1024, 'ttl': 60}}
+    REPOSITORY_CACHE = {}
+    # Largest radius accepted by GET /api/v1/places/nearby
+    NEARBY_MAX_RADIUS_KM = float(os.getenv('NEARBY_MAX_RADIUS_KM', 500))
+    # Largest polygon accepted by POST /api/v1/places/within, in vertices over all rings
+    WITHIN_MAX_VERTICES = int(os.getenv('WITHIN_MAX_VERTICES', 1000))
+    # Most geohash cells one GET /api/v1/places/clusters may cover
+    CLUSTER_MAX_CELLS = int(os.getenv('CLUSTER_MAX_CELLS', 4096))
+    # Characters of the geohash stored on each place (9: cells of about 5 m x 5 m)
+    GEOHASH_PRECISION = int(os.getenv('GEOHASH_PRECISION', 9))
+    # Reload the nearest-place KD-tree in a background thread after outside writes, see app.services.place_index
+    PLACE_INDEX_BACKGROUND_RELOAD = os.getenv('PLACE_INDEX_BACKGROUND_RELOAD', 'true').lower() == 'true'
+    # Start loading that tree in the background from create_app instead of on the first query
+    PLACE_INDEX_PRELOAD = os.getenv('PLACE_INDEX_PRELOAD', 'true').lower() == 'true'
+    # Seconds a request waits on an identical in-flight read, see app.services.singleflight
+    SINGLEFLIGHT_TIMEOUT = float(os.getenv('SINGLEFLIGHT_TIMEOUT', 5))
+    # Swagger UI at / and the spec at /swagger.json
+    API_DOCS_ENABLED = os.getenv('API_DOCS_ENABLED', 'true').lower() == 'true'
+    # Encoded bodies of list GETs, see app.api.v1.caching.ResponseCache
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_BYTES = int(os.getenv('RESPONSE_CACHE_BYTES', 64 * 1024 * 1024))
+    # Response compression, see app.api.compression
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', 6))
+    COMPRESSION_CACHE_BYTES = int(os.getenv('COMPRESSION_CACHE_BYTES', 32 * 1024 * 1024))
+    COMPRESSION_MIMETYPES = ['application/json', 'text/html', 'text/css', 'application/javascript']
 
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///development.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+class ProductionConfig(Config):
+    API_DOCS_ENABLED = os.getenv('API_DOCS_ENABLED', 'false').lower() == 'true'
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///production.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'connect_args': {
+            # Run on every new SQLite connection, ignored by other databases, see app.persistence.sqlite
+            'pragmas': {
+                'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+                'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+                'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+                'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),
+                'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'),
+                'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+                'foreign_keys': os.getenv('SQLITE_FOREIGN_KEYS', 'ON')
+            }
+        }
+    }
+    REPOSITORY_CACHE = {
+        name: {
+            'maxsize': int(os.getenv('REPOSITORY_CACHE_SIZE', 10000)),
+            'ttl': int(os.getenv('REPOSITORY_CACHE_TTL', 30))
+        }
+        for name in ('user', 'amenity', 'place')
+    }
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    BCRYPT_LOG_ROUNDS = 4
+    # Every thread shares the one in-memory connection
+    PLACE_INDEX_BACKGROUND_RELOAD = False
+    PLACE_INDEX_PRELOAD = False
+
 config = {
     'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
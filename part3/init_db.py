@@ -1,7 +1,30 @@
+import sys
 from app import create_app, db
+from app.models.place_cluster import create_place_clusters, rebuild_place_clusters
+from app.models.place_rtree import rebuild_places_rtree
+from app.persistence.schema import create_missing_columns, create_missing_indexes
+from app.services import facade
 
 app = create_app()
 
 with app.app_context():
     db.create_all()
+    for name in create_missing_columns():
+        print(f"Colonne {name} ajoutée.")
+    for name in create_missing_indexes():
+        print(f"Index {name} créé.")
+    if '--rebuild-rtree' in sys.argv:
+        with db.engine.begin() as connection:
+            rebuild_places_rtree(connection)
+        print("Index spatial places_rtree reconstruit.")
+    # --rebuild-geohash recalcule tous les geohash, par exemple après un changement de GEOHASH_PRECISION
+    count = facade.place_repo.update_geohashes(only_missing='--rebuild-geohash' not in sys.argv)
+    if count:
+        print(f"Geohash calculé pour {count} lieux.")
+    # Les agrégats de clusters ont besoin de la colonne geohash, ajoutée ci-dessus sur une ancienne base
+    with db.engine.begin() as connection:
+        create_place_clusters(connection)
+        if '--rebuild-clusters' in sys.argv:
+            rebuild_place_clusters(connection)
+            print("Agrégats place_clusters recalculés.")
     print("✅ Base de données initialisée avec succès.")
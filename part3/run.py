@@ -1,7 +1,9 @@
+import os
 from app import create_app
 from flask_cors import CORS
+from config import config
 
-app = create_app()
+app = create_app(config[os.getenv('HBNB_ENV', 'default')])
 
 if __name__ == '__main__':
     app.run(debug=True)
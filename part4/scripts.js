@@ -44,17 +44,8 @@ document.addEventListener('DOMContentLoaded', () => {
         const filter = document.getElementById('price-filter');
         if (filter) {
             filter.addEventListener('change', (event) => {
-                const selectedPrice = event.target.value;
-                const cards = document.querySelectorAll('.place-card');
-
-                cards.forEach(card => {
-                    const price = parseFloat(card.getAttribute('data-price'));
-                    if (selectedPrice === 'All' || price <= parseFloat(selectedPrice)) {
-                        card.style.display = 'block';
-                    } else {
-                        card.style.display = 'none';
-                    }
-                });
+                const token = getCookie('token');
+                if (token) fetchPlaces(token, event.target.value);
             });
         }
     }
@@ -78,15 +69,27 @@ function getCookie(name) {
     if (parts.length === 2) return parts.pop().split(';').shift();
 }
 
-async function fetchPlaces(token) {
+async function fetchPlaces(token, maxPrice = 'all') {
     try {
-        const response = await fetch('http://127.0.0.1:5000/api/v1/places/', {
-            headers: { 'Authorization': `Bearer ${token}` }
-        });
+        const places = [];
+        let cursor = null;
+
+        do {
+            const url = new URL('http://127.0.0.1:5000/api/v1/places/');
+            url.searchParams.set('fields', 'title,description,price,latitude,longitude');
+            if (maxPrice !== 'all') url.searchParams.set('max_price', maxPrice);
+            if (cursor) url.searchParams.set('after', cursor);
+
+            const response = await fetch(url, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+
+            if (!response.ok) throw new Error('Erreur lors de la récupération des lieux');
 
-        if (!response.ok) throw new Error('Erreur lors de la récupération des lieux');
+            places.push(...await response.json());
+            cursor = response.headers.get('X-Next-Cursor');
+        } while (cursor);
 
-        const places = await response.json();
         displayPlaces(places);
     } catch (error) {
         console.error('Erreur fetch places :', error);